@@ -1,9 +1,15 @@
 import os
+import sys
 import glob
 import json
+import zipfile
 import pandas as pd
 import logging
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.results import RESULTS_NAME, iter_results, iter_records
+from utils.archive import ARCHIVE_DIR, iter_archived_requests
+
 # Configure logging for debug
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
@@ -20,31 +26,79 @@ def process_request(request_path):
         logging.error(f"Failed to load {request_path}: {e}")
         return []
 
-    # Normalize request-level fields
-    file_name = request.get('audio_filename') or request.get('file')
-    lang_key = request.get('lang_key') or request.get('langKey')
-    sent_time = request.get('sent_time') or request.get('sentTime')
-    tasks_dict = request.get('tasks') or {}
-
     base_dir = os.path.dirname(request_path)
     # Search exactly one level deeper for chunks_mapping.json files (segments live in subfolders)
     mapping_pattern = os.path.join(base_dir, '*', 'chunks_mapping.json')
     mapping_files = glob.glob(mapping_pattern)
     logging.info(f"Found {len(mapping_files)} mapping files in subfolders of {base_dir}")
 
-    rows = []
+    mappings = []
     for mapping_file in mapping_files:
-        segment_dir = os.path.dirname(mapping_file)
-        segment_name = os.path.basename(segment_dir)
-
+        segment_name = os.path.basename(os.path.dirname(mapping_file))
         logging.info(f"Processing segment '{segment_name}' mapping: {mapping_file}")
         try:
             with open(mapping_file, 'r', encoding='utf-8') as mf:
-                mapping = json.load(mf)
+                mappings.append((segment_name, mapping_file, json.load(mf)))
         except Exception as e:
             logging.warning(f"Error reading mapping {mapping_file}: {e}")
-            continue
 
+    return segment_rows(request, mappings, words_per_segment(iter_results(base_dir)))
+
+
+def process_archive(zip_path):
+    """
+    Same rows for a batch the cleaner has archived, read from inside its zip.
+    """
+    logging.info(f"Loading archived batch from: {zip_path}")
+    try:
+        with zipfile.ZipFile(zip_path) as zf:
+            request = json.loads(zf.read('request.json'))
+            names = zf.namelist()
+            mappings = []
+            for name in names:
+                parts = name.split('/')
+                if len(parts) != 2 or parts[1] != 'chunks_mapping.json':
+                    continue
+                try:
+                    mappings.append((parts[0], f"{zip_path}:{name}", json.loads(zf.read(name))))
+                except ValueError as e:
+                    logging.warning(f"Error reading mapping {zip_path}:{name}: {e}")
+            words_by_segment = {}
+            if RESULTS_NAME in names:
+                with zf.open(RESULTS_NAME) as f:
+                    words_by_segment = words_per_segment(iter_records(f))
+    except (OSError, zipfile.BadZipFile, KeyError, ValueError) as e:
+        logging.error(f"Failed to load {zip_path}: {e}")
+        return []
+    logging.info(f"Found {len(mappings)} mapping files in {zip_path}")
+    return segment_rows(request, mappings, words_by_segment)
+
+
+def words_per_segment(records):
+    """
+    Transcript word counts per segment from (offset, record) pairs of a
+    batch's results.jsonl.
+    """
+    words_by_segment = {}
+    for _, record in records:
+        seg = record.get('segment')
+        words_by_segment[seg] = words_by_segment.get(seg, 0) + len(record.get('text', '').split())
+    return words_by_segment
+
+
+def segment_rows(request, mappings, words_by_segment):
+    """
+    One row per segment from the request metadata and its
+    (segment name, source, chunks mapping) entries.
+    """
+    # Normalize request-level fields
+    file_name = request.get('audio_filename') or request.get('file')
+    lang_key = request.get('lang_key') or request.get('langKey')
+    sent_time = request.get('sent_time') or request.get('sentTime')
+    tasks_dict = request.get('tasks') or {}
+
+    rows = []
+    for segment_name, mapping_file, mapping in mappings:
         # mapping may be a list of chunks or nested under a key
         if isinstance(mapping, list):
             chunks = mapping
@@ -77,16 +131,10 @@ def process_request(request_path):
         num_chunks = len(starts)
         avg_chunk_length = sum(e - s for s, e in zip(starts, ends)) / num_chunks
 
-        # Find transcript text file one level deeper relative to mapping file
-        text_files = glob.glob(os.path.join(segment_dir, '*', '*.txt'))
-        text_length = 0
-        if text_files:
-            try:
-                with open(text_files[0], 'r', encoding='utf-8') as tf:
-                    text = tf.read()
-                text_length = len(text.split())
-            except Exception as e:
-                logging.warning(f"Could not read text file {text_files[0]}: {e}")
+        try:
+            text_length = words_by_segment.get(int(segment_name.split('_')[1]), 0)
+        except (IndexError, ValueError):
+            text_length = 0
 
         # Build row starting with request-level fields
         row = {
@@ -115,18 +163,27 @@ if __name__ == '__main__':
     project_root = os.path.abspath(os.path.join(script_dir, '..'))
     logging.info(f"Project root detected at: {project_root}")
 
-    # Locate all request.json files
-    pattern = os.path.join(project_root, '**', 'request.json')
-    request_files = glob.glob(pattern, recursive=True)
-    logging.info(f"Found {len(request_files)} request.json files")
-
-    if not request_files:
+    # Locate all request.json files of batches still in folders; archived
+    # batches (and copies unpacked from them for the web app) are read
+    # from their zips instead, so each is counted once
+    data_dir = os.environ.get('TRANSCRIBE_DATA_DIR') or os.path.join(project_root, 'data')
+    archive_root = os.path.join(os.path.abspath(data_dir), ARCHIVE_DIR) + os.sep
+    # (TRANSCRIBE_DATA_DIR may point outside the project, so look there too)
+    found = set(glob.glob(os.path.join(project_root, '**', 'request.json'), recursive=True))
+    found.update(glob.glob(os.path.join(data_dir, '*', 'request.json')))
+    request_files = sorted(p for p in set(map(os.path.abspath, found)) if not p.startswith(archive_root))
+    archives = [os.path.join(data_dir, rel) for _, rel, _, _ in iter_archived_requests(data_dir)]
+    logging.info(f"Found {len(request_files)} request.json files and {len(archives)} archived batches")
+
+    if not request_files and not archives:
         logging.error("No request.json files found. Check your directory structure.")
         exit(1)
 
     all_rows = []
     for req in request_files:
         all_rows.extend(process_request(req))
+    for zip_path in archives:
+        all_rows.extend(process_archive(zip_path))
 
     if not all_rows:
         logging.error("No segment data collected. Please verify mapping files and request.json contents.")
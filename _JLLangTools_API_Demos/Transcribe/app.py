@@ -1,22 +1,28 @@
 import os
+import zlib
 import json
+import mimetypes
 import pathlib
 import urllib.parse
 import re
+import threading
 from datetime import datetime, timezone
 from markupsafe import Markup
-from flask import Flask, render_template, request, jsonify, send_file, abort
+from flask import Flask, render_template, request, jsonify, send_file, abort, Response, stream_with_context
 import requests
 from werkzeug.utils import secure_filename
 from yt_dlp import YoutubeDL
 
 from analytics.dashboard import init_dashboard
 from utils.atomic_queue import AtomicQueue
-from utils.request_utils import create_transcription_request
+from utils.request_utils import create_transcription_request, load_request
+from utils.results import index_results, lookup, read_at, results_path
+from utils import archive, backlog, job_index, uploads
+from utils.event_stream import EventBroker
 
 # ─── Setup paths ───────────────────────────────────────────────────────────────
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(BASE_DIR, 'data')
+DATA_DIR = os.environ.get('TRANSCRIBE_DATA_DIR') or os.path.join(BASE_DIR, 'data')
 os.makedirs(DATA_DIR, exist_ok=True)
 
 # Ensure each queue file exists
@@ -33,6 +39,27 @@ API_URL = settings['transcribe']['api_url']
 app = Flask(__name__)
 converter_q = AtomicQueue(os.path.join(DATA_DIR, 'converter.queue'))
 dash_app   = init_dashboard(app, api_url=API_URL)
+job_index.ensure_index(DATA_DIR)
+
+event_broker = EventBroker(DATA_DIR)
+
+FILES_PAGE_SIZE     = 50
+FILES_PAGE_SIZE_MAX = 200
+EVENTS_KEEPALIVE    = 15   # seconds between SSE keep-alive comments
+EVENTS_POLL_TIMEOUT = 25   # max seconds a long-poll request is held open
+# Requests this process holds open for live events (SSE streams and waiting
+# long-polls), a quarter of its server threads by default. Past the cap
+# /events answers 204 and long-polls return at once with a retry delay, so
+# open tabs can't take the threads pages and upload parts need.
+EVENTS_HELD         = int(os.environ.get('TRANSCRIBE_EVENT_STREAMS') or
+                          max(1, int(os.environ.get('TRANSCRIBE_WEB_THREADS', '16')) // 4))
+EVENTS_BUSY_RETRY   = 5    # seconds a client waits between polls while at the cap
+event_slots         = threading.BoundedSemaphore(EVENTS_HELD)
+
+PREVIEW_LIMIT       = 500         # lines / cues / rows per preview page
+PREVIEW_LIMIT_MAX   = 5000
+GZIP_BLOCK          = 64 * 1024
+TEXT_ARTIFACTS      = {'.txt', '.srt', '.vtt', '.json', '.jsonl', '.log'}
 
 # ─── Template filter: duration formatting ─────────────────────────────────────
 @app.template_filter('format_duration')
@@ -63,6 +90,11 @@ def get_device_and_languages():
         langs = []
     return device, langs
 
+def _overloaded(e, **body):
+    response = jsonify({'error': f"{e}; retry in {e.retry_after}s", 'retry_after': e.retry_after, **body})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, e.status
+
 # ─── Routes ───────────────────────────────────────────────────────────────────
 @app.route('/')
 def index():
@@ -77,8 +109,15 @@ def transcribe():
      - a dropped/entered YouTube URL (youtube_url in form)
      - one or more uploaded audio files
     Returns JSON: {'status':'queued', 'items':[...]}
+
+    New jobs are refused (503 low disk, 429 backlog full, with Retry-After)
+    while utils.backlog says the pipeline cannot take more.
     """
     queued = []
+    try:
+        backlog.admit(DATA_DIR, request.content_length or 0)
+    except backlog.Overloaded as e:
+        return _overloaded(e)
 
     # ─── Parse optional segments JSON (works for both modes) ───────────────────
     try:
@@ -102,8 +141,17 @@ def transcribe():
         except Exception as e:
             return jsonify({'error': f'yt-dlp metadata failed: {e}'}), 400
 
-        entries = info.get('entries') if info.get('_type') == 'playlist' else [info]
-        for entry in filter(None, entries):
+        entries = list(filter(None, info.get('entries') if info.get('_type') == 'playlist' else [info]))
+        for n, entry in enumerate(entries):
+            # Playlists are re-checked per video, as each download fills the disk
+            if n:
+                try:
+                    backlog.admit(DATA_DIR, fresh=True)
+                except backlog.Overloaded as e:
+                    if not queued:
+                        return _overloaded(e)
+                    deferred = [x.get('title') or x.get('id') for x in entries[n:]]
+                    return _overloaded(e, status='queued', items=queued, deferred=deferred)[0]
             video_url  = entry.get('webpage_url')
             title      = entry.get('title') or entry.get('id')
             safe_title = secure_filename(title)
@@ -168,58 +216,370 @@ def transcribe():
     return jsonify({'status': 'queued', 'items': queued})
 
 
+# ─── Resumable chunked uploads ────────────────────────────────────────────────
+# POST /uploads                       {filename, size, lang_key, segments, part_size}
+# PUT  /uploads/<id>/parts/<n>        raw bytes, X-Part-Sha256: <hex>
+# GET  /uploads/<id>                  received parts, for resuming
+# POST /uploads/<id>/complete         create request.json + enqueue converter
+def _upload_folder(upload_id):
+    if upload_id != secure_filename(upload_id):
+        abort(404)
+    subpath = os.path.join(DATA_DIR, upload_id)
+    if not os.path.isfile(os.path.join(subpath, uploads.STATE_NAME)):
+        abort(404)
+    return subpath
+
+
+@app.route('/uploads', methods=['POST'])
+def upload_init():
+    body = request.get_json(silent=True) or {}
+    filename = secure_filename(body.get('filename', ''))
+    try:
+        size      = int(body['size'])
+        part_size = int(body.get('part_size') or 0)
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'filename and size are required'}), 400
+    if not filename:
+        return jsonify({'error': 'filename and size are required'}), 400
+
+    try:
+        backlog.admit(DATA_DIR, size)
+    except backlog.Overloaded as e:
+        return _overloaded(e)
+
+    lang = body.get('lang_key') or 'unknown'
+    seg_list = body.get('segments') or []
+    basename, _ = os.path.splitext(filename)
+    ts = datetime.now(timezone.utc).strftime('%Y_%m_%d__%H_%M_%S')
+    subfolder = secure_filename(f"{ts}_{lang}_{basename}")
+    subpath   = os.path.join(DATA_DIR, subfolder)
+    if os.path.exists(subpath):
+        subfolder = f"{subfolder}_{os.urandom(3).hex()}"
+        subpath   = os.path.join(DATA_DIR, subfolder)
+    os.makedirs(subpath)
+
+    try:
+        state = uploads.init_upload(subpath, filename, size, part_size, lang, seg_list)
+    except uploads.UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'upload_id': subfolder, **uploads.status(state)}), 201
+
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    subpath = _upload_folder(upload_id)
+    return jsonify({'upload_id': upload_id, **uploads.status(uploads.load_state(subpath))})
+
+
+@app.route('/uploads/<upload_id>/parts/<int:index>', methods=['PUT'])
+def upload_part(upload_id, index):
+    subpath = _upload_folder(upload_id)
+    try:
+        info = uploads.write_part(subpath, index, request.stream, request.headers.get('X-Part-Sha256'))
+    except uploads.UploadGone as e:
+        return jsonify({'error': str(e)}), 410
+    except uploads.UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'upload_id': upload_id, 'index': index, 'received': len(info['received'])})
+
+
+@app.route('/uploads/<upload_id>/complete', methods=['POST'])
+def upload_complete(upload_id):
+    subpath = _upload_folder(upload_id)
+    try:
+        state = uploads.complete_upload(subpath)
+    except uploads.UploadGone as e:
+        return jsonify({'error': str(e)}), 410
+    except uploads.UploadError as e:
+        return jsonify({'error': str(e)}), 409
+
+    create_transcription_request(
+        subpath,
+        state['filename'],
+        state['lang_key'],
+        state['segments'] if state['segments'] else [{'start': '', 'end': ''}]
+    )
+    converter_q.enqueue(upload_id)
+    return jsonify({'status': 'queued', 'items': [{'folder': upload_id, 'filename': state['filename']}]})
+
+
 @app.route('/files')
 def files_index():
     device, _ = get_device_and_languages()
-    batches = []
-    for name in sorted(os.listdir(DATA_DIR), reverse=True):
-        sub = os.path.join(DATA_DIR, name)
-        rq  = os.path.join(sub, 'request.json')
-        if not (os.path.isdir(sub) and os.path.exists(rq)):
+    try:
+        limit = min(max(int(request.args.get('per_page', FILES_PAGE_SIZE)), 1), FILES_PAGE_SIZE_MAX)
+    except ValueError:
+        limit = FILES_PAGE_SIZE
+    filters = {
+        'lang':   request.args.get('lang') or None,
+        'status': request.args.get('status') or None,
+        'q':      request.args.get('q', '').strip() or None,
+        'sort':   request.args.get('sort', 'sent_time'),
+        'order':  request.args.get('order', 'desc'),
+    }
+    try:
+        batches, next_cursor, prev_cursor = job_index.query_jobs(
+            DATA_DIR, limit=limit,
+            after=request.args.get('after'), before=request.args.get('before'),
+            **filters
+        )
+    except ValueError:
+        abort(400)
+    for info in batches:
+        info['sent_time_dt'] = datetime.fromisoformat(info['sent_time'])
+    return render_template(
+        'files.html', batches=batches, device=device,
+        filters=filters, per_page=limit, languages=job_index.languages(DATA_DIR),
+        next_cursor=next_cursor, prev_cursor=prev_cursor
+    )
+
+
+@app.route('/status/backlog')
+def backlog_status():
+    """
+    Per-stage backlog (queued batches, pending audio seconds, bytes on
+    disk), disk headroom and whether new jobs are currently admitted.
+    ?fresh=1 bypasses the few-second report cache.
+    """
+    fresh = request.args.get('fresh') == '1'
+    try:
+        state = dict(backlog.admit(DATA_DIR, fresh=fresh))
+        state['admission'] = {'accepting': True}
+    except backlog.Overloaded as e:
+        state = dict(backlog.report(DATA_DIR))
+        state['admission'] = {'accepting': False, 'status': e.status,
+                              'reason': str(e), 'retry_after': e.retry_after}
+    state['budgets'] = {stage: backlog.intake(DATA_DIR, stage) for stage in backlog.STAGE_BUDGETS}
+    return jsonify(state)
+
+
+# ─── Live progress (SSE + long-poll) ──────────────────────────────────────────
+def _event_folders():
+    return set(filter(None, request.args.get('folders', '').split(','))) or None
+
+
+def _event_snapshot(folders):
+    """
+    Current task state and latest chunk progress for `folders`, so a client
+    that connects mid-batch doesn't have to wait for the next event.
+    """
+    if not folders:
+        return {}
+    progress = job_index.latest_progress(DATA_DIR, sorted(folders))
+    snapshot = {}
+    for folder in folders:
+        job = job_index.get_job(DATA_DIR, folder)
+        if job is None:
             continue
-        info = json.load(open(rq, 'r', encoding='utf-8'))
-        info['folder']      = name
-        info['sent_time_dt']= datetime.fromisoformat(info['sent_time'])
-        info['completed']   = all(info.get('tasks', {}).values())
-        info['segments']    = len([f for f in os.listdir(sub) if f.startswith('segment_')])
-        batches.append(info)
-    return render_template('files.html', batches=batches, device=device)
+        snapshot[folder] = {
+            'tasks':     job['tasks'],
+            'completed': job['completed'],
+            'progress':  progress.get(folder),
+        }
+    return snapshot
+
+
+@app.route('/events')
+def events_stream():
+    """
+    Server-sent events: 'tasks' on every stage transition and 'progress'
+    (done/total chunks) while a batch is transcribed. ?folders=a,b limits
+    the stream to those batches; reconnects resume from Last-Event-ID.
+    204 when EVENTS_HELD streams are already open: EventSource then stops
+    reconnecting and the page long-polls /events/poll instead.
+    """
+    folders = _event_folders()
+    try:
+        after = int(request.headers.get('Last-Event-ID') or request.args.get('after') or event_broker.cursor())
+    except ValueError:
+        abort(400)
+    if not event_slots.acquire(blocking=False):
+        return '', 204
+
+    def generate():
+        yield 'retry: 3000\n\n'
+        if folders:
+            yield f"event: snapshot\ndata: {json.dumps(_event_snapshot(folders))}\n\n"
+        cursor = after
+        while True:
+            events, cursor = event_broker.wait(cursor, folders, timeout=EVENTS_KEEPALIVE)
+            if not events:
+                yield ': keep-alive\n\n'
+                continue
+            for e in events:
+                yield f"id: {e['id']}\nevent: {e['kind']}\ndata: {json.dumps(e)}\n\n"
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Runs when the server closes the response, i.e. once the client has gone
+    response.call_on_close(event_slots.release)
+    return response
+
+
+@app.route('/events/poll')
+def events_poll():
+    """
+    Long-poll fallback for /events. Without ?after returns a snapshot and
+    the current cursor immediately; with ?after=<cursor> waits for newer events.
+    While EVENTS_HELD requests are already waiting it answers at once, and
+    'retry_ms' tells the client how long to wait before polling again.
+    """
+    folders = _event_folders()
+    after = request.args.get('after')
+    if after is None:
+        return jsonify({'cursor': event_broker.cursor(), 'events': [], 'snapshot': _event_snapshot(folders),
+                        'retry_ms': 0})
+    try:
+        after = int(after)
+    except ValueError:
+        abort(400)
+    if not event_slots.acquire(blocking=False):
+        events, cursor = event_broker.wait(after, folders, timeout=0)
+        return jsonify({'cursor': cursor, 'events': events, 'retry_ms': EVENTS_BUSY_RETRY * 1000})
+    try:
+        events, cursor = event_broker.wait(after, folders, timeout=EVENTS_POLL_TIMEOUT)
+    finally:
+        event_slots.release()
+    return jsonify({'cursor': cursor, 'events': events, 'retry_ms': 0})
 
 
 @app.route('/files/preview')
 def preview_file():
+    """
+    Render one page of a batch artifact as HTML. Logs, SRTs and plain text
+    are paged by byte offset (?offset=&limit= lines/cues), mapping files by
+    row, so a preview reads only what it shows. Pages end with a
+    .preview-more marker carrying the next offset.
+    """
     raw = urllib.parse.unquote(request.args.get('path', ''))
-    safe = pathlib.Path(DATA_DIR) / pathlib.Path(raw)
-    try:
-        safe = safe.resolve().relative_to(DATA_DIR)
-    except Exception:
-        abort(404)
-    full = pathlib.Path(DATA_DIR) / safe
-    if not full.is_file():
+    full = _resolve_data_path(raw)
+    if full is None or not full.is_file():
         abort(404)
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit  = min(max(int(request.args.get('limit', PREVIEW_LIMIT)), 1), PREVIEW_LIMIT_MAX)
+    except ValueError:
+        abort(400)
 
     ext = full.suffix.lower()
     if full.name == 'request.json':
         return preview_request(full)
     if full.name.endswith('chunks_mapping.json'):
-        return preview_chunks_mapping(full)
-    if full.name.endswith('text_mappings.json'):
-        return preview_text_mappings(full)
-    if ext == '.srt':
-        return preview_srt(full)
-    if ext == '.log':
-        return preview_log(full)
-    return Markup(f"<pre>{full.read_text('utf-8')}</pre>")
+        rows = preview_chunks_mapping(full, offset, limit)
+    elif full.name.endswith('text_mappings.json'):
+        rows = preview_text_mappings(full, offset, limit)
+    elif ext in ('.srt', '.vtt'):
+        rows = preview_srt(full, offset, limit)
+    elif ext == '.log':
+        rows = preview_log(full, offset, limit)
+    else:
+        rows = preview_text(full, offset, limit)
+    return _stream_response(rows, 'text/html; charset=utf-8')
+
+
+def _resolve_data_path(raw):
+    """
+    Map a user-supplied path to a file under DATA_DIR, or None if it escapes.
+    Paths into a batch that has been archived resolve to the same file in
+    its unpacked copy (see utils.archive.restore).
+    """
+    try:
+        safe = (pathlib.Path(DATA_DIR) / pathlib.Path(raw)).resolve().relative_to(pathlib.Path(DATA_DIR).resolve())
+    except Exception:
+        return None
+    full = pathlib.Path(DATA_DIR) / safe
+    if safe.parts and not (pathlib.Path(DATA_DIR) / safe.parts[0]).exists():
+        restored = archive.restore(DATA_DIR, safe.parts[0])
+        if restored:
+            return pathlib.Path(restored).joinpath(*safe.parts[1:])
+    return full
+
+
+def _batch_of(full):
+    """
+    (batch folder, path inside it) for a resolved path, live or unpacked.
+    """
+    rel = full.relative_to(DATA_DIR).parts
+    if rel[:2] == (archive.ARCHIVE_DIR, archive.RESTORE_DIR):
+        return pathlib.Path(DATA_DIR).joinpath(*rel[:3]), rel[3:]
+    return pathlib.Path(DATA_DIR).joinpath(*rel[:1]), rel[1:]
+
+
+def _accepts_gzip():
+    return 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+
+
+def _gzip_chunks(chunks):
+    """
+    Gzip an iterable of str/bytes on the fly, emitting compressed data in
+    blocks of roughly GZIP_BLOCK bytes of input.
+    """
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31)
+    pending = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        out = comp.compress(chunk)
+        pending += len(chunk)
+        if pending >= GZIP_BLOCK:
+            out += comp.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if out:
+            yield out
+    yield comp.flush()
+
+
+def _stream_response(chunks, mimetype, headers=None):
+    headers = dict(headers or {})
+    headers['Vary'] = 'Accept-Encoding'
+    if _accepts_gzip():
+        headers['Content-Encoding'] = 'gzip'
+        chunks = _gzip_chunks(chunks)
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+
+def _read_lines(path, offset, limit):
+    """
+    Yield up to `limit` decoded lines starting at byte `offset`, then the
+    byte offset of the next unread line (or None at end of file).
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for _ in range(limit):
+            line = f.readline()
+            if not line:
+                yield None
+                return
+            yield line.decode('utf-8', errors='replace').rstrip('\r\n')
+        pos = f.tell()
+        yield pos if f.read(1) else None
+
+
+def _more(next_offset):
+    if next_offset is None:
+        return ''
+    return f'<div class="preview-more" data-offset="{next_offset}">Load more…</div>'
 
 
 # ─── Preview helpers ─────────────────────────────────────────────────────────
 def preview_request(path):
-    data = json.load(open(path, 'r', encoding='utf-8'))
-    html = '<ul class="batch-meta">'
-    html += f"<li>Audio Filename: {data.get('audio_filename')}</li>"
-    html += f"<li>Language: {data.get('lang_key')}</li>"
-    html += f"<li>Sent Time: {data.get('sent_time')}</li>"
-    html += '</ul><table class="batch-table"><tr><th>Stage</th><th>Status</th><th>Timestamp</th></tr>'
+    data = load_request(os.path.dirname(path))
+    parts = [
+        '<ul class="batch-meta">',
+        f"<li>Audio Filename: {Markup.escape(data.get('audio_filename'))}</li>",
+        f"<li>Language: {Markup.escape(data.get('lang_key'))}</li>",
+    ]
+    detected = data.get('detected_lang')
+    if detected:
+        parts.append(f"<li>Detected: {Markup.escape(detected.get('language'))} "
+                     f"(p={detected.get('probability')}) → {Markup.escape(detected.get('lang_key'))}</li>")
+    parts += [
+        f"<li>Sent Time: {data.get('sent_time')}</li>",
+        '</ul><table class="batch-table"><tr><th>Stage</th><th>Status</th><th>Timestamp</th></tr>',
+    ]
     for key, label in {
         'converterCompleted': 'Conversion',
         'chunkerCompleted':   'Chunking',
@@ -230,86 +590,114 @@ def preview_request(path):
         ts    = data.get('tasks', {}).get(key)
         emoji = '✅' if ts else '⌛'
         disp  = ts or 'Pending'
-        html += f"<tr><td>{label}</td><td>{emoji}</td><td>{disp}</td></tr>"
-    html += '</table>'
-    return Markup(html)
+        parts.append(f"<tr><td>{label}</td><td>{emoji}</td><td>{disp}</td></tr>")
+    parts.append('</table>')
+    return Markup(''.join(parts))
 
-def preview_chunks_mapping(path):
+def preview_chunks_mapping(path, offset, limit):
     chunks = json.load(open(path, 'r', encoding='utf-8'))
     rows   = chunks if isinstance(chunks, list) else chunks.get('chunks', [])
-    # Attempt to merge text_mapping.json
-    tm_path = path.parent / 'text_mapping.json'
-    text_map = {}
-    if tm_path.exists():
-        tms = json.load(open(tm_path, 'r', encoding='utf-8'))
-        for m in (tms if isinstance(tms, list) else tms.get('mappings', [])):
-            key = m.get('audio_file','').replace('\\','/')
-            text_map[key] = m.get('text_file','')
-    html = '<table class="mapping-table"><tr><th>Start</th><th>End</th><th>Chunk File</th><th>Text File</th></tr>'
-    for c in rows:
-        s = c.get('start_ms') if c.get('start_ms') is not None else c.get('start')
-        e = c.get('end_ms')   if c.get('end_ms')   is not None else c.get('end')
-        start_fmt = format_duration(s) if s is not None else ''
-        end_fmt   = format_duration(e) if e is not None else ''
-        cf = c.get('chunk_file','')
-        tf = text_map.get(cf.replace('\\','/'), '')
-        html += (
-            '<tr>'
-            f'<td>{start_fmt}</td>'
-            f'<td>{end_fmt}</td>'
-            f'<td>{Markup.escape(cf)}</td>'
-            f'<td>{Markup.escape(tf)}</td>'
-            '</tr>'
-        )
-    html += '</table>'
-    return Markup(html)
+    # Merge transcripts from the batch's results.jsonl, reading only the
+    # records of the rows on this page
+    batch_dir = str(path.parent.parent)
+    try:
+        index = index_results(batch_dir, int(path.parent.name.split('_')[1]))
+    except (IndexError, ValueError):
+        index = {}
+    results = open(results_path(batch_dir), 'rb') if index else None
+    yield '<table class="mapping-table"><tr><th>Start</th><th>End</th><th>Chunk File</th><th>Speech</th><th>Text</th></tr>'
+    try:
+        for c in rows[offset:offset + limit]:
+            s = c.get('start_ms') if c.get('start_ms') is not None else c.get('start')
+            e = c.get('end_ms')   if c.get('end_ms')   is not None else c.get('end')
+            start_fmt = format_duration(s) if s is not None else ''
+            end_fmt   = format_duration(e) if e is not None else ''
+            cf = c.get('chunk_file','')
+            pos = lookup(index, cf)
+            text = read_at(results, pos).get('text', '') if pos is not None else ''
+            speech = '' if 'speech' not in c else ('🗣️' if c['speech'] else f"🔇 {c.get('vad_score', '')}")
+            yield (
+                '<tr>'
+                f'<td>{start_fmt}</td>'
+                f'<td>{end_fmt}</td>'
+                f'<td>{Markup.escape(cf)}</td>'
+                f'<td>{speech}</td>'
+                f'<td>{Markup.escape(text)}</td>'
+                '</tr>'
+            )
+    finally:
+        if results:
+            results.close()
+    yield '</table>'
+    yield _more(offset + limit if offset + limit < len(rows) else None)
 
-def preview_text_mappings(path):
+def preview_text_mappings(path, offset, limit):
     mappings = json.load(open(path, 'r', encoding='utf-8'))
     rows     = mappings if isinstance(mappings, list) else mappings.get('mappings', [])
-    html = '<table class="mapping-table"><tr><th>Audio File</th><th>Text File</th></tr>'
-    for m in rows:
+    yield '<table class="mapping-table"><tr><th>Audio File</th><th>Text File</th></tr>'
+    for m in rows[offset:offset + limit]:
         af = m.get('audio_file','')
         tf = m.get('text_file','')
-        html += (
+        yield (
             '<tr>'
             f'<td>{Markup.escape(af)}</td>'
             f'<td>{Markup.escape(tf)}</td>'
             '</tr>'
         )
-    html += '</table>'
-    return Markup(html)
-
-def preview_srt(path):
-    text = path.read_text('utf-8')
-    blocks = text.strip().split('\n\n')
-    html = '<table class="mapping-table"><tr><th>#</th><th>Start</th><th>End</th><th>Text</th></tr>'
-    for block in blocks:
-        lines = block.strip().splitlines()
-        if len(lines) >= 2:
-            idx, times = lines[0], lines[1]
-            raw_start, raw_end = times.split('-->')
-            start = raw_start.strip().split(',')[0]
-            end   = raw_end.strip().split(',')[0]
-            content = ' '.join(lines[2:]).strip()
-            html += (
-                '<tr>'
-                f'<td>{idx}</td>'
-                f'<td>{start}</td>'
-                f'<td>{end}</td>'
-                f'<td>{Markup.escape(content)}</td>'
-                '</tr>'
-            )
-    html += '</table>'
-    return Markup(html)
+    yield '</table>'
+    yield _more(offset + limit if offset + limit < len(rows) else None)
 
-def preview_log(path):
-    lines = path.read_text('utf-8').splitlines()
-    html = '<table class="mapping-table"><tr><th>Date</th><th>Time</th><th>Level</th><th>Message</th></tr>'
+def preview_srt(path, offset, limit):
+    """
+    `limit` counts cues; the next offset always falls on a cue boundary.
+    """
+    yield '<table class="mapping-table"><tr><th>#</th><th>Start</th><th>End</th><th>Text</th></tr>'
+    next_offset = None
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        cues = 0
+        block = []
+        while cues < limit:
+            raw = f.readline()
+            line = raw.decode('utf-8', errors='replace').strip()
+            if line:
+                block.append(line)
+                continue
+            if len(block) >= 2 and '-->' in block[1]:
+                idx, times = block[0], block[1]
+                raw_start, raw_end = times.split('-->')
+                start = raw_start.strip().split(',')[0]
+                end   = raw_end.strip().split(',')[0]
+                content = ' '.join(block[2:]).strip()
+                yield (
+                    '<tr>'
+                    f'<td>{Markup.escape(idx)}</td>'
+                    f'<td>{Markup.escape(start)}</td>'
+                    f'<td>{Markup.escape(end)}</td>'
+                    f'<td>{Markup.escape(content)}</td>'
+                    '</tr>'
+                )
+                cues += 1
+            block = []
+            if not raw:
+                break
+        else:
+            pos = f.tell()
+            if f.read(1):
+                next_offset = pos
+    yield '</table>'
+    yield _more(next_offset)
+
+def preview_log(path, offset, limit):
+    yield '<table class="mapping-table"><tr><th>Date</th><th>Time</th><th>Level</th><th>Message</th></tr>'
+    lines = _read_lines(path, offset, limit)
     for line in lines:
+        if not isinstance(line, str):
+            next_offset = line
+            break
         m = LOG_RE.match(line)
         if m:
-            html += (
+            yield (
                 '<tr>'
                 f'<td>{m.group("date")}</td>'
                 f'<td>{m.group("time")}</td>'
@@ -318,30 +706,59 @@ def preview_log(path):
                 '</tr>'
             )
         else:
-            html += f'<tr><td colspan=4>{Markup.escape(line)}</td></tr>'
-    html += '</table>'
-    return Markup(html)
+            yield f'<tr><td colspan=4>{Markup.escape(line)}</td></tr>'
+    yield '</table>'
+    yield _more(next_offset)
+
+def preview_text(path, offset, limit):
+    yield '<pre>'
+    for line in _read_lines(path, offset, limit):
+        if not isinstance(line, str):
+            next_offset = line
+            break
+        yield f'{Markup.escape(line)}\n'
+    yield '</pre>'
+    yield _more(next_offset)
 
 # ─── Download endpoint ────────────────────────────────────────────────────────
 @app.route('/download/<path:subpath>')
 def download_file(subpath):
-    safe = pathlib.Path(DATA_DIR) / pathlib.Path(subpath)
-    try:
-        safe = safe.resolve().relative_to(DATA_DIR)
-    except Exception:
+    """
+    Serve a batch artifact. Range requests are honoured (resumable
+    downloads, seeking in audio); whole-file requests for text artifacts
+    are gzipped on the fly when the client accepts it.
+    """
+    full = _resolve_data_path(subpath)
+    if full is None:
         abort(404)
-    full = pathlib.Path(DATA_DIR) / safe
 
-    # Only allow download once all tasks are complete
-    req = json.load(open(full.parent / 'request.json', 'r', encoding='utf-8'))
+    # Only allow download once all tasks are complete. The batch folder is
+    # the first path component, however deep the requested file sits.
+    batch_dir, inner = _batch_of(full)
+    if not inner or not (batch_dir / 'request.json').is_file():
+        abort(404)
+    req = load_request(str(batch_dir))
     if not all(req.get('tasks', {}).values()):
         abort(403)
 
     if not full.is_file():
         abort(404)
 
-    return send_file(str(full), as_attachment=True)
+    if full.suffix.lower() in TEXT_ARTIFACTS and 'Range' not in request.headers and _accepts_gzip():
+        # Opened before the response starts, so the stream survives the
+        # unpacked copy being pruned
+        source = open(full, 'rb')
+        def chunks():
+            with source as f:
+                while block := f.read(GZIP_BLOCK):
+                    yield block
+        return _stream_response(
+            chunks(), mimetypes.guess_type(full.name)[0] or 'text/plain',
+            {'Content-Disposition': f'attachment; filename="{full.name}"'}
+        )
+    return send_file(str(full), as_attachment=True, conditional=True)
 
 # ─── Run server ──────────────────────────────────────────────────────────────
 if __name__ == '__main__':
+    # Development server; see wsgi.py for production serving
     app.run(debug=True, port=6001)
@@ -1,16 +1,20 @@
 import os
+import re
+import math
 import time
 import json
 import logging
+import textwrap
 from logging import LoggerAdapter
 
-from utils.log_utils import setup_logger
+from utils.log_utils import setup_logger, close_logger
 from utils.atomic_queue import AtomicQueue
 from utils.request_utils import load_request, update_task_timestamp
+from utils.results import index_results, lookup, read_at, results_path
 
 # ── Configuration ────────────────────────────────────────────────────────────
 BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR      = os.path.join(BASE_DIR, 'data')
+DATA_DIR      = os.environ.get('TRANSCRIBE_DATA_DIR') or os.path.join(BASE_DIR, 'data')
 POLL_INTERVAL = 10  # seconds between scans
 
 SCRIPT_NAME    = os.path.splitext(os.path.basename(__file__))[0]  # "assembler"
@@ -21,6 +25,19 @@ CLEANER_QUEUE  = AtomicQueue(os.path.join(DATA_DIR, 'cleaner.queue'))
 open(QUEUE_PATH, 'a').close()
 open(CLEANER_QUEUE.path, 'a').close()
 
+# Subtitle cues built from word timings (chunks without them get one cue)
+MAX_LINE_CHARS = 42       # characters per subtitle line
+MAX_CUE_LINES  = 2
+MAX_CUE_MS     = 6_000    # longest a cue stays on screen
+SENTENCE_ENDS  = ('.', '?', '!', '。', '？', '！')
+
+# Seams between chunks that overlap (forced cuts, see chunker.OVERLAP_MS):
+# the repeated text is found as the longest common run of words between
+# the end of one chunk and the start of the next
+SEAM_WORDS_PER_S = 5      # generous speech rate, sizes the search window
+SEAM_MIN_WORDS   = 4      # window floor
+SEAM_MIN_RUN     = 2      # shorter matches are treated as coincidence
+
 queue       = AtomicQueue(QUEUE_PATH)
 root_logger = setup_logger(
     f"{SCRIPT_NAME}_root",
@@ -44,6 +61,230 @@ def format_srt_timestamp(ms: int) -> str:
     return f"{h:02d}:{m:02d}:{s:02d},{ms_rem:03d}"
 
 
+def format_vtt_timestamp(ms: int) -> str:
+    return format_srt_timestamp(ms).replace(',', '.')
+
+
+def build_cues(words: list[dict], offset_ms: int, end_ms: int) -> list[dict]:
+    """
+    Group timed words into cues of at most MAX_CUE_LINES × MAX_LINE_CHARS
+    characters and MAX_CUE_MS, also breaking after sentence-ending
+    punctuation. Word times are seconds from `offset_ms`; cues never run
+    past `end_ms`. Returns [{'start_ms', 'end_ms', 'text'}].
+    """
+    max_chars = MAX_LINE_CHARS * MAX_CUE_LINES
+    cues, current = [], []
+
+    def flush():
+        if current:
+            text  = ' '.join(w['word'] for w in current)
+            start = offset_ms + int(current[0]['start'] * 1000)
+            cues.append({
+                'start_ms': start,
+                'end_ms':   max(start, min(end_ms, offset_ms + int(current[-1]['end'] * 1000))),
+                'text':     '\n'.join(textwrap.wrap(text, MAX_LINE_CHARS)) or text,
+            })
+            current.clear()
+
+    for word in words:
+        if current:
+            chars = sum(len(w['word']) + 1 for w in current) + len(word['word'])
+            if chars > max_chars or (word['end'] - current[0]['start']) * 1000 > MAX_CUE_MS:
+                flush()
+        current.append(word)
+        if word['word'].endswith(SENTENCE_ENDS):
+            flush()
+    flush()
+    # A cue ends no later than the next one starts
+    for cue, nxt in zip(cues, cues[1:]):
+        cue['end_ms'] = max(cue['start_ms'], min(cue['end_ms'], nxt['start_ms']))
+    return cues
+
+
+def _norm(word: str) -> str:
+    return re.sub(r'[^\w]', '', word.lower())
+
+
+def longest_common_run(left: list[str], right: list[str]) -> tuple[int, int, int]:
+    """
+    Longest run of equal (normalized) words in `left` and `right`.
+    Returns (end in left, end in right, length), ends exclusive.
+    """
+    a, b = [_norm(w) for w in left], [_norm(w) for w in right]
+    best = (0, 0, 0)
+    prev = [0] * (len(b) + 1)
+    for i in range(1, len(a) + 1):
+        row = [0] * (len(b) + 1)
+        for j in range(1, len(b) + 1):
+            if a[i - 1] and a[i - 1] == b[j - 1]:
+                row[j] = prev[j - 1] + 1
+                if row[j] > best[2]:
+                    best = (i, j, row[j])
+        prev = row
+    return best
+
+
+def _tokens(item: dict) -> list[str]:
+    return [w['word'] for w in item['words']] if item['words'] else item['text'].split()
+
+
+def _keep(item: dict, start: int, end: int | None) -> None:
+    if item['words']:
+        item['words'] = item['words'][start:end]
+        item['text'] = ' '.join(w['word'] for w in item['words'])
+    else:
+        item['text'] = ' '.join(item['text'].split()[start:end])
+
+
+def trim_seam(prev: dict, cur: dict) -> int:
+    """
+    Remove the text `cur` repeats from `prev` across an overlapping cut:
+    `prev` keeps everything up to the end of the common run, `cur` resumes
+    right after it, so the clipped words on either side of the cut go too.
+    Returns the number of repeated words removed (0 if no seam was found).
+    """
+    window = SEAM_MIN_WORDS + math.ceil(cur['overlap_ms'] / 1000 * SEAM_WORDS_PER_S)
+    left, right = _tokens(prev), _tokens(cur)
+    tail = left[-window:]
+    end_left, end_right, length = longest_common_run(tail, right[:window])
+    if length < SEAM_MIN_RUN:
+        return 0
+    _keep(prev, 0, len(left) - len(tail) + end_left)
+    _keep(cur, end_right, None)
+    return length
+
+
+class OutputWriter:
+    """
+    Writes one segment's TXT, SRT, VTT and JSON outputs as chunks come in,
+    so memory stays bounded by a single chunk whatever the transcript
+    length. Files are written under a .tmp name and renamed into place by
+    close(), so readers never see a half-written result.
+    """
+    FORMATS = ('txt', 'srt', 'vtt', 'json')
+
+    def __init__(self, out_dir: str, stem: str):
+        self.paths = {fmt: os.path.join(out_dir, f"{stem}.{fmt}") for fmt in self.FORMATS}
+        self.files = {fmt: open(path + '.tmp', 'w', encoding='utf-8') for fmt, path in self.paths.items()}
+        self.lines = 0
+        self.cues  = 0
+        self.files['vtt'].write("WEBVTT\n\n")
+        self.files['json'].write("[")
+
+    def write(self, item: dict, cues: list[dict]) -> None:
+        # Chunks skipped as silence, or trimmed away at a seam, leave no
+        # blank line or empty cue
+        if not item['text'].strip():
+            return
+        self.files['txt'].write(("\n" if self.lines else "") + item['text'])
+        record = {'start_ms': item['start_ms'] + item['overlap_ms'], 'end_ms': item['end_ms'], 'text': item['text']}
+        if item['words']:
+            record['words'] = [{'word': w['word'],
+                                'start_ms': item['start_ms'] + int(w['start'] * 1000),
+                                'end_ms':   item['start_ms'] + int(w['end'] * 1000)} for w in item['words']]
+        self.files['json'].write(("," if self.lines else "") + "\n" + json.dumps(record, ensure_ascii=False))
+        self.lines += 1
+        for cue in cues:
+            self.cues += 1
+            self.files['srt'].write(f"{self.cues}\n"
+                                    f"{format_srt_timestamp(cue['start_ms'])} --> {format_srt_timestamp(cue['end_ms'])}\n"
+                                    f"{cue['text']}\n\n")
+            self.files['vtt'].write(f"{self.cues}\n"
+                                    f"{format_vtt_timestamp(cue['start_ms'])} --> {format_vtt_timestamp(cue['end_ms'])}\n"
+                                    f"{cue['text']}\n\n")
+
+    def close(self) -> None:
+        self.files['json'].write("\n]\n")
+        for fmt, f in self.files.items():
+            f.close()
+            os.replace(self.paths[fmt] + '.tmp', self.paths[fmt])
+
+    def abort(self) -> None:
+        for fmt, f in self.files.items():
+            f.close()
+            os.remove(self.paths[fmt] + '.tmp')
+
+
+def segment_base_ms(idx: int, segments_info: list[dict]) -> int:
+    raw_start = ''
+    # segment_0 is the whole file (no user segments)
+    if 0 < idx <= len(segments_info):
+        raw_start = segments_info[idx - 1].get('start', '').strip()
+    h, m, s = map(int, (raw_start or '00:00:00').split(':'))
+    return (h * 3600 + m * 60 + s) * 1000
+
+
+def iter_chunks(subfolder: str, subseg: str, base_ms: int, adapter: LoggerAdapter):
+    """
+    Yield a segment's transcribed chunks in time order as
+    {'text', 'words', 'start_ms', 'end_ms', 'overlap_ms', 'follows'}. The
+    batch's results.jsonl is indexed once (chunk -> byte offset) and each
+    record read with a single seek, so only one chunk is held at a time.
+    'follows' is False after a gap (non-speech or untranscribed chunk),
+    where no seam needs trimming.
+    """
+    with open(os.path.join(subseg, 'chunks_mapping.json'), 'r', encoding='utf-8') as cf:
+        chunks_map = json.load(cf)
+    index = index_results(subfolder, int(os.path.basename(subseg).split('_')[1]))
+    if not index:
+        adapter.warning("No transcription results for %s", os.path.basename(subseg))
+        return
+    adapter.debug("Indexed %d results for %s", len(index), os.path.basename(subseg))
+
+    follows = False
+    with open(results_path(subfolder), 'rb') as rf:
+        for entry in sorted(chunks_map, key=lambda x: x.get('start_ms', 0)):
+            audio_key = entry['chunk_file']
+            if not entry.get('speech', True):
+                adapter.debug("Non-speech chunk %s, no cue emitted", audio_key)
+                follows = False
+                continue
+
+            offset = lookup(index, audio_key)
+            if offset is None:
+                adapter.warning("No transcription result for %s, skipping", audio_key)
+                follows = False
+                continue
+            record = read_at(rf, offset)
+
+            yield {
+                'text':       record.get('text', '').strip(),
+                'words':      list(record.get('words') or []),
+                'start_ms':   base_ms + entry.get('start_ms', 0),
+                'end_ms':     base_ms + entry.get('end_ms', 0),
+                'overlap_ms': entry.get('overlap_ms', 0),
+                'follows':    follows,
+            }
+            follows = True
+
+
+def item_cues(item: dict) -> list[dict]:
+    if not item['text'].strip():
+        return []
+    if item['words']:
+        return build_cues(item['words'], item['start_ms'], item['end_ms'])
+    # The overlap was already covered by the previous chunk's cue
+    return [{'start_ms': item['start_ms'] + item['overlap_ms'], 'end_ms': item['end_ms'], 'text': item['text']}]
+
+
+def assemble_segment(chunks, writer: OutputWriter, adapter: LoggerAdapter) -> None:
+    """
+    Stream `chunks` into `writer`, holding back one chunk so the seam with
+    the next one can be trimmed on both sides before it is written.
+    """
+    pending = None
+    for item in chunks:
+        if pending is not None and item['overlap_ms'] and item['follows']:
+            removed = trim_seam(pending, item)
+            adapter.info("Seam at %d ms: %s", item['start_ms'],
+                         f"removed {removed} repeated words" if removed else "no repeated words found")
+        if pending is not None:
+            writer.write(pending, item_cues(pending))
+        pending = item
+    if pending is not None:
+        writer.write(pending, item_cues(pending))
+
+
 def process_folder(batch_name: str):
     subfolder = os.path.join(DATA_DIR, batch_name)
     batch_log = os.path.join(subfolder, f"{batch_name}.log")
@@ -69,81 +310,23 @@ def process_folder(batch_name: str):
         idx = int(seg.split('_')[1])
         adapter.extra['seg'] = idx
         subseg = os.path.join(subfolder, seg)
-        adapter.info("Processing segment %d", idx)
-
-        # Determine base timestamp
-        raw_start = ''
-        if idx - 1 < len(segments_info):
-            raw_start = segments_info[idx - 1].get('start', '').strip()
-        start_ts = raw_start or '00:00:00'
-        h, m, s = map(int, start_ts.split(':'))
-        base_ms = (h * 3600 + m * 60 + s) * 1000
-        adapter.info("Base timestamp for segment %d: %s (%d ms)", idx, start_ts, base_ms)
-
-        # Load mappings
-        chunks_map_path = os.path.join(subseg, 'chunks_mapping.json')
-        text_map_path   = os.path.join(subseg, 'text_mapping.json')
-        with open(chunks_map_path, 'r', encoding='utf-8') as cf:
-            chunks_map = json.load(cf)
-        with open(text_map_path, 'r', encoding='utf-8') as tf:
-            text_map = json.load(tf)
-
-        text_lookup = {os.path.normpath(e['audio_file']): e['text_file'] for e in text_map}
-
-        # Prepare output
+        base_ms = segment_base_ms(idx, segments_info)
+        adapter.info("Processing segment %d, base timestamp %s", idx, format_hms(base_ms // 1000))
+
         out_dir = os.path.join(subseg, 'assembled_result')
         os.makedirs(out_dir, exist_ok=True)
+        writer = OutputWriter(out_dir, f"{batch_name}_{idx}")
+        try:
+            assemble_segment(iter_chunks(subfolder, subseg, base_ms, adapter), writer, adapter)
+        except Exception:
+            writer.abort()
+            raise
+        writer.close()
+        adapter.info("Wrote %s (%d lines, %d cues) to %s",
+                     '/'.join(OutputWriter.FORMATS), writer.lines, writer.cues, out_dir)
 
-        transcript = []
-        srt_entries = []
-        counter = 1
-
-        for entry in sorted(chunks_map, key=lambda x: x.get('start_ms', 0)):
-            audio_key = os.path.normpath(entry['chunk_file'])
-            start_abs = base_ms + entry.get('start_ms', 0)
-            end_abs   = base_ms + entry.get('end_ms', 0)
-
-            txt_rel = text_lookup.get(audio_key)
-            if not txt_rel:
-                adapter.warning("No text mapping for %s, skipping", audio_key)
-                continue
-
-            txt_path = os.path.join(subfolder, txt_rel)
-            with open(txt_path, 'r', encoding='utf-8') as tf:
-                raw_text = tf.read()
-                text = raw_text.strip()
-            adapter.info("Loaded text %s (%d chars)", os.path.basename(txt_path), len(text))
-
-            time_label = format_hms(start_abs // 1000)
-            transcript.append(f"{text}")
-            srt_entries.append({
-                'idx': counter,
-                'start': format_srt_timestamp(start_abs),
-                'end': format_srt_timestamp(end_abs),
-                'text': text
-            })
-            adapter.debug("Appended SRT entry %d: %s --> %s", counter, srt_entries[-1]['start'], srt_entries[-1]['end'])
-            counter += 1
-
-        # Write transcript .txt
-        txt_out = os.path.join(out_dir, f"{batch_name}_{idx}.txt")
-        with open(txt_out, 'w', encoding='utf-8') as tf:
-            tf.write("\n".join(transcript))
-        adapter.info("Wrote assembled transcript (%d lines) to %s", len(transcript), txt_out)
-
-        # Write .srt
-        srt_out = os.path.join(out_dir, f"{batch_name}_{idx}.srt")
-        with open(srt_out, 'w', encoding='utf-8') as sf:
-            for item in srt_entries:
-                sf.write(f"{item['idx']}\n")
-                sf.write(f"{item['start']} --> {item['end']}\n")
-                sf.write(f"{item['text']}\n\n")
-        adapter.info("Wrote SRT (%d entries) to %s", len(srt_entries), srt_out)
-
-    # Stamp completion and enqueue cleaning
     update_task_timestamp(subfolder, 'assemblerCompleted')
-    CLEANER_QUEUE.enqueue(batch_name)
-    root_logger.info("Stamped assemblerCompleted and enqueued batch '%s' for cleaning", batch_name)
+    root_logger.info("Stamped assemblerCompleted for batch '%s'", batch_name)
 
 
 def scan_and_process():
@@ -156,12 +339,16 @@ def scan_and_process():
     for batch in batches:
         try:
             process_folder(batch)
+            CLEANER_QUEUE.enqueue(batch)
+            root_logger.info("Enqueued batch '%s' for cleaning", batch)
         except Exception as e:
             root_logger.error("Error assembling %s: %s", batch, e, exc_info=True)
             failures.append(batch)
+        finally:
+            close_logger(batch)
 
     if failures:
-        queue.replace(failures)
+        queue.extend(failures)
 
 
 def main():
@@ -11,13 +11,15 @@ import pandas as pd
 from pydub import AudioSegment
 from pydub.silence import detect_silence
 
-from utils.log_utils import setup_logger
+from utils.log_utils import setup_logger, close_logger
 from utils.atomic_queue import AtomicQueue
 from utils.request_utils import load_request, update_task_timestamp
+from utils.vad import score_chunk
+from utils import backlog
 
 # ── Configuration ────────────────────────────────────────────────────────────
 BASE_DIR          = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR          = os.path.join(BASE_DIR, 'data')
+DATA_DIR          = os.environ.get('TRANSCRIBE_DATA_DIR') or os.path.join(BASE_DIR, 'data')
 POLL_INTERVAL     = 10  # seconds between scans
 
 SCRIPT_NAME       = os.path.splitext(os.path.basename(__file__))[0]  # "chunker"
@@ -34,11 +36,13 @@ next_queue  = AtomicQueue(NEXT_QUEUE_PATH)
 root_logger = setup_logger(f"{SCRIPT_NAME}_root", os.path.join(DATA_DIR, f"{SCRIPT_NAME}.log"), level=logging.INFO)
 
 # Chunking parameters
-MAX_SEGMENT_LENGTH = 10_000    # 30 seconds in ms
+MAX_SEGMENT_LENGTH = 28_000    # 28 seconds in ms, inside Whisper's 30 s window
+OVERLAP_MS         = 2_000     # audio repeated across a forced (no-silence) cut
 INITIAL_SILENCE    = 500       # 0.9 seconds
 SILENCE_THRESH     = -40       # dBFS threshold
 MIN_SILENCE_LIMIT  = 100       # 0.1 seconds
 TIME_FORMAT        = '%H:%M:%S'
+VAD_ENABLED        = True      # score chunks and mark non-speech ones for skipping
 
 def seconds_to_hms(seconds: float, base_time: str) -> str:
     base = datetime.strptime(base_time, TIME_FORMAT)
@@ -70,10 +74,19 @@ def find_last_silence(
     return 0
 
 
-def split_audio_by_silence(sound: AudioSegment, adapter: LoggerAdapter):
+def split_audio_by_silence(sound: AudioSegment, adapter: LoggerAdapter, overlap_ms: int = OVERLAP_MS):
+    """
+    Cut `sound` at the last silence inside each MAX_SEGMENT_LENGTH window.
+    Where there is none the cut is forced, and the next chunk starts
+    `overlap_ms` earlier so a word split by the cut is heard whole in one of
+    the two chunks; the assembler removes the repeated text at the seam.
+    Returns (chunks, times, overlaps): overlaps[i] is how much chunk i
+    repeats of the chunk before it.
+    """
     adapter.info(f"Splitting audio of length {len(sound)} ms")
-    chunks, times = [], []
+    chunks, times, overlaps = [], [], []
     start = 0
+    overlap = 0
     total_len = len(sound)
 
     while start < total_len:
@@ -81,6 +94,7 @@ def split_audio_by_silence(sound: AudioSegment, adapter: LoggerAdapter):
         segment = sound[start:end]
         silence_pos = find_last_silence(segment, adapter=adapter)
 
+        forced = silence_pos == 0 and end < total_len
         if silence_pos == 0 or end == total_len:
             adapter.debug("No intermediate silence or reached end → full chunk used")
             silence_pos = len(segment)
@@ -92,10 +106,14 @@ def split_audio_by_silence(sound: AudioSegment, adapter: LoggerAdapter):
         )
         chunks.append(sound[start:actual_end])
         times.append((start, actual_end))
-        start = actual_end
+        overlaps.append(overlap)
+        overlap = min(overlap_ms, silence_pos // 2) if forced else 0
+        if forced:
+            adapter.info(f"Forced cut, next chunk overlaps by {overlap} ms")
+        start = actual_end - overlap
 
     adapter.info(f"Total chunks created: {len(chunks)}")
-    return chunks, times
+    return chunks, times, overlaps
 
 
 def run_chunking_for_sound(sound: AudioSegment, subfolder: str, logger: logging.Logger, video_start: str, segment_tag: int) -> pd.DataFrame:
@@ -104,24 +122,21 @@ def run_chunking_for_sound(sound: AudioSegment, subfolder: str, logger: logging.
     batch_id = ''.join(random.choices(string.ascii_letters + string.digits, k=12))
 
     adapter.info(f"Batch {batch_id}: starting chunking for segment {segment_tag}")
-    chunks, times = split_audio_by_silence(sound, adapter)
+    chunks, times, overlaps = split_audio_by_silence(sound, adapter)
 
-    # Build DataFrame
+    # Build DataFrame (overlapping chunks share time, so offsets are absolute)
     rows = []
-    current_time = video_start
     for start_ms, end_ms in times:
         real_start = start_ms / 1000.0
         real_end   = end_ms / 1000.0
-        video_end  = seconds_to_hms(real_end - real_start, current_time)
         rows.append({
             'Batch ID': batch_id,
             'Segment': segment_tag,
             'Real Start (s)': real_start,
             'Real End (s)':   real_end,
-            'Video Time Start': current_time,
-            'Video Time End':   video_end
+            'Video Time Start': seconds_to_hms(real_start, video_start),
+            'Video Time End':   seconds_to_hms(real_end, video_start)
         })
-        current_time = video_end
 
     df = pd.DataFrame(rows)
 
@@ -129,6 +144,7 @@ def run_chunking_for_sound(sound: AudioSegment, subfolder: str, logger: logging.
     segment_dir = os.path.join(subfolder, f'segment_{segment_tag}')
     audio_dir   = os.path.join(segment_dir, 'audio_chunks')
     os.makedirs(audio_dir, exist_ok=True)
+    mapping = []
     for i, chunk in enumerate(chunks, start=1):
         adapter.extra['chunk'] = i
         out_path = os.path.join(audio_dir, f'chunk_{i}.wav')
@@ -138,15 +154,25 @@ def run_chunking_for_sound(sound: AudioSegment, subfolder: str, logger: logging.
             f"{seconds_to_hms(times[i-1][0]/1000, video_start)}–{seconds_to_hms(times[i-1][1]/1000, video_start)}]"
         )
 
+        entry = {
+            'chunk_file': f'segment_{segment_tag}/audio_chunks/chunk_{i}.wav',
+            'start_ms':   times[i-1][0],
+            'end_ms':     times[i-1][1],
+        }
+        if overlaps[i-1]:
+            entry['overlap_ms'] = overlaps[i-1]
+        if VAD_ENABLED:
+            entry.update(score_chunk(chunk))
+            if not entry['speech']:
+                adapter.info(f"chunk_{i}.wav marked non-speech (score {entry['vad_score']}, {entry['speech_ms']} ms speech-like)")
+        mapping.append(entry)
+
     # Write mapping
-    mapping = [
-        {'chunk_file': f'segment_{segment_tag}/audio_chunks/chunk_{i}.wav', 'start_ms': s, 'end_ms': e}
-        for i, (s, e) in enumerate(times, start=1)
-    ]
     map_path = os.path.join(segment_dir, 'chunks_mapping.json')
     with open(map_path, 'w', encoding='utf-8') as mf:
         json.dump(mapping, mf, indent=2)
-    adapter.info(f"Wrote chunks_mapping.json for segment {segment_tag} with {len(mapping)} entries")
+    skipped = sum(1 for m in mapping if not m.get('speech', True))
+    adapter.info(f"Wrote chunks_mapping.json for segment {segment_tag} with {len(mapping)} entries ({skipped} non-speech)")
 
     return df
 
@@ -177,30 +203,40 @@ def process_wav(wav_path: str):
         run_chunking_for_sound(sound, subfolder, logger, '00:00:00', 0)
 
     update_task_timestamp(subfolder, 'chunkerCompleted')
-    next_queue.enqueue(batch_name)
-    adapter.info("Stamped chunkerCompleted and enqueued to transcriber")
+    adapter.info("Stamped chunkerCompleted")
+
+
+def chunk_batch(batch_name: str):
+    data     = load_request(os.path.join(DATA_DIR, batch_name))
+    wav_file = os.path.splitext(data['audio_filename'])[0] + '.wav'
+    process_wav(os.path.join(DATA_DIR, batch_name, wav_file))
 
 
 def scan_and_process():
-    batches = queue.pop_all()
+    # Only as many batches as the transcriber has room for (see utils.backlog)
+    take = backlog.intake(DATA_DIR, SCRIPT_NAME)
+    batches = queue.pop_all() if take is None else queue.pop(take)
     if not batches:
-        root_logger.debug("No batches in chunker.queue")
+        if take == 0:
+            root_logger.debug("Holding chunker.queue: transcriber budget is full")
+        else:
+            root_logger.debug("No batches in chunker.queue")
         return
 
     failures = []
     for batch in batches:
         try:
-            data     = load_request(os.path.join(DATA_DIR, batch))
-            original_file = data['audio_filename']
-            wav_file = os.path.splitext(original_file)[0] + '.wav'
-            wav_path = os.path.join(DATA_DIR, batch, wav_file)
-            process_wav(wav_path)
+            chunk_batch(batch)
+            next_queue.enqueue(batch)
+            root_logger.info("Enqueued batch '%s' for transcription", batch)
         except Exception as e:
             root_logger.error(f"Error chunking {batch}: {e}", exc_info=True)
             failures.append(batch)
+        finally:
+            close_logger(batch)
 
     if failures:
-        queue.replace(failures)
+        queue.extend(failures)
 
 
 def main():
@@ -4,18 +4,25 @@ import shutil
 import logging
 from logging import LoggerAdapter
 
-from utils.log_utils import setup_logger
+from utils.log_utils import setup_logger, close_logger
 from utils.atomic_queue import AtomicQueue
 from utils.request_utils import update_task_timestamp
+from utils import archive, uploads
 
 # ── Configuration ────────────────────────────────────────────────────────────
 BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR      = os.path.join(BASE_DIR, 'data')
+DATA_DIR      = os.environ.get('TRANSCRIBE_DATA_DIR') or os.path.join(BASE_DIR, 'data')
 POLL_INTERVAL = 10  # seconds between scans
+# Seconds between compaction passes (archive finished batches, expire old
+# archives); retention settings live in utils/archive.py
+COMPACT_INTERVAL = 300
 
 SCRIPT_NAME   = os.path.splitext(os.path.basename(__file__))[0]  # "cleaner"
 QUEUE_PATH    = os.path.join(DATA_DIR, f"{SCRIPT_NAME}.queue")
 
+# Result and metadata files kept after cleaning; everything else goes
+KEEP_EXTENSIONS = ('.txt', '.srt', '.vtt', '.json', '.jsonl', '.log')
+
 # Ensure queue file exists
 open(QUEUE_PATH, 'a').close()
 
@@ -38,7 +45,8 @@ def process_batch(batch_name: str):
     adapter.info("Starting cleanup for batch: %s", batch_name)
 
     removed_count = 0
-    # 1) Remove audio_chunks and text_chunks under each segment
+    # 1) Remove audio_chunks (and text_chunks, from batches transcribed
+    #    before results.jsonl) under each segment
     for entry in os.listdir(subfolder):
         seg_dir = os.path.join(subfolder, entry)
         if not os.path.isdir(seg_dir) or not entry.startswith('segment_'):
@@ -53,10 +61,10 @@ def process_batch(batch_name: str):
                 except Exception as e:
                     adapter.error("Failed to delete directory %s: %s", dir_path, e, exc_info=True)
 
-    # 2) Recursively delete any files not ending with .txt, .srt, .json, or .log
+    # 2) Recursively delete any files without a KEEP_EXTENSIONS extension
     for root_dir, _, files in os.walk(subfolder):
         for fname in files:
-            if not fname.lower().endswith(('.txt', '.srt', '.json', '.log')):
+            if not fname.lower().endswith(KEEP_EXTENSIONS):
                 file_path = os.path.join(root_dir, fname)
                 try:
                     os.remove(file_path)
@@ -84,15 +92,49 @@ def scan_and_process():
         except Exception as e:
             root_logger.error("Error cleaning batch %s: %s", batch, e, exc_info=True)
             failures.append(batch)
+        finally:
+            close_logger(batch)
 
     if failures:
-        queue.replace(failures)
+        queue.extend(failures)
+
+
+def compact():
+    """
+    Pack batches cleaned more than archive.ARCHIVE_AFTER seconds ago into
+    one zip each, then expire archives by age and total size, delete
+    unfinished batches that stopped making progress, and drop unpacked
+    copies the web app no longer reads and abandoned uploads.
+    """
+    for job in archive.due(DATA_DIR):
+        try:
+            info = archive.archive_batch(DATA_DIR, job['folder'], job['sent_time'])
+            root_logger.info("Archived batch '%s' to %s (%d files, %.1f KB)",
+                             job['folder'], info['path'], info['files'], info['bytes'] / 1024)
+        except Exception as e:
+            root_logger.error("Error archiving batch %s: %s", job['folder'], e, exc_info=True)
+    for entry in archive.expire(DATA_DIR):
+        root_logger.info("Expired archive %s (sent %s)", entry['path'], entry['sent_time'])
+    for folder in archive.expire_stale(DATA_DIR):
+        root_logger.warning("Deleted unfinished batch '%s', no progress for %d days", folder, archive.STALE_DAYS)
+    pruned = archive.prune_restored(DATA_DIR)
+    if pruned:
+        root_logger.info("Removed %d unpacked archive copies", pruned)
+    for folder in uploads.expire_stale(DATA_DIR):
+        root_logger.info("Removed upload '%s', no part received for %ds", folder, uploads.UPLOAD_TTL)
 
 
 def main():
     root_logger.info(f"Cleaner starting, polling every {POLL_INTERVAL}s")
+    last_compact = 0.0
     while True:
         scan_and_process()
+        if time.monotonic() - last_compact >= COMPACT_INTERVAL:
+            try:
+                compact()
+            except Exception as e:
+                root_logger.error("Compaction failed: %s", e, exc_info=True)
+            last_compact = time.monotonic()
         time.sleep(POLL_INTERVAL)
 
 
@@ -6,11 +6,12 @@ from pydub import AudioSegment
 
 from utils.log_utils import setup_logger
 from utils.atomic_queue import AtomicQueue
-from utils.request_utils import load_request, update_task_timestamp
+from utils.request_utils import load_request, update_request, update_task_timestamp
+from utils import backlog
 
 # ── Configuration ────────────────────────────────────────────────────────────
 BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR      = os.path.join(BASE_DIR, 'data')
+DATA_DIR      = os.environ.get('TRANSCRIBE_DATA_DIR') or os.path.join(BASE_DIR, 'data')
 POLL_INTERVAL = 10  # seconds between polls
 
 # Determine this script’s name to derive queue/log filenames
@@ -60,6 +61,9 @@ def convert_folder(batch_name: str) -> bool:
         adapter.debug("AudioSegment loaded, exporting to WAV: %s", wav_path)
         audio.export(wav_path, format='wav')
 
+        # 4) Record the duration for backlog reporting
+        update_request(subfolder, lambda data: data.__setitem__('duration_ms', len(audio)))
+
         # 5) Stamp completion
         update_task_timestamp(subfolder, 'converterCompleted')
         adapter.info("Exported WAV to %s and stamped converterCompleted", wav_path)
@@ -73,11 +77,16 @@ def convert_folder(batch_name: str) -> bool:
 
 def scan_and_process():
     """
-    Atomically grab all queued batches, process them, re-queue failures.
+    Atomically grab as many queued batches as the stage budget allows,
+    process them, re-queue failures.
     """
-    batches = queue.pop_all()
+    take = backlog.intake(DATA_DIR, SCRIPT_NAME)
+    batches = queue.pop_all() if take is None else queue.pop(take)
     if not batches:
-        root_logger.debug("No batches in converter.queue at this time")
+        if take == 0:
+            root_logger.debug("Holding converter.queue: downstream budget is full")
+        else:
+            root_logger.debug("No batches in converter.queue at this time")
         return
 
     failures = []
@@ -90,7 +99,7 @@ def scan_and_process():
             failures.append(batch)
 
     if failures:
-        queue.replace(failures)
+        queue.extend(failures)
 
 
 def main():
@@ -0,0 +1,20 @@
+# gunicorn.conf.py
+# Needs gunicorn (pip install gunicorn==23.0.0, the API's pin); not on Windows,
+# use `python wsgi.py` (waitress) there.
+import os
+import multiprocessing
+
+bind         = f"0.0.0.0:{os.environ.get('PORT', '6001')}"
+workers      = int(os.environ.get('TRANSCRIBE_WEB_WORKERS', min(2 * multiprocessing.cpu_count() + 1, 8)))
+# Threads per worker: SSE streams and upload parts each hold one while open.
+# app.py lets live events hold at most a quarter of them
+# (TRANSCRIBE_EVENT_STREAMS); further tabs poll instead
+worker_class = 'gthread'
+threads      = int(os.environ.get('TRANSCRIBE_WEB_THREADS', '16'))
+# Import once in the master (index check, dashboard aggregation) and fork;
+# the SSE broker thread starts lazily, so nothing thread-bound is inherited
+preload_app  = True
+timeout      = 120
+graceful_timeout = 30
+keepalive    = 5
+accesslog    = '-'
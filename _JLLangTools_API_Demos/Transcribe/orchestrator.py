@@ -0,0 +1,282 @@
+"""
+Run all five pipeline stages in one process instead of five polling
+scripts. Each stage gets its own pool of worker threads and an in-memory
+inbox. A finished batch is handed straight to the next stage's inbox, so
+it moves on with no polling delay.
+
+The file queues stay the durable record. A batch is appended to the next
+stage's file queue before it leaves the current one, so a crash or restart
+only repeats the stage that was interrupted. Batches other processes add
+(the web app, manual re-queues) are picked up within WATCH_INTERVAL.
+
+    python orchestrator.py                                  # default workers per stage
+    python orchestrator.py --workers transcriber=4,chunker=2
+
+Don't run the standalone stage scripts alongside it; both would consume
+the same queues.
+"""
+
+import os
+import time
+import queue
+import logging
+import argparse
+import threading
+
+import converter
+import chunker
+import transcriber
+import assembler
+import cleaner
+from utils.log_utils import setup_logger, close_logger
+from utils.atomic_queue import AtomicQueue
+from utils import backlog
+
+# ── Configuration ────────────────────────────────────────────────────────────
+DATA_DIR        = converter.DATA_DIR
+SCRIPT_NAME     = os.path.splitext(os.path.basename(__file__))[0]  # "orchestrator"
+
+# Worker threads per stage; override with --workers or
+# TRANSCRIBE_STAGE_WORKERS="transcriber=4,chunker=2"
+DEFAULT_WORKERS = {'converter': 1, 'chunker': 1, 'transcriber': 2, 'assembler': 1, 'cleaner': 1}
+WATCH_INTERVAL  = 0.5   # seconds between checks of the file queues
+RETRY_DELAY     = 30    # seconds before a failed batch is tried again
+BUDGET_RECHECK  = 5.0   # longest a budgeted stage waits before re-checking downstream
+
+root_logger = setup_logger(
+    f"{SCRIPT_NAME}_root",
+    os.path.join(DATA_DIR, f"{SCRIPT_NAME}.log"),
+    level=logging.INFO
+)
+
+
+def _convert(batch_name: str):
+    if not converter.convert_folder(batch_name):
+        raise RuntimeError("conversion failed (see converter.log)")
+
+
+# Stage name → function processing one batch, raising on failure. Hand-off
+# to the next stage is the orchestrator's job, as in each scan_and_process().
+RUNNERS = {
+    'converter':   _convert,
+    'chunker':     chunker.chunk_batch,
+    'transcriber': transcriber.process_folder,
+    'assembler':   assembler.process_folder,
+    'cleaner':     cleaner.process_batch,
+}
+
+
+def parse_workers(spec: str | None) -> dict[str, int]:
+    """
+    "transcriber=4,chunker=2" → DEFAULT_WORKERS with those overrides.
+    """
+    workers = dict(DEFAULT_WORKERS)
+    for part in filter(None, (spec or '').split(',')):
+        name, _, count = part.partition('=')
+        name = name.strip()
+        if name not in workers:
+            raise ValueError(f"Unknown stage '{name}' (stages: {', '.join(backlog.STAGES)})")
+        workers[name] = max(1, int(count))
+    return workers
+
+
+class Stage:
+    def __init__(self, name: str, run, workers: int):
+        self.name       = name
+        self.run        = run
+        self.workers    = workers
+        self.file_queue = AtomicQueue(os.path.join(DATA_DIR, f'{name}.queue'))
+        self.inbox      = queue.Queue()
+        self.next       = None
+        # Batches in the inbox, running or waiting to be retried
+        self.known      = set()
+        self.running    = 0
+        self.completed  = 0
+        self.failed     = 0
+        self.signature  = None
+        open(self.file_queue.path, 'a').close()
+
+
+class Pipeline:
+    """
+    The five stages linked by in-memory inboxes and backed by their file
+    queues. Budgeted stages (see utils.backlog.STAGE_BUDGETS) hold a batch
+    until the stages between them and the transcriber have room.
+    """
+
+    def __init__(self, workers: dict[str, int] | None = None):
+        workers      = workers or DEFAULT_WORKERS
+        self.cond    = threading.Condition()
+        self.closing = False
+        self.threads = []
+        self.stages  = {name: Stage(name, RUNNERS[name], workers.get(name, 1)) for name in backlog.STAGES}
+        for current, following in zip(backlog.STAGES, backlog.STAGES[1:]):
+            self.stages[current].next = self.stages[following]
+
+    def start(self) -> None:
+        # Recover whatever the file queues held when the last run stopped
+        self.sync(force=True)
+        for stage in self.stages.values():
+            for i in range(stage.workers):
+                t = threading.Thread(target=self._work, args=(stage,), name=f'{stage.name}-{i}', daemon=True)
+                t.start()
+                self.threads.append(t)
+        for target, name in ((self._watch, 'queue-watcher'), (self._compact, 'compaction')):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self.threads.append(t)
+        root_logger.info("Pipeline started: %s",
+                         ', '.join(f"{s.name}×{s.workers}" for s in self.stages.values()))
+
+    def submit(self, batch_name: str, stage: str = 'converter') -> None:
+        """
+        Queue a batch at `stage`: durably in its file queue, then in memory.
+        """
+        target = self.stages[stage]
+        target.file_queue.enqueue(batch_name)
+        self._offer(target, batch_name)
+
+    def _offer(self, stage: Stage, batch_name: str) -> None:
+        with self.cond:
+            if batch_name in stage.known:
+                return
+            stage.known.add(batch_name)
+        stage.inbox.put(batch_name)
+
+    def sync(self, force: bool = False) -> None:
+        """
+        Pick up batches that other processes added to the file queues.
+        Unchanged files (same mtime and size) are not re-read.
+        """
+        for stage in self.stages.values():
+            try:
+                st = os.stat(stage.file_queue.path)
+            except FileNotFoundError:
+                continue
+            signature = (st.st_mtime_ns, st.st_size)
+            if not force and signature == stage.signature:
+                continue
+            stage.signature = signature
+            # Under the lock, so a batch a worker is just removing is not re-offered
+            with self.cond:
+                pending = [b for b in stage.file_queue.peek() if b not in stage.known]
+            for batch_name in pending:
+                self._offer(stage, batch_name)
+
+    def _watch(self) -> None:
+        while not self.closing:
+            try:
+                self.sync()
+            except Exception as e:
+                root_logger.error("Queue watcher error: %s", e, exc_info=True)
+            time.sleep(WATCH_INTERVAL)
+
+    def _compact(self) -> None:
+        # The cleaner's archive/expiry pass, on its own thread so zipping
+        # never delays picking up new batches
+        while True:
+            try:
+                cleaner.compact()
+            except Exception as e:
+                root_logger.error("Compaction failed: %s", e, exc_info=True)
+            with self.cond:
+                if self.cond.wait_for(lambda: self.closing, timeout=cleaner.COMPACT_INTERVAL):
+                    return
+
+    def _wait_for_budget(self, stage: Stage) -> bool:
+        # False once stopping; the batch stays in its file queue
+        with self.cond:
+            while not self.closing:
+                room = backlog.intake(DATA_DIR, stage.name)
+                if room is None or room - stage.running > 0:
+                    stage.running += 1
+                    return True
+                self.cond.wait(BUDGET_RECHECK)
+            return False
+
+    def _work(self, stage: Stage) -> None:
+        while True:
+            batch_name = stage.inbox.get()
+            if batch_name is None or not self._wait_for_budget(stage):
+                return
+            t0 = time.perf_counter()
+            try:
+                stage.run(batch_name)
+                ok = True
+            except Exception as e:
+                root_logger.error("%s failed for %s: %s", stage.name, batch_name, e, exc_info=True)
+                ok = False
+            finally:
+                close_logger(batch_name)
+
+            if ok and stage.next is not None:
+                stage.next.file_queue.enqueue(batch_name)
+                self._offer(stage.next, batch_name)
+            with self.cond:
+                stage.running -= 1
+                if ok:
+                    stage.file_queue.remove(batch_name)
+                    stage.known.discard(batch_name)
+                    stage.completed += 1
+                else:
+                    stage.failed += 1
+                self.cond.notify_all()
+
+            if ok:
+                root_logger.info("%s finished %s in %.1fs", stage.name, batch_name, time.perf_counter() - t0)
+            else:
+                # Still in the file queue; back into the inbox after a pause
+                timer = threading.Timer(RETRY_DELAY, stage.inbox.put, (batch_name,))
+                timer.daemon = True
+                timer.start()
+
+    def stats(self) -> dict:
+        with self.cond:
+            return {s.name: {
+                'workers':   s.workers,
+                'waiting':   s.inbox.qsize(),
+                'running':   s.running,
+                'completed': s.completed,
+                'failed':    s.failed,
+            } for s in self.stages.values()}
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Let running batches finish (up to `timeout`) and stop the workers.
+        Batches still queued stay in the file queues for the next start.
+        """
+        with self.cond:
+            self.closing = True
+            self.cond.notify_all()
+        for stage in self.stages.values():
+            while True:
+                try:
+                    stage.inbox.get_nowait()
+                except queue.Empty:
+                    break
+            for _ in range(stage.workers):
+                stage.inbox.put(None)
+        deadline = time.monotonic() + timeout
+        for t in self.threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run every pipeline stage in one process.")
+    parser.add_argument('--workers', default=os.environ.get('TRANSCRIBE_STAGE_WORKERS'),
+                        help="Per-stage worker counts, e.g. transcriber=4,chunker=2")
+    args = parser.parse_args()
+
+    pipeline = Pipeline(parse_workers(args.workers))
+    pipeline.start()
+    try:
+        while True:
+            time.sleep(60)
+            root_logger.info("Stage status: %s", pipeline.stats())
+    except KeyboardInterrupt:
+        root_logger.info("Stopping; queued batches stay in the file queues")
+        pipeline.stop()
+
+
+if __name__ == '__main__':
+    main()
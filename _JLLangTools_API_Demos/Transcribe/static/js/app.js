@@ -51,16 +51,84 @@ document.addEventListener('DOMContentLoaded', () => {
     }
   });
 
-  // 5) Main handler for one or more files
-  function handleFiles(files) {
+  // 5) Main handler for one or more files: resumable chunked upload per file
+  const PART_SIZE      = 8 * 1024 * 1024;
+  const PARALLEL_PARTS = 4;
+  const PART_RETRIES   = 3;
+
+  async function sha256Hex(buf) {
+    if (!window.crypto || !crypto.subtle) return null;  // non-secure origin: server still hashes
+    const digest = await crypto.subtle.digest('SHA-256', buf);
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+  }
+
+  async function uploadFile(file, segments, onBytes) {
+    // Resume an interrupted upload of the same file if the server still has it
+    const resumeKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+    let info = null;
+    const saved = localStorage.getItem(resumeKey);
+    if (saved) {
+      const res = await fetch(`/uploads/${encodeURIComponent(saved)}`);
+      if (res.ok) info = await res.json();
+    }
+    if (!info) {
+      const res = await fetch('/uploads', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({
+          filename: file.name, size: file.size, part_size: PART_SIZE,
+          lang_key: modelSelect.value, segments
+        })
+      });
+      if (!res.ok) throw new Error((await res.json()).error || res.statusText);
+      info = await res.json();
+      localStorage.setItem(resumeKey, info.upload_id);
+    }
+
+    const done = new Set(info.received);
+    const todo = [];
+    for (let i = 0; i < info.parts_total; i++) {
+      if (done.has(i)) onBytes(Math.min(info.part_size, file.size - i * info.part_size));
+      else todo.push(i);
+    }
+
+    async function sendPart(index) {
+      const start = index * info.part_size;
+      const blob = file.slice(start, Math.min(start + info.part_size, file.size));
+      const checksum = await sha256Hex(await blob.arrayBuffer());
+      for (let attempt = 1; ; attempt++) {
+        const res = await fetch(`/uploads/${encodeURIComponent(info.upload_id)}/parts/${index}`, {
+          method: 'PUT',
+          headers: checksum ? {'X-Part-Sha256': checksum} : {},
+          body: blob
+        }).catch(() => null);
+        if (res && res.ok) break;
+        if (res && res.status === 410) {
+          // Completed or removed meanwhile: nothing to resume
+          localStorage.removeItem(resumeKey);
+          throw new Error((await res.json()).error);
+        }
+        if (attempt >= PART_RETRIES) throw new Error(`Part ${index} failed`);
+      }
+      onBytes(blob.size);
+    }
+
+    // A few workers pull part indices until none are left
+    const workers = Array.from({length: Math.min(PARALLEL_PARTS, todo.length)}, async () => {
+      while (todo.length) await sendPart(todo.shift());
+    });
+    await Promise.all(workers);
+
+    const res = await fetch(`/uploads/${encodeURIComponent(info.upload_id)}/complete`, {method: 'POST'});
+    if (!res.ok) throw new Error((await res.json()).error || res.statusText);
+    localStorage.removeItem(resumeKey);
+    return (await res.json()).items;
+  }
+
+  async function handleFiles(files) {
     isYouTubeMode = false;
     showProgressUI();
 
-    // Build FormData with all selected files
-    const form = new FormData();
-    files.forEach(f => form.append('audio', f));
-    form.append('lang_key', modelSelect.value);
-
     // Gather segments from your segment inputs
     const segments = Array.from(
       document.querySelectorAll('.segment-row')
@@ -68,36 +136,28 @@ document.addEventListener('DOMContentLoaded', () => {
       start: row.querySelector('input[name="start"]').value.trim(),
       end:   row.querySelector('input[name="end"]').value.trim()
     }));
-    form.append('segments', JSON.stringify(segments));
-
-    // Send via XHR so we can track upload progress
-    const xhr = new XMLHttpRequest();
-    xhr.open('POST', '/transcribe', true);
 
-    xhr.upload.onprogress = e => {
-      if (e.lengthComputable) {
-        const pct = (e.loaded / e.total) * 100;
-        progressBar.value = pct;
-        progressLabel.textContent = `Uploading: ${Math.round(pct)}%`;
-      }
+    const total = files.reduce((n, f) => n + f.size, 0) || 1;
+    let sent = 0;
+    const onBytes = n => {
+      sent += n;
+      const pct = (sent / total) * 100;
+      progressBar.value = pct;
+      progressLabel.textContent = `Uploading: ${Math.round(pct)}%`;
     };
 
-    xhr.onload = () => {
-      if (xhr.status >= 200 && xhr.status < 300) {
-        progressBar.value = 100;
-        progressLabel.textContent = 'Upload complete — queued for processing';
-      } else {
-        progressLabel.textContent = `Error ${xhr.status}: ${xhr.statusText}`;
+    try {
+      const items = [];
+      for (const file of files) {
+        items.push(...await uploadFile(file, segments, onBytes));
       }
-      resetBtn.parentElement.classList.remove('hidden');
-    };
-
-    xhr.onerror = () => {
-      progressLabel.textContent = 'Upload failed (network error)';
-      resetBtn.parentElement.classList.remove('hidden');
-    };
-
-    xhr.send(form);
+      progressBar.value = 100;
+      progressLabel.textContent = 'Upload complete — queued for processing';
+      watchBatches(items.map(i => i.folder));
+    } catch (err) {
+      progressLabel.textContent = `Upload failed: ${err.message} — drop the file again to resume`;
+    }
+    resetBtn.parentElement.classList.remove('hidden');
   }
 
   // 6) Handler for YouTube URLs
@@ -119,6 +179,7 @@ document.addEventListener('DOMContentLoaded', () => {
     .then(json => {
       if (json.status === 'queued') {
         progressLabel.textContent = `Queued ${json.items.length} video(s)`;
+        watchBatches(json.items.map(i => i.folder));
       } else if (json.error) {
         progressLabel.textContent = `Error: ${json.error}`;
       }
@@ -130,7 +191,69 @@ document.addEventListener('DOMContentLoaded', () => {
     });
   }
 
-  // 7) Show/hide UI elements, switch bar mode
+  // 7) Follow queued batches through the pipeline via server-sent events
+  const STAGE_LABELS = {
+    converterCompleted:   'Converted',
+    chunkerCompleted:     'Chunked',
+    transcriberCompleted: 'Transcribed',
+    assemblerCompleted:   'Assembled',
+    cleanerCompleted:     'Done'
+  };
+
+  function watchBatches(folders) {
+    if (!folders.length) return;
+    const state = {};
+    folders.forEach(f => { state[f] = {stage: 'Queued', done: 0, total: 0, completed: false}; });
+
+    function render() {
+      const all = Object.values(state);
+      if (all.every(s => s.completed)) {
+        progressLabel.textContent = `Finished ${all.length} file(s) — see Files`;
+        progressBar.max = 100;
+        progressBar.value = 100;
+        watcher.close();
+        return;
+      }
+      const done  = all.reduce((n, s) => n + s.done, 0);
+      const total = all.reduce((n, s) => n + s.total, 0);
+      const stages = all.map(s => s.stage).join(', ');
+      progressLabel.textContent = total
+        ? `${stages} — transcribed ${done}/${total} chunks`
+        : stages;
+      if (total) {
+        progressBar.max = total;
+        progressBar.value = done;
+      }
+    }
+
+    function applyTasks(folder, tasks, completed) {
+      if (!state[folder]) return;
+      const stamped = Object.keys(tasks || {}).filter(k => tasks[k]);
+      if (stamped.length) state[folder].stage = STAGE_LABELS[stamped[stamped.length - 1]];
+      state[folder].completed = completed;
+    }
+
+    const watcher = watchEvents(folders, {
+      snapshot: snapshot => {
+        Object.entries(snapshot).forEach(([folder, s]) => {
+          applyTasks(folder, s.tasks, s.completed);
+          if (s.progress) Object.assign(state[folder], {done: s.progress.done, total: s.progress.total});
+        });
+        render();
+      },
+      tasks: ev => {
+        applyTasks(ev.folder, ev.tasks, ev.completed);
+        render();
+      },
+      progress: ev => {
+        if (!state[ev.folder]) return;
+        Object.assign(state[ev.folder], {done: ev.done, total: ev.total});
+        render();
+      }
+    });
+  }
+
+  // 8) Show/hide UI elements, switch bar mode
   function showProgressUI() {
     uploadBox.classList.add('hidden');
     progressCont.classList.remove('hidden');
@@ -145,6 +268,6 @@ document.addEventListener('DOMContentLoaded', () => {
     }
   }
 
-  // 8) “Transcribe new file” button
+  // 9) “Transcribe new file” button
   resetBtn.addEventListener('click', () => window.location.reload());
 });
@@ -0,0 +1,60 @@
+// static/js/events.js
+
+// Live pipeline events ('snapshot', 'tasks', 'progress') for a set of batch
+// folders. Streams from /events while the server has a stream slot free;
+// when it answers 204 (at its cap), or the browser has no EventSource,
+// long-polls /events/poll instead. Returns an object with close().
+function watchEvents(folders, handlers) {
+  const query = `folders=${encodeURIComponent(folders.join(','))}`;
+  let source = null;
+  let timer  = null;
+  let closed = false;
+
+  function dispatch(kind, data) {
+    if (handlers[kind]) handlers[kind](data);
+  }
+
+  async function poll(cursor) {
+    if (closed) return;
+    let next = cursor;
+    let wait = 3000;
+    try {
+      const after = cursor === null ? '' : `&after=${cursor}`;
+      const resp = await fetch(`/events/poll?${query}${after}`);
+      if (resp.ok) {
+        const body = await resp.json();
+        if (body.snapshot) dispatch('snapshot', body.snapshot);
+        body.events.forEach(e => dispatch(e.kind, e));
+        next = body.cursor;
+        wait = body.retry_ms || 0;
+      }
+    } catch (err) {
+      // Network error: try again after the default pause
+    }
+    if (!closed) timer = setTimeout(() => poll(next), wait);
+  }
+
+  if (window.EventSource) {
+    source = new EventSource(`/events?${query}`);
+    ['snapshot', 'tasks', 'progress'].forEach(kind => {
+      source.addEventListener(kind, e => dispatch(kind, JSON.parse(e.data)));
+    });
+    source.addEventListener('error', () => {
+      // Dropped connections reconnect on their own; a refusal closes the source
+      if (source && source.readyState === EventSource.CLOSED) {
+        source = null;
+        poll(null);
+      }
+    });
+  } else {
+    poll(null);
+  }
+
+  return {
+    close() {
+      closed = true;
+      if (source) source.close();
+      clearTimeout(timer);
+    }
+  };
+}
@@ -38,10 +38,12 @@ document.addEventListener('DOMContentLoaded', () => {
 
       child.appendChild(createChildRow('Log file', `${folder}/${folder}.log`));
       child.appendChild(createChildRow('Request.json', `${folder}/request.json`));
+      child.appendChild(createChildRow('Results', `${folder}/results.jsonl`));
 
       if (segCount === 1) {
         child.appendChild(createChildRow('Text file', `${folder}/segment_1/assembled_result/${folder}_1.txt`));
         child.appendChild(createChildRow('Subtitle file', `${folder}/segment_1/assembled_result/${folder}_1.srt`));
+        child.appendChild(createChildRow('WebVTT file', `${folder}/segment_1/assembled_result/${folder}_1.vtt`));
         child.appendChild(createChildRow('Mappings', `${folder}/segment_1/chunks_mapping.json`));
       } else {
         for (let i = 1; i <= segCount; i++) {
@@ -77,6 +79,7 @@ document.addEventListener('DOMContentLoaded', () => {
         sub.className = 'file-children';
         sub.appendChild(createChildRow('Text file', `${folder}/segment_${seg}/assembled_result/${folder}_${seg}.txt`));
         sub.appendChild(createChildRow('Subtitle file', `${folder}/segment_${seg}/assembled_result/${folder}_${seg}.srt`));
+        sub.appendChild(createChildRow('WebVTT file', `${folder}/segment_${seg}/assembled_result/${folder}_${seg}.vtt`));
         sub.appendChild(createChildRow('Mappings', `${folder}/segment_${seg}/chunks_mapping.json`));
         childRow.after(sub);
       } else {
@@ -97,6 +100,25 @@ document.addEventListener('DOMContentLoaded', () => {
     }
   });
 
+  // Previews are paged: a trailing .preview-more fetches the next page in place
+  viewer.addEventListener('click', e => {
+    const more = e.target.closest('.preview-more');
+    if (!more || more.dataset.loading) return;
+    more.dataset.loading = '1';
+    more.textContent = 'Loading…';
+    const path = downloadBtn.dataset.path;
+    fetch(`/files/preview?path=${encodeURIComponent(path)}&offset=${more.dataset.offset}`)
+      .then(r => r.text())
+      .then(html => {
+        more.insertAdjacentHTML('afterend', html);
+        more.remove();
+      })
+      .catch(() => {
+        more.textContent = '⚠️ Error loading more';
+        delete more.dataset.loading;
+      });
+  });
+
   downloadBtn.addEventListener('click', () => {
     const path = downloadBtn.dataset.path;
     if (!path) return;
@@ -107,4 +129,56 @@ document.addEventListener('DOMContentLoaded', () => {
     a.click();
     document.body.removeChild(a);
   });
+
+  // Live stage/progress updates for the batches on this page
+  const STAGE_LABELS = {
+    converterCompleted:   'Converted',
+    chunkerCompleted:     'Chunked',
+    transcriberCompleted: 'Transcribed',
+    assemblerCompleted:   'Assembled',
+    cleanerCompleted:     'Done'
+  };
+
+  function rowFor(folder) {
+    return list.querySelector(`.file-row[data-folder="${CSS.escape(folder)}"]`);
+  }
+
+  function showTasks(folder, tasks, completed) {
+    const row = rowFor(folder);
+    if (!row) return;
+    const status = row.querySelector('.tag-status');
+    status.classList.toggle('complete', completed);
+    status.classList.toggle('pending', !completed);
+    status.textContent = completed ? '✅' : '⌛';
+    const stamped = Object.keys(tasks || {}).filter(k => tasks[k]);
+    const progress = row.querySelector('.tag-progress');
+    if (completed) {
+      progress.textContent = '';
+    } else if (stamped.length) {
+      progress.textContent = STAGE_LABELS[stamped[stamped.length - 1]] || '';
+    }
+  }
+
+  function showProgress(folder, ev) {
+    const row = rowFor(folder);
+    if (!row || !ev) return;
+    row.querySelector('.tag-progress').textContent = `${ev.done}/${ev.total} chunks`;
+  }
+
+  const pending = Array.from(list.querySelectorAll('.file-row[data-folder]'))
+    .filter(r => r.querySelector('.tag-status.pending'))
+    .map(r => r.dataset.folder);
+
+  if (pending.length) {
+    watchEvents(pending, {
+      snapshot: snapshot => {
+        Object.entries(snapshot).forEach(([folder, s]) => {
+          showTasks(folder, s.tasks, s.completed);
+          if (!s.completed) showProgress(folder, s.progress);
+        });
+      },
+      tasks: ev => showTasks(ev.folder, ev.tasks, ev.completed),
+      progress: ev => showProgress(ev.folder, ev)
+    });
+  }
 });
@@ -1,3 +1,4 @@
+import io
 import os
 import time
 import json
@@ -6,13 +7,17 @@ import requests
 from datetime import datetime
 from logging import LoggerAdapter
 
-from utils.log_utils import setup_logger
+from pydub import AudioSegment
+
+from utils.log_utils import setup_logger, close_logger
 from utils.atomic_queue import AtomicQueue
-from utils.request_utils import load_request, update_task_timestamp
+from utils.request_utils import load_request, update_request, update_task_timestamp
+from utils.results import RESULTS_NAME, ResultsWriter, index_results, lookup
+from utils import job_index
 
 # ── Configuration ────────────────────────────────────────────────────────────
 BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR      = os.path.join(BASE_DIR, 'data')
+DATA_DIR      = os.environ.get('TRANSCRIBE_DATA_DIR') or os.path.join(BASE_DIR, 'data')
 POLL_INTERVAL = 10  # seconds between scans
 
 # Load external API URL
@@ -21,6 +26,30 @@ SETTINGS_PATH = os.path.join(PROJECT_ROOT, 'appsettings.json')
 with open(SETTINGS_PATH, 'r', encoding='utf-8') as f:
     settings = json.load(f)
 API_URL       = settings['transcribe']['api_url']
+# Ask the API for a per-phase timing breakdown on every chunk
+PROFILE       = settings['transcribe'].get('profile', False)
+# Optional decoding overrides sent with every chunk (strategy, num_beams, ...)
+DECODING      = settings['transcribe'].get('decoding', {})
+# Ask for word timings so the assembler can cut subtitle cues inside chunks.
+# Off by default: with it the API must return cross-attentions (eager
+# attention, slower on every generate call) and decodes without the
+# assistant. Without it SRT/VTT cues follow chunk boundaries.
+WORD_TIMESTAMPS = settings['transcribe'].get('word_timestamps', False)
+
+# Batches with one of these lang_keys get one language-ID call on their
+# first LANGID_MS of speech; every chunk then goes to the model it picked
+AUTO_LANG_KEYS = ('', 'auto', 'unknown')
+LANGID_MS      = 30_000
+
+# A chunk refused with one of these statuses (API queue full / not ready)
+# is sent again after the Retry-After it names, up to MAX_RETRIES times
+RETRY_STATUSES = (429, 503)
+MAX_RETRIES    = 5
+MAX_RETRY_WAIT = 120  # seconds; longer Retry-After values are capped
+# Attempts at a batch whose chunks keep failing transiently (refusals,
+# connection errors) before it is completed with those chunks left out.
+# Other errors (bad audio, ...) leave the chunk out straight away.
+BATCH_ATTEMPTS = 3
 
 # Queue setup
 SCRIPT_NAME      = os.path.splitext(os.path.basename(__file__))[0]  # "transcriber"
@@ -39,6 +68,86 @@ root_logger = setup_logger(
 )
 
 
+def detect_language(subfolder: str, segments: list, adapter: LoggerAdapter) -> str:
+    """
+    lang_key for an auto-language batch. The API's answer is cached in
+    request.json as 'detected_lang', so retries never detect twice. Falls
+    back to 'auto' (per-chunk detection by the API) if the call fails.
+    """
+    cached = load_request(subfolder).get('detected_lang')
+    if cached and cached.get('lang_key'):
+        adapter.info("Using cached language ID: %s", json.dumps(cached))
+        return cached['lang_key']
+
+    clip = AudioSegment.empty()
+    for _, chunks_map in segments:
+        for chunk in chunks_map:
+            if len(clip) >= LANGID_MS:
+                break
+            if chunk.get('speech', True):
+                clip += AudioSegment.from_wav(os.path.join(subfolder, chunk['chunk_file']))
+    if not len(clip):
+        return 'auto'
+
+    buf = io.BytesIO()
+    clip[:LANGID_MS].export(buf, format='wav')
+    buf.seek(0)
+    try:
+        adapter.debug("POST → %s/detect", API_URL)
+        resp = requests.post(f"{API_URL}/detect", files={'audio': ('langid.wav', buf)})
+        resp.raise_for_status()
+        detected = resp.json()
+    except Exception as e:
+        adapter.error("Language ID failed, chunks will be detected individually: %s", e)
+        return 'auto'
+    if not detected.get('lang_key'):
+        return 'auto'
+
+    detected['seconds'] = round(len(clip[:LANGID_MS]) / 1000, 2)
+    update_request(subfolder, lambda data: data.__setitem__('detected_lang', detected))
+    adapter.info("Detected language %s (p=%s), transcribing with '%s'",
+                 detected['language'], detected['probability'], detected['lang_key'])
+    return detected['lang_key']
+
+
+def post_chunk(chunk_path: str, lang: str, adapter: LoggerAdapter) -> dict:
+    """
+    POST one chunk to /transcribe, waiting out 429/503 refusals. Raises on
+    any other error, or once MAX_RETRIES refusals have been used up.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        with open(chunk_path, 'rb') as af:
+            adapter.debug("POST → %s/transcribe", API_URL)
+            resp = requests.post(
+                f"{API_URL}/transcribe",
+                files={'audio': af},
+                data={'lang_key': lang, 'word_timestamps': int(WORD_TIMESTAMPS), **DECODING},
+                headers={'X-Profile': '1'} if PROFILE else None
+            )
+        if resp.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            break
+        try:
+            wait = min(MAX_RETRY_WAIT, max(1, int(resp.headers.get('Retry-After', ''))))
+        except ValueError:
+            wait = min(MAX_RETRY_WAIT, 2 ** (attempt + 1))
+        adapter.warning("API answered %d for %s, retrying in %ds (%d/%d)",
+                        resp.status_code, os.path.basename(chunk_path), wait, attempt + 1, MAX_RETRIES)
+        time.sleep(wait)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Worth trying the chunk again later: the API was unreachable, timed out
+    or still refusing work after post_chunk's retries.
+    """
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    response = getattr(error, 'response', None)
+    return response is not None and response.status_code in RETRY_STATUSES
+
+
 def process_folder(batch_name: str):
     subfolder   = os.path.join(DATA_DIR, batch_name)
     # Per-batch logger
@@ -50,74 +159,111 @@ def process_folder(batch_name: str):
     adapter.debug("=== Transcriber log initialized ===")
     adapter.info("Starting transcription processing")
 
-    data = load_request(subfolder)
+    data = update_request(subfolder, lambda d: d.__setitem__('transcriber_attempts',
+                                                             d.get('transcriber_attempts', 0) + 1))
+    attempt = data['transcriber_attempts']
     lang = data.get('lang_key', 'en')
 
-    mapping = []
-    # Iterate over each segment directory
+    # Chunk maps in time order as recorded by the chunker
+    segments = []
     for entry in sorted(os.listdir(subfolder)):
         if not entry.startswith('segment_'):
             continue
-        seg_idx       = int(entry.split('_')[1])
-        adapter.extra['seg'] = seg_idx
-        adapter.extra['chunk'] = 0
-        adapter.info("Processing segment %d", seg_idx)
-
-        seg_dir       = os.path.join(subfolder, entry)
-        audio_dir     = os.path.join(seg_dir, 'audio_chunks')
-        text_dir      = os.path.join(seg_dir, 'text_chunks')
-        os.makedirs(text_dir, exist_ok=True)
-
-        for fname in sorted(os.listdir(audio_dir)):
-            if not fname.lower().endswith('.wav'):
-                continue
-            chunk_id = int(os.path.splitext(fname)[0].split('_')[-1])
-            adapter.extra['chunk'] = chunk_id
-            chunk_path = os.path.join(audio_dir, fname)
-
-            adapter.info("Sending chunk for transcription: %s", fname)
-            try:
-                with open(chunk_path, 'rb') as af:
-                    adapter.debug("POST → %s/transcribe", API_URL)
-                    resp = requests.post(
-                        f"{API_URL}/transcribe",
-                        files={'audio': af},
-                        data={'lang_key': lang}
-                    )
-                    resp.raise_for_status()
-                    result = resp.json()
+        with open(os.path.join(subfolder, entry, 'chunks_mapping.json'), 'r', encoding='utf-8') as mf:
+            segments.append((entry, json.load(mf)))
+
+    if lang in AUTO_LANG_KEYS:
+        lang = detect_language(subfolder, segments, adapter)
+
+    # Chunks recorded by an earlier attempt at this batch are not sent again
+    already = index_results(subfolder)
+    if already:
+        adapter.info("Resuming: %d chunks already in %s", len(already), RESULTS_NAME)
+
+    # Progress is published per chunk for the web app's live view
+    speech = [c for _, chunks_map in segments for c in chunks_map if c.get('speech', True)]
+    total  = len(speech)
+    done   = sum(1 for c in speech if lookup(already, c['chunk_file']) is not None)
+    job_index.record_progress(subfolder, SCRIPT_NAME, done, total)
+
+    failed  = []   # (chunk_file, transient)
+    results = ResultsWriter(subfolder)
+    try:
+        for entry, chunks_map in segments:
+            seg_idx       = int(entry.split('_')[1])
+            adapter.extra['seg'] = seg_idx
+            adapter.extra['chunk'] = 0
+            adapter.info("Processing segment %d", seg_idx)
+
+            for chunk in chunks_map:
+                chunk_path = os.path.join(subfolder, chunk['chunk_file'])
+                fname = os.path.basename(chunk_path)
+                chunk_id = int(os.path.splitext(fname)[0].split('_')[-1])
+                adapter.extra['chunk'] = chunk_id
+
+                if not chunk.get('speech', True):
+                    adapter.info("Skipping non-speech chunk %s (vad_score %s)", fname, chunk.get('vad_score'))
+                    continue
+                if lookup(already, chunk['chunk_file']) is not None:
+                    adapter.debug("Already transcribed: %s", fname)
+                    continue
+
+                adapter.info("Sending chunk for transcription: %s", fname)
+                t0 = time.perf_counter()
+                try:
+                    result = post_chunk(chunk_path, lang, adapter)
                     text = result.get('transcription', '')
-                adapter.info("Received transcription for %s (%d chars)", fname, len(text))
-            except Exception as e:
-                adapter.error("Failed to transcribe %s: %s", fname, e, exc_info=True)
-                continue
-
-            # Write out .txt
-            txt_fname = os.path.splitext(fname)[0] + '.txt'
-            txt_path  = os.path.join(text_dir, txt_fname)
-            with open(txt_path, 'w', encoding='utf-8') as tf:
-                tf.write(text)
-            adapter.info("Wrote transcription to %s", txt_path)
-
-            mapping.append({
-                'audio_file': os.path.relpath(chunk_path, subfolder),
-                'text_file' : os.path.relpath(txt_path, subfolder)
-            })
-
-    # Write a text_mapping.json for each segment
-    for entry in sorted(os.listdir(subfolder)):
-        if not entry.startswith('segment_'):
-            continue
-        seg_dir  = os.path.join(subfolder, entry)
-        map_path = os.path.join(seg_dir, 'text_mapping.json')
-        with open(map_path, 'w', encoding='utf-8') as mf:
-            json.dump(mapping, mf, indent=2, ensure_ascii=False)
-        adapter.info("Wrote text_mapping.json for %s", seg_dir)
+                    if result.get('skipped'):
+                        adapter.info("API skipped %s (%s)", fname, result['skipped'])
+                    else:
+                        adapter.info("Received transcription for %s (%d chars)", fname, len(text))
+                    if result.get('timings'):
+                        adapter.info("Timing breakdown for %s: %s", fname, json.dumps(result['timings']))
+                except Exception as e:
+                    # Carry on with the other chunks; see below for retries
+                    adapter.error("Failed to transcribe %s: %s", fname, e, exc_info=True)
+                    failed.append((chunk['chunk_file'], is_transient(e)))
+                    continue
+                done += 1
+                job_index.record_progress(subfolder, SCRIPT_NAME, done, total)
+
+                record = {
+                    'chunk':      chunk_id,
+                    'segment':    seg_idx,
+                    'chunk_file': chunk['chunk_file'],
+                    'start_ms':   chunk.get('start_ms'),
+                    'end_ms':     chunk.get('end_ms'),
+                    'overlap_ms': chunk.get('overlap_ms', 0),
+                    'text':       text,
+                    'lang_key':   (result.get('detected') or {}).get('lang_key') or lang,
+                    'elapsed_s':  round(time.perf_counter() - t0, 3),
+                }
+                # Word times are seconds from the start of the chunk
+                if result.get('words'):
+                    record['words'] = result['words']
+                if result.get('skipped'):
+                    record['skipped'] = result['skipped']
+                if result.get('timings'):
+                    record['timings'] = result['timings']
+                results.append(record)
+    finally:
+        results.close()
+    adapter.info("Results in %s", results.path)
+    transient = [f for f, again in failed if again]
+    if transient and attempt < BATCH_ATTEMPTS:
+        # Not stamped, so scan_and_process re-queues the batch and only the
+        # chunks missing from results.jsonl are sent again
+        raise RuntimeError(f"{len(transient)} of {total} chunks failed transiently "
+                           f"(attempt {attempt}/{BATCH_ATTEMPTS}): {', '.join(transient[:5])}"
+                           f"{' ...' if len(transient) > 5 else ''}")
+    if failed:
+        gaps = [f for f, _ in failed]
+        adapter.warning("Completing without %d of %d chunks (attempt %d): %s",
+                        len(gaps), total, attempt, ', '.join(gaps))
+        update_request(subfolder, lambda d: d.__setitem__('transcriber_gaps', gaps))
 
-    # Stamp completion and hand off
     update_task_timestamp(subfolder, 'transcriberCompleted')
-    ASSEMBLER_QUEUE.enqueue(batch_name)
-    adapter.info("Stamped transcriberCompleted and enqueued for assembling")
+    adapter.info("Stamped transcriberCompleted")
 
 
 def scan_and_process():
@@ -130,12 +276,16 @@ def scan_and_process():
     for batch in batches:
         try:
             process_folder(batch)
+            ASSEMBLER_QUEUE.enqueue(batch)
+            root_logger.info("Enqueued batch '%s' for assembling", batch)
         except Exception as e:
             root_logger.error("Processing failed for %s: %s", batch, e, exc_info=True)
             failures.append(batch)
+        finally:
+            close_logger(batch)
 
     if failures:
-        queue.replace(failures)
+        queue.extend(failures)
 
 
 def main():
@@ -0,0 +1,253 @@
+# utils/archive.py
+
+import os
+import json
+import time
+import shutil
+import zipfile
+import threading
+from datetime import datetime, timedelta, timezone
+
+from utils import job_index
+from utils.atomic_queue import AtomicQueue
+from utils.backlog import STAGES
+from utils.request_utils import forget_request
+
+# Finished batches are packed into DATA_DIR/archive/YYYY_MM/<batch>.zip
+# (month of sent_time), so data/ only holds batches in flight or recently done
+ARCHIVE_DIR    = 'archive'
+# Archives unpacked on demand for the web app, under ARCHIVE_DIR
+RESTORE_DIR    = '.restore'
+# Seconds a cleaned batch stays a plain folder before it is archived
+ARCHIVE_AFTER  = int(os.environ.get('TRANSCRIBE_ARCHIVE_AFTER', '3600'))
+# Archives of batches sent more than this many days ago are deleted (0: never)
+RETENTION_DAYS = int(os.environ.get('TRANSCRIBE_RETENTION_DAYS', '180'))
+# Total size of all archives; the oldest go first once it is exceeded (0: no limit)
+ARCHIVE_MAX_GB = float(os.environ.get('TRANSCRIBE_ARCHIVE_MAX_GB', '20'))
+# Unfinished batches (failed or stuck) with no progress for this many days are deleted (0: never)
+STALE_DAYS     = int(os.environ.get('TRANSCRIBE_STALE_DAYS', '7'))
+# Unpacked copies not read for this long (seconds) are removed
+RESTORE_TTL    = 3600
+SKIP_SUFFIXES  = ('.lock', '.tmp')
+
+
+def _month(sent_time: str) -> str:
+    try:
+        return datetime.fromisoformat(sent_time).strftime('%Y_%m')
+    except (TypeError, ValueError):
+        return datetime.utcnow().strftime('%Y_%m')
+
+
+def _timestamp(iso: str | None) -> float | None:
+    # Task stamps are naive UTC (datetime.utcnow().isoformat())
+    try:
+        return datetime.fromisoformat(iso).replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def restore_root(data_dir: str) -> str:
+    return os.path.join(data_dir, ARCHIVE_DIR, RESTORE_DIR)
+
+
+def archive_batch(data_dir: str, folder: str, sent_time: str) -> dict:
+    """
+    Pack the batch folder into one deflated zip (paths relative to the
+    batch), record it in the job index, then remove the folder. The zip is
+    written under a temp name first, so a crash never leaves a partial
+    archive in place of the batch.
+    """
+    subfolder = os.path.join(data_dir, folder)
+    rel       = f"{ARCHIVE_DIR}/{_month(sent_time)}/{folder}.zip"
+    path      = os.path.join(data_dir, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp   = f"{path}.{os.getpid()}.tmp"
+    files = 0
+    try:
+        with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+            for root, dirs, names in os.walk(subfolder):
+                dirs.sort()
+                for name in sorted(names):
+                    if name.endswith(SKIP_SUFFIXES):
+                        continue
+                    full = os.path.join(root, name)
+                    zf.write(full, os.path.relpath(full, subfolder).replace(os.sep, '/'))
+                    files += 1
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    size = os.path.getsize(path)
+    job_index.record_archive(data_dir, folder, rel, size, sent_time)
+    shutil.rmtree(subfolder)
+    forget_request(subfolder)
+    return {'path': rel, 'bytes': size, 'files': files}
+
+
+def due(data_dir: str, now: float | None = None) -> list[dict]:
+    """
+    Finished batches cleaned more than ARCHIVE_AFTER seconds ago that are
+    still plain folders, oldest first.
+    """
+    cutoff = (now or time.time()) - ARCHIVE_AFTER
+    jobs = []
+    for job in job_index.unarchived_completed(data_dir):
+        cleaned = _timestamp(job['tasks'].get('cleanerCompleted'))
+        if cleaned is not None and cleaned <= cutoff and os.path.isdir(os.path.join(data_dir, job['folder'])):
+            jobs.append(job)
+    return jobs
+
+
+def remove_archive(data_dir: str, entry: dict) -> None:
+    path = os.path.join(data_dir, entry['path'])
+    if os.path.exists(path):
+        os.remove(path)
+    try:
+        # Month folders go once empty
+        os.rmdir(os.path.dirname(path))
+    except OSError:
+        pass
+    shutil.rmtree(os.path.join(restore_root(data_dir), entry['folder']), ignore_errors=True)
+    job_index.delete_job(data_dir, entry['folder'])
+
+
+def expire(data_dir: str) -> list[dict]:
+    """
+    Delete archives past RETENTION_DAYS, then the oldest ones until the
+    total fits ARCHIVE_MAX_GB. Returns the expired archive entries.
+    """
+    archives = job_index.list_archives(data_dir)
+    cutoff   = (datetime.utcnow() - timedelta(days=RETENTION_DAYS)).isoformat() if RETENTION_DAYS else None
+    budget   = int(ARCHIVE_MAX_GB * 1024 ** 3)
+    total    = sum(a['bytes'] for a in archives)
+    expired  = []
+    # Oldest first: once one archive is kept, every later one is too
+    for entry in archives:
+        too_old   = cutoff is not None and entry['sent_time'] < cutoff
+        over_size = budget > 0 and total > budget
+        if not (too_old or over_size):
+            break
+        remove_archive(data_dir, entry)
+        total -= entry['bytes']
+        expired.append(entry)
+    return expired
+
+
+def expire_stale(data_dir: str, now: float | None = None) -> list[str]:
+    """
+    Delete batches that never completed and have had no task stamped for
+    STALE_DAYS (counting from sent_time if none was), dropping them from
+    the stage queues too. Returns the removed folder names.
+    """
+    if not STALE_DAYS:
+        return []
+    cutoff  = (now or time.time()) - STALE_DAYS * 86400
+    removed = []
+    for job in job_index.incomplete_jobs(data_dir):
+        stamps = [_timestamp(job['sent_time'])] + [_timestamp(v) for v in job['tasks'].values()]
+        stamps = [t for t in stamps if t is not None]
+        if not stamps or max(stamps) > cutoff:
+            continue
+        for stage in STAGES:
+            AtomicQueue(os.path.join(data_dir, f'{stage}.queue')).remove(job['folder'])
+        subfolder = os.path.join(data_dir, job['folder'])
+        shutil.rmtree(subfolder, ignore_errors=True)
+        forget_request(subfolder)
+        job_index.delete_job(data_dir, job['folder'])
+        removed.append(job['folder'])
+    return removed
+
+
+def restore(data_dir: str, folder: str) -> str | None:
+    """
+    Folder holding an unpacked copy of archived batch `folder`, extracting
+    it on first use; None if the batch is not archived. Each read refreshes
+    the copy's mtime so prune_restored() only removes idle ones.
+    """
+    target = os.path.join(restore_root(data_dir), folder)
+    try:
+        os.utime(target)
+        return target
+    except FileNotFoundError:
+        # Not unpacked yet, or prune_restored() just moved it aside
+        pass
+    entry = job_index.get_archive(data_dir, folder)
+    if entry is None:
+        return None
+
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with zipfile.ZipFile(os.path.join(data_dir, entry['path'])) as zf:
+        zf.extractall(tmp)
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        # Another request unpacked it first
+        shutil.rmtree(tmp, ignore_errors=True)
+    # The extracted folder keeps the mtime of its last entry, not of this read
+    os.utime(target)
+    return target
+
+
+def prune_restored(data_dir: str, now: float | None = None) -> int:
+    """
+    Remove unpacked copies not read for RESTORE_TTL seconds. Each copy is
+    renamed aside first and put back if a read touched it in between, so a
+    path handed out by restore() is never deleted under a fresh request;
+    files already open keep streaming from the unlinked copy.
+    """
+    root = restore_root(data_dir)
+    if not os.path.isdir(root):
+        return 0
+    cutoff = (now or time.time()) - RESTORE_TTL
+    removed = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if os.path.getmtime(path) >= cutoff:
+            continue
+        if name.endswith('.tmp'):
+            # Left behind by an interrupted extract or prune
+            shutil.rmtree(path, ignore_errors=True)
+            continue
+        doomed = f"{path}.{os.getpid()}.prune.tmp"
+        try:
+            os.rename(path, doomed)
+        except OSError:
+            continue
+        if os.path.getmtime(doomed) >= cutoff:
+            try:
+                os.rename(doomed, path)
+                continue
+            except OSError:
+                # Re-extracted meanwhile; this copy is no longer reachable
+                pass
+        shutil.rmtree(doomed, ignore_errors=True)
+        removed += 1
+    return removed
+
+
+def iter_archived_requests(data_dir: str):
+    """
+    Yield (folder, relative archive path, size, request.json data) for every
+    readable archive on disk, for rebuilding the job index.
+    """
+    root = os.path.join(data_dir, ARCHIVE_DIR)
+    if not os.path.isdir(root):
+        return
+    for month in sorted(os.listdir(root)):
+        month_dir = os.path.join(root, month)
+        if month == RESTORE_DIR or not os.path.isdir(month_dir):
+            continue
+        for name in sorted(os.listdir(month_dir)):
+            if not name.endswith('.zip'):
+                continue
+            path = os.path.join(month_dir, name)
+            try:
+                with zipfile.ZipFile(path) as zf:
+                    data = json.loads(zf.read('request.json'))
+            except (zipfile.BadZipFile, KeyError, ValueError):
+                # Not one of ours, or damaged: leave it out of the index
+                continue
+            yield (os.path.splitext(name)[0], f"{ARCHIVE_DIR}/{month}/{name}", os.path.getsize(path), data)
@@ -6,7 +6,11 @@ class AtomicQueue:
     """
     A simple line-based queue stored in a file.
     enqueue(): append a new item
+    extend():  append several items
     pop_all(): atomically read & clear the file
+    pop(n):    atomically take the first n items, leaving the rest queued
+    peek():    read without removing
+    remove():  atomically drop every occurrence of an item
     replace(): atomically overwrite with a given list
     """
     def __init__(self, path: str):
@@ -18,20 +22,59 @@ class AtomicQueue:
             with open(self.path, 'a', encoding='utf-8') as f:
                 f.write(item.strip() + '\n')
 
+    def extend(self, items: list[str]) -> None:
+        if not items:
+            return
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for i in items:
+                    f.write(i.strip() + '\n')
+
+    def _read(self) -> list[str]:
+        # Caller holds the lock
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return [l.strip() for l in f if l.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _write(self, items: list[str]) -> None:
+        # Caller holds the lock
+        with open(self.path, 'w', encoding='utf-8') as f:
+            for i in items:
+                f.write(i.strip() + '\n')
+
     def pop_all(self) -> list[str]:
         with self.lock:
-            try:
-                with open(self.path, 'r', encoding='utf-8') as f:
-                    lines = [l.strip() for l in f if l.strip()]
-            except FileNotFoundError:
-                lines = []
+            lines = self._read()
             # clear the queue
-            with open(self.path, 'w', encoding='utf-8'):
-                pass
+            self._write([])
         return lines
 
+    def pop(self, n: int) -> list[str]:
+        if n <= 0:
+            return []
+        with self.lock:
+            lines = self._read()
+            if lines:
+                self._write(lines[n:])
+        return lines[:n]
+
+    def peek(self) -> list[str]:
+        with self.lock:
+            return self._read()
+
+    def remove(self, item: str) -> None:
+        item = item.strip()
+        with self.lock:
+            lines = self._read()
+            if item in lines:
+                self._write([l for l in lines if l != item])
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self._read())
+
     def replace(self, items: list[str]) -> None:
         with self.lock:
-            with open(self.path, 'w', encoding='utf-8') as f:
-                for i in items:
-                    f.write(i.strip() + '\n')
+            self._write(items)
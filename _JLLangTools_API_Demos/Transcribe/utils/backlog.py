@@ -0,0 +1,185 @@
+# utils/backlog.py
+
+import os
+import math
+import time
+import shutil
+import threading
+
+from utils import job_index, uploads
+from utils.atomic_queue import AtomicQueue
+from utils.request_utils import load_request
+
+STAGES = ('converter', 'chunker', 'transcriber', 'assembler', 'cleaner')
+
+# Admission control for new jobs: 503 while free space on the data volume
+# is below MIN_FREE_GB, 429 while more than MAX_BACKLOG_S seconds of audio
+# or MAX_BACKLOG_BATCHES batches are waiting to be transcribed
+MIN_FREE_GB         = float(os.environ.get('TRANSCRIBE_MIN_FREE_GB', '5'))
+MAX_BACKLOG_S       = float(os.environ.get('TRANSCRIBE_MAX_BACKLOG_S', str(4 * 3600)))
+MAX_BACKLOG_BATCHES = int(os.environ.get('TRANSCRIBE_MAX_BACKLOG_BATCHES', '50'))
+# Rough bytes on disk per uploaded byte once a compressed upload has been
+# converted and chunked (original + full-rate WAV + chunk WAVs)
+UPLOAD_EXPANSION    = 8
+# Seconds of audio the transcriber gets through per second, for Retry-After
+DRAIN_RATE          = float(os.environ.get('TRANSCRIBE_DRAIN_RATE', '2'))
+RETRY_MIN           = 30
+RETRY_MAX           = 3600
+
+# Stage budgets: a stage only takes batches off its queue while fewer than
+# this many sit between it and the transcriber (inclusive), so conversion
+# and chunking, which fill the disk, never run far ahead of transcription.
+# Stages without a budget take everything queued.
+STAGE_BUDGETS = {
+    'converter': int(os.environ.get('TRANSCRIBE_CONVERTER_BUDGET', '8')),
+    'chunker':   int(os.environ.get('TRANSCRIBE_CHUNKER_BUDGET', '4')),
+}
+
+# Reports walk every in-flight batch folder, so they are reused briefly
+REPORT_TTL = 5.0
+
+_cache = {}
+_lock  = threading.Lock()
+
+
+class Overloaded(Exception):
+    """
+    Raised by admit() when new work would overrun the disk or backlog
+    limits. `status` is 503 (disk) or 429 (backlog); `retry_after` is a
+    rough estimate, in seconds, of when to try again.
+    """
+    def __init__(self, message: str, status: int, retry_after: int):
+        super().__init__(message)
+        self.status      = status
+        self.retry_after = retry_after
+
+
+def stage_of(tasks: dict) -> str | None:
+    """
+    Stage a batch is waiting for or running in (None once cleaned).
+    """
+    for stage in STAGES:
+        if not tasks.get(f'{stage}Completed'):
+            return stage
+    return None
+
+
+def folder_bytes(path: str) -> int:
+    total = 0
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    total += folder_bytes(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    total += entry.stat().st_size
+    except OSError:
+        pass
+    return total
+
+
+def report(data_dir: str, max_age: float = REPORT_TTL) -> dict:
+    """
+    Backlog per stage: batches in its file queue ('queued'), batches
+    waiting for or in the stage ('batches'), their audio seconds (known
+    once converted) and bytes on disk; uploads started but not completed;
+    plus free disk space and the transcription backlog that admission
+    control looks at.
+    """
+    with _lock:
+        cached = _cache.get(data_dir)
+        if cached and time.monotonic() - cached[0] < max_age:
+            return cached[1]
+
+    stages = {stage: {'queued': len(AtomicQueue(os.path.join(data_dir, f'{stage}.queue'))),
+                      'batches': 0, 'audio_s': 0.0, 'bytes': 0} for stage in STAGES}
+    for job in job_index.incomplete_jobs(data_dir):
+        stage = stage_of(job['tasks'])
+        subfolder = os.path.join(data_dir, job['folder'])
+        if stage is None or not os.path.isdir(subfolder):
+            continue
+        entry = stages[stage]
+        entry['batches'] += 1
+        entry['bytes'] += folder_bytes(subfolder)
+        try:
+            entry['audio_s'] += (load_request(subfolder).get('duration_ms') or 0) / 1000
+        except (OSError, ValueError):
+            pass
+    for entry in stages.values():
+        entry['audio_s'] = round(entry['audio_s'], 1)
+
+    # Declared sizes count in full: the partial file is sparse until the
+    # remaining parts arrive
+    pending = {'pending': 0, 'bytes': 0, 'outstanding_bytes': 0}
+    for _, state in uploads.iter_pending(data_dir):
+        received = sum(uploads.part_length(state, int(i)) for i in state['parts'])
+        pending['pending'] += 1
+        pending['bytes'] += state['size']
+        pending['outstanding_bytes'] += max(0, state['size'] - received)
+
+    waiting = [stages[s] for s in STAGES[:STAGES.index('transcriber') + 1]]
+    disk = shutil.disk_usage(data_dir)
+    result = {
+        'stages': stages,
+        'transcription_backlog': {
+            'batches': sum(e['batches'] for e in waiting),
+            'audio_s': round(sum(e['audio_s'] for e in waiting), 1),
+        },
+        'uploads': pending,
+        'disk': {
+            'free_bytes':     disk.free,
+            'total_bytes':    disk.total,
+            'pipeline_bytes': sum(e['bytes'] for e in stages.values()) + pending['bytes'],
+        },
+        'limits': {
+            'min_free_gb':         MIN_FREE_GB,
+            'max_backlog_s':       MAX_BACKLOG_S,
+            'max_backlog_batches': MAX_BACKLOG_BATCHES,
+            'stage_budgets':       STAGE_BUDGETS,
+        },
+    }
+    with _lock:
+        _cache[data_dir] = (time.monotonic(), result)
+    return result
+
+
+def _retry_after(audio_s: float) -> int:
+    return int(min(RETRY_MAX, max(RETRY_MIN, math.ceil(audio_s / DRAIN_RATE))))
+
+
+def admit(data_dir: str, incoming_bytes: int = 0, fresh: bool = False) -> dict:
+    """
+    Check that a new job of about `incoming_bytes` can be accepted; raises
+    Overloaded if not. Bytes still to arrive for uploads already started
+    count as incoming too. Returns the report the decision was based on.
+    """
+    state   = report(data_dir, max_age=0 if fresh else REPORT_TTL)
+    backlog = state['transcription_backlog']
+    free    = state['disk']['free_bytes']
+    incoming_bytes += state['uploads']['outstanding_bytes']
+    need    = MIN_FREE_GB * 1024 ** 3 + incoming_bytes * UPLOAD_EXPANSION
+    if free < need:
+        # Space comes back as batches are transcribed and cleaned
+        raise Overloaded(f"Not enough free disk space ({free / 1024 ** 3:.1f} GB free)",
+                         503, _retry_after(backlog['audio_s']))
+    if backlog['audio_s'] > MAX_BACKLOG_S or backlog['batches'] >= MAX_BACKLOG_BATCHES:
+        raise Overloaded(f"Transcription backlog is full ({backlog['batches']} batches, "
+                         f"{backlog['audio_s'] / 60:.0f} min of audio)",
+                         429, _retry_after(backlog['audio_s'] - MAX_BACKLOG_S))
+    return state
+
+
+def intake(data_dir: str, stage: str) -> int | None:
+    """
+    How many batches `stage` may take off its queue right now: its budget
+    minus the batches already between it and the transcriber, and none
+    while the disk is below MIN_FREE_GB. None if the stage has no budget.
+    """
+    budget = STAGE_BUDGETS.get(stage)
+    if not budget:
+        return None
+    if shutil.disk_usage(data_dir).free < MIN_FREE_GB * 1024 ** 3:
+        return 0
+    ahead = STAGES[STAGES.index(stage) + 1:STAGES.index('transcriber') + 1]
+    pending = sum(1 for job in job_index.incomplete_jobs(data_dir) if stage_of(job['tasks']) in ahead)
+    return max(0, budget - pending)
@@ -0,0 +1,78 @@
+# utils/event_stream.py
+
+import time
+import logging
+import threading
+from collections import deque
+
+from utils import job_index
+
+POLL_INTERVAL = 0.5    # seconds between reads of the events table
+BUFFER_SIZE   = 2000   # recent events kept in memory for subscribers
+
+logger = logging.getLogger(__name__)
+
+
+class EventBroker:
+    """
+    Fans pipeline events out to any number of listeners (SSE streams,
+    long-poll requests) from a single background thread that tails the
+    job index's events table. However many browser tabs are open, the
+    database is read once per POLL_INTERVAL and the data folder not at all.
+    """
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.buffer   = deque(maxlen=BUFFER_SIZE)
+        self.cond     = threading.Condition()
+        self.last_id  = job_index.last_event_id(data_dir)
+        self._thread  = None
+
+    def start(self) -> None:
+        with self.cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='event-broker', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(POLL_INTERVAL)
+            try:
+                events = job_index.events_since(self.data_dir, self.last_id)
+            except Exception as e:
+                logger.warning("Event poll failed: %s", e)
+                continue
+            if not events:
+                continue
+            with self.cond:
+                self.buffer.extend(events)
+                self.last_id = events[-1]['id']
+                self.cond.notify_all()
+
+    def wait(self, after_id: int, folders: set[str] | None = None,
+             timeout: float = 25.0) -> tuple[list[dict], int]:
+        """
+        Events newer than `after_id` (optionally only for `folders`), blocking
+        up to `timeout` seconds until at least one arrives. Returns the events
+        and the cursor to pass as `after_id` next time.
+        """
+        self.start()
+        with self.cond:
+            self.cond.wait_for(lambda: self.last_id > after_id, timeout=timeout)
+            if self.last_id <= after_id:
+                events = []
+            elif self.buffer and self.buffer[0]['id'] <= after_id + 1:
+                events = [e for e in self.buffer if e['id'] > after_id]
+            else:
+                # Listener is older than the in-memory buffer: read the gap from disk
+                events = None
+        if events is None:
+            events = job_index.events_since(self.data_dir, after_id, limit=BUFFER_SIZE)
+        cursor = events[-1]['id'] if events else after_id
+        if folders:
+            events = [e for e in events if e['folder'] in folders]
+        return events, cursor
+
+    def cursor(self) -> int:
+        with self.cond:
+            return self.last_id
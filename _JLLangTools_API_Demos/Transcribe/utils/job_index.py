@@ -0,0 +1,436 @@
+# utils/job_index.py
+
+import os
+import sys
+import json
+import base64
+import time
+import sqlite3
+import logging
+import threading
+import contextlib
+
+INDEX_NAME = 'jobs.sqlite'
+SORT_KEYS  = ('sent_time', 'audio_filename', 'lang_key')
+# Progress events kept for late subscribers; older ones are pruned on insert
+EVENTS_KEEP = 5000
+
+logger = logging.getLogger(__name__)
+
+# Index files whose schema this process has already set up
+_initialized = set()
+_init_lock   = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    folder          TEXT PRIMARY KEY,
+    audio_filename  TEXT NOT NULL DEFAULT '',
+    lang_key        TEXT NOT NULL DEFAULT '',
+    sent_time       TEXT NOT NULL DEFAULT '',
+    segments        INTEGER NOT NULL DEFAULT 0,
+    completed       INTEGER NOT NULL DEFAULT 0,
+    tasks           TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS jobs_by_sent_time ON jobs (sent_time, folder);
+CREATE INDEX IF NOT EXISTS jobs_by_filename  ON jobs (audio_filename, folder);
+CREATE INDEX IF NOT EXISTS jobs_by_lang      ON jobs (lang_key, folder);
+CREATE INDEX IF NOT EXISTS jobs_by_status    ON jobs (completed, sent_time, folder);
+
+CREATE TABLE IF NOT EXISTS events (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    folder   TEXT NOT NULL,
+    kind     TEXT NOT NULL,
+    payload  TEXT NOT NULL DEFAULT '{}',
+    created  REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS archives (
+    folder    TEXT PRIMARY KEY,
+    path      TEXT NOT NULL,
+    bytes     INTEGER NOT NULL DEFAULT 0,
+    sent_time TEXT NOT NULL DEFAULT '',
+    archived  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archives_by_sent_time ON archives (sent_time, folder);
+"""
+
+
+def index_path(data_dir: str) -> str:
+    return os.path.join(data_dir, INDEX_NAME)
+
+
+def connect(data_dir: str) -> sqlite3.Connection:
+    """
+    Open the job index (creating it if needed). WAL lets the web app read
+    while pipeline stages write from other processes.
+    """
+    path = os.path.abspath(index_path(data_dir))
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA synchronous=NORMAL')
+    if path not in _initialized:
+        # Once per process: the schema script commits and takes the write
+        # lock, and WAL mode is stored in the file itself
+        with _init_lock:
+            if path not in _initialized:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript(SCHEMA)
+                _initialized.add(path)
+    return conn
+
+
+@contextlib.contextmanager
+def session(data_dir: str):
+    """
+    Connection that commits on success and is always closed.
+    """
+    conn = connect(data_dir)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _row_from_request(folder: str, data: dict) -> dict:
+    tasks    = data.get('tasks', {}) or {}
+    segments = data.get('segments') or []
+    return {
+        'folder':         folder,
+        'audio_filename': data.get('audio_filename', '') or '',
+        'lang_key':       data.get('lang_key', '') or '',
+        'sent_time':      data.get('sent_time', '') or '',
+        # The chunker writes one segment_N folder per requested segment
+        'segments':       len(segments) or 1,
+        'completed':      int(bool(tasks) and all(tasks.values())),
+        'tasks':          json.dumps(tasks),
+    }
+
+
+def _split(subfolder: str) -> tuple[str, str]:
+    subfolder = os.path.abspath(subfolder)
+    return os.path.dirname(subfolder), os.path.basename(subfolder)
+
+
+def upsert_job(subfolder: str, data: dict) -> None:
+    """
+    Record the current request.json state of the batch at `subfolder` and
+    publish it as a 'tasks' event for live progress listeners.
+    Index failures are logged, never raised, so they can't stall a stage.
+    """
+    data_dir, folder = _split(subfolder)
+    row = _row_from_request(folder, data)
+    tasks = data.get('tasks', {}) or {}
+    # Tasks are stamped in pipeline order, so the last stamped key is the stage just finished
+    stage = next((k for k in reversed(list(tasks)) if tasks[k]), None)
+    try:
+        with session(data_dir) as conn:
+            _upsert(conn, row)
+            _add_event(conn, folder, 'tasks', {
+                'stage':     stage,
+                'tasks':     tasks,
+                'completed': bool(row['completed']),
+            })
+    except sqlite3.Error as e:
+        logger.warning("Job index update failed for %s: %s", folder, e)
+
+
+def record_progress(subfolder: str, stage: str, done: int, total: int) -> None:
+    """
+    Publish chunk-level progress for a batch (e.g. chunks transcribed so far).
+    """
+    data_dir, folder = _split(subfolder)
+    try:
+        with session(data_dir) as conn:
+            _add_event(conn, folder, 'progress', {'stage': stage, 'done': done, 'total': total})
+    except sqlite3.Error as e:
+        logger.warning("Progress event failed for %s: %s", folder, e)
+
+
+def _add_event(conn: sqlite3.Connection, folder: str, kind: str, payload: dict) -> None:
+    cur = conn.execute(
+        'INSERT INTO events (folder, kind, payload, created) VALUES (?, ?, ?, ?)',
+        (folder, kind, json.dumps(payload), time.time())
+    )
+    conn.execute('DELETE FROM events WHERE id <= ?', (cur.lastrowid - EVENTS_KEEP,))
+
+
+def _event(row: sqlite3.Row) -> dict:
+    return {'id': row['id'], 'folder': row['folder'], 'kind': row['kind'],
+            'created': row['created'], **json.loads(row['payload'])}
+
+
+def events_since(data_dir: str, after_id: int, limit: int = 500) -> list[dict]:
+    """
+    Events with id > `after_id`, oldest first.
+    """
+    with session(data_dir) as conn:
+        rows = conn.execute(
+            'SELECT * FROM events WHERE id > ? ORDER BY id LIMIT ?', (after_id, limit)
+        ).fetchall()
+    return [_event(r) for r in rows]
+
+
+def last_event_id(data_dir: str) -> int:
+    with session(data_dir) as conn:
+        return conn.execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+
+
+def latest_progress(data_dir: str, folders: list[str]) -> dict[str, dict]:
+    """
+    Most recent 'progress' event per folder, for clients that connect mid-batch.
+    """
+    if not folders:
+        return {}
+    marks = ','.join('?' * len(folders))
+    with session(data_dir) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT * FROM events WHERE id IN (
+                SELECT MAX(id) FROM events
+                WHERE kind = 'progress' AND folder IN ({marks})
+                GROUP BY folder
+            )
+            """,
+            folders
+        ).fetchall()
+    return {r['folder']: _event(r) for r in rows}
+
+
+def _upsert(conn: sqlite3.Connection, row: dict) -> None:
+    conn.execute(
+        """
+        INSERT INTO jobs (folder, audio_filename, lang_key, sent_time, segments, completed, tasks)
+        VALUES (:folder, :audio_filename, :lang_key, :sent_time, :segments, :completed, :tasks)
+        ON CONFLICT(folder) DO UPDATE SET
+            audio_filename = excluded.audio_filename,
+            lang_key       = excluded.lang_key,
+            sent_time      = excluded.sent_time,
+            segments       = excluded.segments,
+            completed      = excluded.completed,
+            tasks          = excluded.tasks
+        """,
+        row
+    )
+
+
+def encode_cursor(row: dict, sort: str) -> str:
+    raw = json.dumps([row[sort], row['folder']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """
+    Inverse of encode_cursor(); ValueError for anything it did not produce.
+    """
+    decoded = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    if not (isinstance(decoded, list) and len(decoded) == 2 and all(isinstance(v, str) for v in decoded)):
+        raise ValueError("Malformed page cursor")
+    value, folder = decoded
+    return value, folder
+
+
+def query_jobs(data_dir: str,
+               limit: int = 50,
+               lang: str | None = None,
+               status: str | None = None,
+               q: str | None = None,
+               sort: str = 'sent_time',
+               order: str = 'desc',
+               after: str | None = None,
+               before: str | None = None) -> tuple[list[dict], str | None, str | None]:
+    """
+    One page of jobs using keyset pagination on (sort, folder), so the cost
+    of a page does not grow with history size or page number.
+
+    `after` continues past the last row of a page, `before` goes back from
+    the first row of a page. Returns (rows, next_cursor, prev_cursor).
+    """
+    if sort not in SORT_KEYS:
+        sort = 'sent_time'
+    descending = order != 'asc'
+
+    where, params = [], []
+    if lang:
+        where.append('lang_key = ?')
+        params.append(lang)
+    if status in ('complete', 'pending'):
+        where.append('completed = ?')
+        params.append(1 if status == 'complete' else 0)
+    if q:
+        where.append("audio_filename LIKE ? ESCAPE '\\'")
+        params.append('%' + q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+
+    # Walking backwards flips both the comparison and the scan direction
+    backwards = before is not None and after is None
+    cursor = before if backwards else after
+    scan_desc = descending != backwards
+    if cursor:
+        value, folder = decode_cursor(cursor)
+        op = '<' if scan_desc else '>'
+        where.append(f'({sort} {op} ? OR ({sort} = ? AND folder {op} ?))')
+        params.extend([value, value, folder])
+
+    direction = 'DESC' if scan_desc else 'ASC'
+    sql = 'SELECT * FROM jobs'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += f' ORDER BY {sort} {direction}, folder {direction} LIMIT ?'
+    params.append(limit + 1)
+
+    with session(data_dir) as conn:
+        rows = [dict(r) for r in conn.execute(sql, params)]
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+    for r in rows:
+        r['tasks'] = json.loads(r['tasks'])
+        r['completed'] = bool(r['completed'])
+
+    if not rows:
+        return rows, None, None
+    if backwards:
+        next_cursor = encode_cursor(rows[-1], sort)
+        prev_cursor = encode_cursor(rows[0], sort) if has_more else None
+    else:
+        next_cursor = encode_cursor(rows[-1], sort) if has_more else None
+        prev_cursor = encode_cursor(rows[0], sort) if cursor else None
+    return rows, next_cursor, prev_cursor
+
+
+def get_job(data_dir: str, folder: str) -> dict | None:
+    with session(data_dir) as conn:
+        row = conn.execute('SELECT * FROM jobs WHERE folder = ?', (folder,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job['tasks'] = json.loads(job['tasks'])
+    job['completed'] = bool(job['completed'])
+    return job
+
+
+def record_archive(data_dir: str, folder: str, path: str, size: int, sent_time: str) -> None:
+    """
+    Note that batch `folder` now lives in the archive at `path` (relative
+    to `data_dir`); its jobs row stays so listings are unchanged.
+    """
+    with session(data_dir) as conn:
+        _record_archive(conn, folder, path, size, sent_time)
+
+
+def _record_archive(conn: sqlite3.Connection, folder: str, path: str, size: int, sent_time: str) -> None:
+    conn.execute(
+        """
+        INSERT INTO archives (folder, path, bytes, sent_time, archived) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(folder) DO UPDATE SET
+            path = excluded.path, bytes = excluded.bytes,
+            sent_time = excluded.sent_time, archived = excluded.archived
+        """,
+        (folder, path, size, sent_time, time.time())
+    )
+
+
+def get_archive(data_dir: str, folder: str) -> dict | None:
+    with session(data_dir) as conn:
+        row = conn.execute('SELECT * FROM archives WHERE folder = ?', (folder,)).fetchone()
+    return dict(row) if row else None
+
+
+def list_archives(data_dir: str) -> list[dict]:
+    """
+    Every archived batch, oldest sent_time first.
+    """
+    with session(data_dir) as conn:
+        return [dict(r) for r in conn.execute('SELECT * FROM archives ORDER BY sent_time, folder')]
+
+
+def incomplete_jobs(data_dir: str) -> list[dict]:
+    """
+    Batches still moving through the pipeline (queued or in a stage).
+    """
+    with session(data_dir) as conn:
+        rows = [dict(r) for r in conn.execute('SELECT folder, sent_time, tasks FROM jobs WHERE completed = 0')]
+    for r in rows:
+        r['tasks'] = json.loads(r['tasks'])
+    return rows
+
+
+def unarchived_completed(data_dir: str) -> list[dict]:
+    """
+    Finished batches still stored as folders under `data_dir`.
+    """
+    with session(data_dir) as conn:
+        rows = [dict(r) for r in conn.execute(
+            'SELECT * FROM jobs WHERE completed = 1 AND folder NOT IN (SELECT folder FROM archives) '
+            'ORDER BY sent_time, folder'
+        )]
+    for r in rows:
+        r['tasks'] = json.loads(r['tasks'])
+    return rows
+
+
+def delete_job(data_dir: str, folder: str) -> None:
+    """
+    Forget an expired batch: its jobs row, archive entry and events.
+    """
+    with session(data_dir) as conn:
+        conn.execute('DELETE FROM jobs WHERE folder = ?', (folder,))
+        conn.execute('DELETE FROM archives WHERE folder = ?', (folder,))
+        conn.execute('DELETE FROM events WHERE folder = ?', (folder,))
+
+
+def languages(data_dir: str) -> list[str]:
+    with session(data_dir) as conn:
+        return [r[0] for r in conn.execute('SELECT DISTINCT lang_key FROM jobs ORDER BY lang_key')]
+
+
+def rebuild(data_dir: str) -> int:
+    """
+    (Re)index every batch folder under `data_dir` from its request.json,
+    and every archived batch from the request.json inside its zip.
+    Only needed once for history that predates the index.
+    """
+    from utils.request_utils import load_request
+    from utils.archive import iter_archived_requests
+
+    count = 0
+    with session(data_dir) as conn:
+        for name in os.listdir(data_dir):
+            sub = os.path.join(data_dir, name)
+            if not os.path.isfile(os.path.join(sub, 'request.json')):
+                continue
+            try:
+                _upsert(conn, _row_from_request(name, load_request(sub)))
+                count += 1
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping %s while indexing: %s", name, e)
+        try:
+            for folder, path, size, data in iter_archived_requests(data_dir):
+                _upsert(conn, _row_from_request(folder, data))
+                _record_archive(conn, folder, path, size, data.get('sent_time', '') or '')
+                count += 1
+        except OSError as e:
+            logger.warning("Stopped indexing archives: %s", e)
+    return count
+
+
+def ensure_index(data_dir: str) -> None:
+    """
+    Build the index from disk the first time it is needed.
+    """
+    if os.path.exists(index_path(data_dir)):
+        return
+    count = rebuild(data_dir)
+    logger.info("Built job index with %d batches", count)
+
+
+if __name__ == '__main__':
+    # python -m utils.job_index rebuild [DATA_DIR]
+    if len(sys.argv) >= 2 and sys.argv[1] == 'rebuild':
+        target = sys.argv[2] if len(sys.argv) > 2 else os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+        print(f"Indexed {rebuild(target)} batches in {index_path(target)}")
+    else:
+        print("usage: python -m utils.job_index rebuild [DATA_DIR]")
@@ -37,3 +37,15 @@ def setup_logger(name: str,
 
     logger.propagate = False
     return logger
+
+
+def close_logger(name: str) -> None:
+    """
+    Detach and close the handlers of logger `name`, releasing its log file
+    so the batch folder can be archived or removed. A later setup_logger()
+    call for the same name attaches fresh handlers.
+    """
+    logger = logging.getLogger(name)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
@@ -1,10 +1,14 @@
 import os
 import os
+import copy
 import json
 import pathlib
 import urllib.parse
 import re
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
+from typing import Callable
 from markupsafe import Markup
 from flask import Flask, render_template, request, jsonify, send_file, abort
 import requests
@@ -16,6 +20,8 @@ from utils.atomic_queue import AtomicQueue
 from datetime import datetime
 from filelock import FileLock
 
+from utils import job_index
+
 # Keys for lifecycle task timestamps
 TASK_KEYS = [
     'converterCompleted',
@@ -25,25 +31,105 @@ TASK_KEYS = [
     'cleanerCompleted',
 ]
 
+REQUEST_NAME = 'request.json'
+
+# Parsed request.json per batch folder: path -> (stat signature, data).
+# Writers replace the file atomically, so a matching (inode, size, mtime)
+# means the cached copy is still what is on disk. Least recently used
+# entries are dropped beyond REQUEST_CACHE_SIZE.
+REQUEST_CACHE_SIZE = 256
+_request_cache: OrderedDict[str, tuple[tuple, dict]] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _signature(path: str) -> tuple:
+    st = os.stat(path)
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _remember(path: str, entry: tuple[tuple, dict]) -> None:
+    with _cache_lock:
+        _request_cache[path] = entry
+        _request_cache.move_to_end(path)
+        while len(_request_cache) > REQUEST_CACHE_SIZE:
+            _request_cache.popitem(last=False)
+
+
+def _read_cached(path: str) -> dict:
+    try:
+        sig = _signature(path)
+    except FileNotFoundError:
+        forget_request(os.path.dirname(path))
+        raise
+    with _cache_lock:
+        cached = _request_cache.get(path)
+        if cached is not None:
+            _request_cache.move_to_end(path)
+    if cached is None or cached[0] != sig:
+        with open(path, 'r', encoding='utf-8') as f:
+            cached = (sig, json.load(f))
+        _remember(path, cached)
+    return copy.deepcopy(cached[1])
+
+
+def forget_request(subfolder: str) -> None:
+    """
+    Drop the cached request.json of a batch folder that is going away.
+    """
+    with _cache_lock:
+        _request_cache.pop(os.path.join(subfolder, REQUEST_NAME), None)
+
+
+def _write_atomic(path: str, data: dict) -> None:
+    """
+    Write to a temp file next to `path` and rename it over the original,
+    so readers see either the old or the new request.json, never a
+    partial one. Caller holds the lock.
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+    _remember(path, (_signature(path), copy.deepcopy(data)))
+
+
 def load_request(subfolder: str) -> dict:
     """
-    Load the batch’s request.json under a lock.
+    Load the batch’s request.json. Writes are atomic renames, so no lock is
+    needed to read; repeat loads are served from the per-process cache
+    while the file is unchanged.
     """
-    path = os.path.join(subfolder, 'request.json')
-    lock = FileLock(path + '.lock')
-    with lock:
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    return _read_cached(os.path.join(subfolder, REQUEST_NAME))
 
 def save_request(subfolder: str, data: dict) -> None:
     """
-    Overwrite request.json (keeping indentation) under lock.
+    Replace request.json wholesale under lock, and refresh the job index.
+    Use update_request() to change part of an existing request.
+    """
+    path = os.path.join(subfolder, REQUEST_NAME)
+    with FileLock(path + '.lock'):
+        _write_atomic(path, data)
+        job_index.upsert_job(subfolder, data)
+
+def update_request(subfolder: str,
+                   mutator: Callable[[dict], dict | None]) -> dict:
+    """
+    Read-modify-write request.json under a single lock so concurrent
+    updates from different stages cannot overwrite each other.
+    `mutator` edits the dict in place (or returns a replacement).
+    Returns the saved data and refreshes the job index.
     """
-    path = os.path.join(subfolder, 'request.json')
-    lock = FileLock(path + '.lock')
-    with lock:
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+    path = os.path.join(subfolder, REQUEST_NAME)
+    with FileLock(path + '.lock'):
+        data = _read_cached(path)
+        result = mutator(data)
+        if result is not None:
+            data = result
+        _write_atomic(path, data)
+        # Still under the lock, so the index sees updates in the same
+        # order as request.json
+        job_index.upsert_job(subfolder, data)
+    return data
 
 def update_task_timestamp(subfolder: str,
                           task_name: str,
@@ -53,10 +139,11 @@ def update_task_timestamp(subfolder: str,
     """
     if timestamp is None:
         timestamp = datetime.utcnow().isoformat()
-    data = load_request(subfolder)
-    tasks = data.setdefault('tasks', {})
-    tasks[task_name] = timestamp
-    save_request(subfolder, data)
+
+    def stamp(data: dict) -> None:
+        data.setdefault('tasks', {})[task_name] = timestamp
+
+    update_request(subfolder, stamp)
 
 def create_transcription_request(subfolder: str,
                                  audio_filename: str,
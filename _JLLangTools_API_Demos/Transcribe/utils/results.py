@@ -0,0 +1,118 @@
+# utils/results.py
+
+import os
+import json
+import time
+
+RESULTS_NAME   = 'results.jsonl'
+# Records appended between fsyncs, and the longest an appended record may
+# stay unsynced (seconds); close() always syncs
+FSYNC_EVERY    = 32
+FSYNC_INTERVAL = 2.0
+
+
+def results_path(subfolder: str) -> str:
+    return os.path.join(subfolder, RESULTS_NAME)
+
+
+def _key(chunk_file: str) -> str:
+    return os.path.normpath(chunk_file).replace('\\', '/')
+
+
+class ResultsWriter:
+    """
+    Appends one JSON line per transcribed chunk to the batch's
+    results.jsonl. Lines are flushed as written and fsynced in groups, so a
+    crash loses at most the last unsynced records, and a half-written last
+    line is skipped by the readers.
+    """
+
+    def __init__(self, subfolder: str, fsync_every: int = FSYNC_EVERY,
+                 fsync_interval: float = FSYNC_INTERVAL):
+        self.path           = results_path(subfolder)
+        self.fsync_every    = fsync_every
+        self.fsync_interval = fsync_interval
+        self.unsynced       = 0
+        self.last_sync      = time.monotonic()
+        self.f              = open(self.path, 'ab')
+        # Terminate a line torn by a crash so the next record starts clean
+        if self.f.tell():
+            with open(self.path, 'rb') as r:
+                r.seek(-1, os.SEEK_END)
+                if r.read(1) != b'\n':
+                    self.f.write(b'\n')
+
+    def append(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        self.f.write(line.encode('utf-8'))
+        self.f.flush()
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self) -> None:
+        if self.unsynced:
+            os.fsync(self.f.fileno())
+            self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if not self.f.closed:
+            self.sync()
+            self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_results(subfolder: str, segment: int | None = None):
+    """
+    Yield (byte offset, record) for every complete record, optionally only
+    those of `segment`. Unparsable lines (a write torn by a crash) are skipped.
+    """
+    path = results_path(subfolder)
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        yield from iter_records(f, segment)
+
+
+def iter_records(f, segment: int | None = None):
+    """
+    iter_results() over an already open binary file, e.g. a results.jsonl
+    member of an archived batch's zip.
+    """
+    offset = 0
+    for line in f:
+        start, offset = offset, offset + len(line)
+        if not line.endswith(b'\n'):
+            break
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if segment is None or record.get('segment') == segment:
+            yield start, record
+
+
+def index_results(subfolder: str, segment: int | None = None) -> dict[str, int]:
+    """
+    chunk_file -> byte offset of its record. A chunk transcribed again
+    (batch retried) maps to its latest record.
+    """
+    return {_key(record['chunk_file']): offset for offset, record in iter_results(subfolder, segment)}
+
+
+def read_at(f, offset: int) -> dict:
+    """
+    The record at `offset` of an open (binary) results file.
+    """
+    f.seek(offset)
+    return json.loads(f.readline())
+
+
+def lookup(index: dict[str, int], chunk_file: str) -> int | None:
+    return index.get(_key(chunk_file))
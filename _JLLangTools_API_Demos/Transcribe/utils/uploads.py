@@ -0,0 +1,208 @@
+# utils/uploads.py
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from datetime import datetime
+
+from filelock import FileLock, Timeout
+
+STATE_NAME        = 'upload.json'
+PART_SUFFIX       = '.part'
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+MAX_PART_SIZE     = 64 * 1024 * 1024
+COPY_BLOCK        = 1024 * 1024
+# Uploads with no part received for this long (seconds) are removed
+UPLOAD_TTL        = int(os.environ.get('TRANSCRIBE_UPLOAD_TTL', str(24 * 3600)))
+
+
+class UploadError(Exception):
+    """
+    Client-side problem with an upload (bad part, checksum mismatch, ...).
+    """
+
+
+class UploadGone(UploadError):
+    """
+    The upload was completed (or removed) while, or before, a request used it.
+    """
+
+
+def _state_path(subfolder: str) -> str:
+    return os.path.join(subfolder, STATE_NAME)
+
+
+def load_state(subfolder: str) -> dict:
+    with open(_state_path(subfolder), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_state(subfolder: str, state: dict) -> None:
+    path = _state_path(subfolder)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def parts_total(state: dict) -> int:
+    return max(1, -(-state['size'] // state['part_size']))
+
+
+def part_length(state: dict, index: int) -> int:
+    start = index * state['part_size']
+    return min(state['part_size'], state['size'] - start)
+
+
+def status(state: dict) -> dict:
+    received = sorted(int(i) for i in state['parts'])
+    return {
+        'filename':    state['filename'],
+        'size':        state['size'],
+        'part_size':   state['part_size'],
+        'parts_total': parts_total(state),
+        'received':    received,
+    }
+
+
+def init_upload(subfolder: str, filename: str, size: int, part_size: int,
+                lang_key: str, segments: list[dict]) -> dict:
+    """
+    Create the upload state and a sparse target file of the final size, so
+    parts can be written at their offsets in any order.
+    """
+    if size < 0:
+        raise UploadError("size must be non-negative")
+    part_size = min(max(part_size or DEFAULT_PART_SIZE, 64 * 1024), MAX_PART_SIZE)
+    state = {
+        'filename':  filename,
+        'size':      size,
+        'part_size': part_size,
+        'lang_key':  lang_key,
+        'segments':  segments,
+        'created':   datetime.utcnow().isoformat(),
+        'parts':     {},
+    }
+    with open(os.path.join(subfolder, filename + PART_SUFFIX), 'wb') as f:
+        f.truncate(size)
+    _save_state(subfolder, state)
+    return state
+
+
+def _load_live_state(subfolder: str) -> dict:
+    try:
+        return load_state(subfolder)
+    except FileNotFoundError:
+        raise UploadGone("Upload is already complete or no longer exists")
+
+
+def write_part(subfolder: str, index: int, stream, expected_sha256: str | None = None) -> dict:
+    """
+    Stream one part into a temp file next to the target, verify length and
+    (if given) SHA-256, then copy it to its offset and record it under the
+    state lock. A bad re-send of a part therefore never touches bytes that
+    were already accepted. Parts may arrive concurrently and be re-sent;
+    the last good copy wins.
+    """
+    state = _load_live_state(subfolder)
+    if not 0 <= index < parts_total(state):
+        raise UploadError(f"Part {index} out of range")
+    expected_len = part_length(state, index)
+    target = os.path.join(subfolder, state['filename'] + PART_SUFFIX)
+    tmp = f"{target}{index}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    try:
+        digest, written = hashlib.sha256(), 0
+        try:
+            f = open(tmp, 'wb')
+        except FileNotFoundError:
+            # Folder removed by expire_stale()
+            raise UploadGone("Upload is already complete or no longer exists")
+        with f:
+            while written <= expected_len:
+                block = stream.read(min(COPY_BLOCK, expected_len + 1 - written))
+                if not block:
+                    break
+                if written + len(block) > expected_len:
+                    raise UploadError(f"Part {index} is longer than {expected_len} bytes")
+                f.write(block)
+                digest.update(block)
+                written += len(block)
+
+        if written != expected_len:
+            raise UploadError(f"Part {index} has {written} bytes, expected {expected_len}")
+        sha = digest.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != sha:
+            raise UploadError(f"Checksum mismatch for part {index}")
+
+        # complete_upload() holds the same lock, so it never sees a part
+        # half copied, and a part arriving after it finds the upload gone
+        with FileLock(_state_path(subfolder) + '.lock'):
+            state = _load_live_state(subfolder)
+            with open(tmp, 'rb') as src, open(target, 'r+b') as dst:
+                dst.seek(index * state['part_size'])
+                shutil.copyfileobj(src, dst, COPY_BLOCK)
+            state['parts'][str(index)] = sha
+            _save_state(subfolder, state)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return status(state)
+
+
+def complete_upload(subfolder: str) -> dict:
+    """
+    Check every part arrived, move the file into place and drop the upload
+    state. Returns the final state (filename, lang_key, segments, ...).
+    """
+    with FileLock(_state_path(subfolder) + '.lock'):
+        state = _load_live_state(subfolder)
+        missing = [i for i in range(parts_total(state)) if str(i) not in state['parts']]
+        if missing and state['size']:
+            raise UploadError(f"Missing parts: {missing[:20]}")
+        target = os.path.join(subfolder, state['filename'])
+        os.replace(target + PART_SUFFIX, target)
+        os.remove(_state_path(subfolder))
+    return state
+
+
+def iter_pending(data_dir: str):
+    """
+    Yield (folder path, state) for every upload started but not completed.
+    """
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                yield entry.path, load_state(entry.path)
+            except (OSError, ValueError):
+                continue
+
+
+def expire_stale(data_dir: str, now: float | None = None) -> list[str]:
+    """
+    Remove uploads whose state was last written (init or a received part)
+    more than UPLOAD_TTL seconds ago, with their partial file. Returns the
+    removed folder names.
+    """
+    cutoff  = (now or time.time()) - UPLOAD_TTL
+    removed = []
+    for subfolder, _ in list(iter_pending(data_dir)):
+        path = _state_path(subfolder)
+        try:
+            # Skip an upload a part is being committed to right now
+            with FileLock(path + '.lock', timeout=0):
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                # Without its state the upload is gone for every request;
+                # the folder goes once the lock file is no longer held
+                os.remove(path)
+        except (Timeout, FileNotFoundError):
+            continue
+        shutil.rmtree(subfolder, ignore_errors=True)
+        removed.append(os.path.basename(subfolder))
+    return removed
@@ -0,0 +1,74 @@
+# utils/vad.py
+
+import numpy as np
+from pydub import AudioSegment
+
+# ── Tuning ───────────────────────────────────────────────────────────────────
+ANALYSIS_RATE     = 16000   # resample chunks to this rate before scoring
+FRAME_MS          = 30
+FRAME_MIN_DB      = -45     # frames quieter than this are never speech
+DYNAMIC_RANGE_DB  = 30      # ...nor those this far below the chunk's loudest frame
+MAX_FLATNESS      = 0.45    # spectral flatness above this is noise-like
+VOICE_BAND_HZ     = (100, 4000)
+MIN_BAND_RATIO    = 0.6     # share of frame energy inside VOICE_BAND_HZ
+MIN_SPEECH_MS     = 250     # chunk needs at least this much speech-like audio
+MIN_MODULATION    = 0.15    # share of envelope energy at 2–8 Hz (syllable rate)
+STEADY_RATIO      = 0.8     # chunks loud for this share of frames must show modulation
+
+
+def _samples(chunk: AudioSegment) -> np.ndarray:
+    mono = chunk.set_channels(1).set_frame_rate(ANALYSIS_RATE).set_sample_width(2)
+    return np.array(mono.get_array_of_samples(), dtype=np.float32) / 32768.0
+
+
+def score_chunk(chunk: AudioSegment) -> dict:
+    """
+    Score a chunk for speech with cheap frame features:
+      • frame energy above an absolute floor and near the chunk's peak level
+      • low spectral flatness (voiced/harmonic rather than noise)
+      • most energy inside the voice band
+    plus, for chunks that are loud almost throughout, a check that the energy
+    envelope fluctuates at syllable rate, which separates continuous speech
+    from steady music beds and hum without penalising short utterances.
+
+    Returns {'speech': bool, 'vad_score': share of speech-like frames,
+             'speech_ms': speech-like duration, 'modulation': 2–8 Hz
+             envelope energy share}.
+    """
+    x = _samples(chunk)
+    frame = ANALYSIS_RATE * FRAME_MS // 1000
+    n = len(x) // frame
+    if n < 3:
+        return {'speech': False, 'vad_score': 0.0, 'speech_ms': 0, 'modulation': 0.0}
+
+    frames = x[:n * frame].reshape(n, frame) * np.hanning(frame)
+    rms = np.sqrt(np.mean(np.square(frames), axis=1)) + 1e-10
+    rms_db = 20 * np.log10(rms)
+
+    power = np.square(np.abs(np.fft.rfft(frames, axis=1))) + 1e-12
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    freqs = np.fft.rfftfreq(frame, 1 / ANALYSIS_RATE)
+    band = (freqs >= VOICE_BAND_HZ[0]) & (freqs <= VOICE_BAND_HZ[1])
+    band_ratio = power[:, band].sum(axis=1) / power.sum(axis=1)
+
+    loud = (rms_db > FRAME_MIN_DB) & (rms_db > rms_db.max() - DYNAMIC_RANGE_DB)
+    speech_frames = loud & (flatness < MAX_FLATNESS) & (band_ratio > MIN_BAND_RATIO)
+    vad_score = float(speech_frames.mean())
+    speech_ms = int(speech_frames.sum()) * FRAME_MS
+
+    # Envelope modulation spectrum, sampled at the frame rate
+    env = rms - rms.mean()
+    env_power = np.square(np.abs(np.fft.rfft(env)))
+    env_freqs = np.fft.rfftfreq(n, FRAME_MS / 1000)
+    syllabic = (env_freqs >= 2) & (env_freqs <= 8)
+    total = env_power[1:].sum()
+    modulation = float(env_power[syllabic].sum() / total) if total > 0 else 0.0
+
+    steady = loud.mean() >= STEADY_RATIO and modulation < MIN_MODULATION
+    speech = speech_ms >= MIN_SPEECH_MS and not steady
+    return {
+        'speech':     bool(speech),
+        'vad_score':  round(vad_score, 3),
+        'speech_ms':  speech_ms,
+        'modulation': round(modulation, 3),
+    }
@@ -0,0 +1,33 @@
+# wsgi.py
+"""
+Production entry point for the demo web app.
+
+Neither server is needed by the development server (python app.py), so
+install the one for your platform alongside the demo's other packages.
+
+Linux / WSL (several worker processes, threads for SSE and uploads):
+
+    pip install gunicorn==23.0.0
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Windows, where gunicorn does not run, serves the same app with waitress:
+
+    pip install waitress
+    python wsgi.py
+
+The pipeline stages (converter, chunker, ...) still run as their own
+processes; workers only share state through data/ (queues, request.json,
+jobs.sqlite), so any number of them can run side by side.
+"""
+
+import os
+
+from app import app
+
+if __name__ == '__main__':
+    try:
+        from waitress import serve
+    except ImportError:
+        raise SystemExit("waitress is not installed: pip install waitress")
+    serve(app, host='0.0.0.0', port=int(os.environ.get('PORT', '6001')),
+          threads=int(os.environ.get('TRANSCRIBE_WEB_THREADS', '16')))
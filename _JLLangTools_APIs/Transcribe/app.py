@@ -1,95 +1,24 @@
 from flask import Flask, request, jsonify
-import os
 import io
-import contextlib
-import librosa
+import os
 import torch
-from collections import OrderedDict
-from transformers import WhisperProcessor, WhisperForConditionalGeneration
+from concurrent.futures import TimeoutError as FutureTimeout
 
-try:
-    import psutil
-    PSUTIL_AVAILABLE = True
-except ImportError:
-    PSUTIL_AVAILABLE = False
+from inference import (MODEL_MAPPING, PRELOAD_MODELS, AUTO_KEYS, model_manager,
+                       transcribe_audio, identify_language)
+from decoding import DEFAULT_DECODING, resolve_decoding
+from encoder_cache import encoder_cache
+from profiling import PhaseTimer, profiling_requested, log_timings, sampled_capture
+from executor import QueueFull, REQUEST_TIMEOUT, inference_executor
+from jobs import job_queue, resolve_shared_path, check_webhook
+import workers
 
 app = Flask(__name__)
 
-# Mapping from language keys to model directories
-MODEL_MAPPING = {
-    "en": "Whisper/openai_whisper-medium.en",
-    "fr": "Whisper/bofenghuang_whisper-medium-french",
-    "es": "Whisper/zuazo_whisper-medium-es",
-    "xx-large": "Whisper/openai_whisper-large-v2",
-    "xx-medium": "Whisper/openai_whisper-medium",
-}
-
-# LRU model cache
-class ModelManager:
-    def __init__(self, max_models=2):
-        self.cache = OrderedDict()
-        self.max_models = max_models
-
-    def get_model(self, lang_key):
-        model_dir = MODEL_MAPPING.get(lang_key)
-        if not model_dir:
-            raise ValueError(f"No model mapping found for language key: {lang_key}")
-
-        if lang_key in self.cache:
-            self.cache.move_to_end(lang_key)
-            return self.cache[lang_key]
-
-        # Load model and processor
-        processor = WhisperProcessor.from_pretrained(model_dir)
-        model = WhisperForConditionalGeneration.from_pretrained(model_dir)
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        model.to(device)
-
-        # Evict LRU if needed
-        if len(self.cache) >= self.max_models:
-            evicted_key, _ = self.cache.popitem(last=False)
-            print(f"Evicted model: {evicted_key}")
-
-        self.cache[lang_key] = {"processor": processor, "model": model, "device": device}
-        return self.cache[lang_key]
-
-# Instantiate model manager
-model_manager = ModelManager(max_models=2)
-
-def suppress_stderr(func, *args, **kwargs):
-    with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
-        return func(*args, **kwargs)
-
-def transcribe_audio(audio_file, lang_key):
-    # Load audio
-    audio_bytes = audio_file.read()
-    audio_file_obj = io.BytesIO(audio_bytes)
-    audio, sr = suppress_stderr(librosa.load, audio_file_obj, sr=16000)
-
-    # Load model and processor from manager
-    model_data = model_manager.get_model(lang_key)
-    processor = model_data["processor"]
-    model = model_data["model"]
-    device = model_data["device"]
-
-    if PSUTIL_AVAILABLE:
-        process = psutil.Process()
-        print(f"Using model '{lang_key}'. Memory usage: {process.memory_info().rss / (1024*1024):.2f} MB")
-
-    # Prepare input and transcribe
-    force_language = lang_key if lang_key in ("en", "fr", "es") else None
-    if force_language:
-        inputs = processor(audio, sampling_rate=16000, return_tensors="pt", language=force_language)
-        inputs.input_features = inputs.input_features.to(device)
-        forced_decoder_ids = processor.get_decoder_prompt_ids(language=force_language, task="transcribe")
-        generated_ids = model.generate(inputs.input_features, forced_decoder_ids=forced_decoder_ids) if forced_decoder_ids else model.generate(inputs.input_features)
-    else:
-        inputs = processor(audio, sampling_rate=16000, return_tensors="pt")
-        inputs.input_features = inputs.input_features.to(device)
-        generated_ids = model.generate(inputs.input_features)
-
-    transcription = processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
-    return transcription
+def _queue_full(e):
+    response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
 
 @app.route('/transcribe', methods=['POST'])
 def transcribe():
@@ -98,13 +27,114 @@ def transcribe():
 
     audio_file = request.files['audio']
     lang_key = request.form.get('lang_key', 'en').lower()
+    if lang_key not in MODEL_MAPPING and lang_key not in AUTO_KEYS:
+        return jsonify({'error': f'No model mapping found for language key: {lang_key}'}), 400
+    try:
+        decoding = resolve_decoding(MODEL_MAPPING.get(lang_key, {}).get('decoding'), request.form)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    profile = profiling_requested(request.headers)
+    timer = PhaseTimer()
+    # Read the upload here so the inference thread never touches the request
+    audio = io.BytesIO(audio_file.read())
+
+    try:
+        future = inference_executor.submit(_run_transcription, audio, lang_key, timer, decoding, profile)
+    except QueueFull as e:
+        return _queue_full(e)
+
+    try:
+        return jsonify(future.result(timeout=REQUEST_TIMEOUT))
+    except FutureTimeout:
+        future.cancel()
+        return jsonify({'error': f'Transcription did not finish within {REQUEST_TIMEOUT:.0f}s'}), 504
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
+def _run_transcription(audio, lang_key, timer, decoding, profile):
+    """
+    Runs on an inference thread; profiling capture wraps only this work.
+    In supervisor mode the thread hands the request to a worker process.
+    """
+    if workers.worker_pool is not None:
+        return workers.worker_pool.run(audio.getvalue(), lang_key, decoding, profile)
+    with sampled_capture(lang_key, profile) as capture:
+        response = transcribe_audio(audio, lang_key, timer, decoding)
+    if profile:
+        breakdown = timer.breakdown()
+        if capture['path']:
+            breakdown['capture'] = capture['path']
+        log_timings(lang_key, breakdown)
+        response['timings'] = breakdown
+    return response
+
+@app.route('/detect', methods=['POST'])
+def detect():
+    """
+    Language ID on the first 30 s of 'audio': the detected language, its
+    probability and the lang_key to send with the actual /transcribe calls.
+    """
+    if 'audio' not in request.files:
+        return jsonify({'error': 'No audio file provided'}), 400
+    audio = io.BytesIO(request.files['audio'].read())
     try:
-        transcription = transcribe_audio(audio_file, lang_key)
-        return jsonify({'transcription': transcription})
+        future = inference_executor.submit(_run_detection, audio)
+    except QueueFull as e:
+        return _queue_full(e)
+    try:
+        return jsonify(future.result(timeout=REQUEST_TIMEOUT))
+    except FutureTimeout:
+        future.cancel()
+        return jsonify({'error': f'Language ID did not finish within {REQUEST_TIMEOUT:.0f}s'}), 504
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _run_detection(audio):
+    if workers.worker_pool is not None:
+        return workers.worker_pool.detect(audio.getvalue())
+    return identify_language(audio)
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """
+    Asynchronous /transcribe: accepts an 'audio' upload or a 'path' under
+    TRANSCRIBE_SHARED_DIR, returns 202 with a job id straight away.
+    Poll GET /jobs/<id>, or pass 'webhook' (a local URL) to be notified.
+    """
+    lang_key = request.form.get('lang_key', 'en').lower()
+    if lang_key not in MODEL_MAPPING and lang_key not in AUTO_KEYS:
+        return jsonify({'error': f'No model mapping found for language key: {lang_key}'}), 400
+    try:
+        decoding = resolve_decoding(MODEL_MAPPING.get(lang_key, {}).get('decoding'), request.form)
+        webhook = check_webhook(request.form['webhook']) if request.form.get('webhook') else None
+        if 'audio' in request.files:
+            audio = io.BytesIO(request.files['audio'].read())
+        elif request.form.get('path'):
+            with open(resolve_shared_path(request.form['path']), 'rb') as f:
+                audio = io.BytesIO(f.read())
+        else:
+            return jsonify({'error': 'Provide an audio file or a path'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    profile = profiling_requested(request.headers)
+    try:
+        job = job_queue.submit(_run_transcription, (audio, lang_key, PhaseTimer(), decoding, profile),
+                               lang_key, webhook)
+    except QueueFull as e:
+        return _queue_full(e)
+    response = jsonify(job)
+    response.headers['Location'] = f"/jobs/{job['id']}"
+    return response, 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job: {job_id}'}), 404
+    return jsonify(job)
+
 @app.route('/device', methods=['GET'])
 def get_device():
     device = "GPU" if torch.cuda.is_available() else "CPU"
@@ -112,7 +142,48 @@ def get_device():
 
 @app.route('/languages', methods=['GET'])
 def get_languages():
-    return jsonify({"languages": list(MODEL_MAPPING.keys())})
+    return jsonify({"languages": list(MODEL_MAPPING.keys()), "auto": list(AUTO_KEYS)})
+
+@app.route('/decoding', methods=['GET'])
+def get_decoding():
+    return jsonify({
+        "defaults": DEFAULT_DECODING,
+        "models": {key: {**DEFAULT_DECODING, **entry.get("decoding", {})} for key, entry in MODEL_MAPPING.items()}
+    })
+
+@app.route('/backends', methods=['GET'])
+def get_backends():
+    return jsonify({"models": model_manager.report(), "encoder_cache": encoder_cache.stats()})
+
+@app.route('/ready', methods=['GET'])
+def get_ready():
+    """
+    Readiness probe: 200 once the configured preloads and their warm-up
+    inference have finished (in every worker, in supervisor mode), else 503.
+    """
+    pool = workers.worker_pool
+    ready = pool.is_ready() if pool else model_manager.ready.is_set()
+    body = {"ready": ready, "preload": PRELOAD_MODELS}
+    if pool:
+        body["workers"] = [{"index": w["index"], "ready": w["ready"]} for w in pool.stats()]
+    else:
+        body["loaded"] = list(model_manager.cache)
+    return jsonify(body), 200 if ready else 503
+
+@app.route('/workers', methods=['GET'])
+def get_workers():
+    pool = workers.worker_pool
+    return jsonify({"mode": "supervisor" if pool else "in-process",
+                    "workers": pool.stats() if pool else []})
+
+@app.route('/queue', methods=['GET'])
+def get_queue():
+    return jsonify({**inference_executor.stats(), 'jobs': job_queue.stats()})
 
 if __name__ == '__main__':
+    # Development server; production runs `gunicorn -c gunicorn.conf.py wsgi:app`
+    # Only the serving process preloads, not the debug reloader's watcher
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if workers.start_pool(PRELOAD_MODELS) is None:
+            model_manager.preload(PRELOAD_MODELS)
     app.run(debug=True, host='0.0.0.0')
@@ -0,0 +1,207 @@
+# backends.py
+
+import os
+import json
+import torch
+from transformers import WhisperConfig, WhisperForConditionalGeneration, GenerationConfig
+
+# Supported inference backends, in the order they are usually tried:
+#   fp32    – stock transformers model (the original behaviour)
+#   int8    – dynamic int8 quantization of nn.Linear layers (CPU only)
+#   bf16    – bfloat16 weights, where the device supports it
+#   compile – torch.compile on the encoder (fixed 30 s input shape)
+#   onnx    – ONNX Runtime export found under <model_dir>/onnx
+#   ct2     – CTranslate2 export found under <model_dir>/ct2
+BACKENDS = ('fp32', 'int8', 'bf16', 'compile', 'onnx', 'ct2')
+
+
+def bf16_supported(device: torch.device) -> bool:
+    if device.type == 'cuda':
+        return torch.cuda.is_bf16_supported()
+    try:
+        a = torch.ones(8, 8, dtype=torch.bfloat16)
+        (a @ a).sum().item()
+        return True
+    except Exception:
+        return False
+
+
+def apply_backend(model, backend: str, device: torch.device):
+    """
+    Transform an already loaded fp32 torch model for `backend`.
+    Returns (model, backend actually applied); unsupported combinations fall
+    back to fp32 with a message rather than failing the load.
+    """
+    if backend == 'int8':
+        if device.type != 'cpu':
+            print(f"int8 dynamic quantization is CPU-only; using fp32 on {device}")
+            return model, 'fp32'
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model, 'int8'
+
+    if backend == 'bf16':
+        if not bf16_supported(device):
+            print(f"bfloat16 not supported on {device}; using fp32")
+            return model, 'fp32'
+        return model.to(torch.bfloat16), 'bf16'
+
+    if backend == 'compile':
+        if not hasattr(torch, 'compile'):
+            print("torch.compile unavailable; using fp32")
+            return model, 'fp32'
+        # The encoder always sees a padded 30 s window, so a static-shape
+        # compile pays off without recompiling per request.
+        encoder = model.get_encoder()
+        encoder.forward = torch.compile(encoder.forward, dynamic=False)
+        return model, 'compile'
+
+    return model, 'fp32'
+
+
+def _load_onnx(model_dir: str, device: torch.device):
+    onnx_dir = os.path.join(model_dir, 'onnx')
+    if not os.path.isdir(onnx_dir):
+        print(f"No ONNX export at {onnx_dir}")
+        return None
+    try:
+        from optimum.onnxruntime import ORTModelForSpeechSeq2Seq
+    except ImportError:
+        print("optimum[onnxruntime] not installed; cannot use onnx backend")
+        return None
+    provider = 'CUDAExecutionProvider' if device.type == 'cuda' else 'CPUExecutionProvider'
+    return ORTModelForSpeechSeq2Seq.from_pretrained(onnx_dir, provider=provider)
+
+
+class CT2Whisper:
+    """
+    Minimal generate()-compatible wrapper around a CTranslate2 Whisper export,
+    so transcribe_audio can treat it like a transformers model.
+    """
+    def __init__(self, ct2_dir: str, tokenizer, device: torch.device):
+        import ctranslate2
+        self._ct2 = ctranslate2
+        self.model = ctranslate2.models.Whisper(ct2_dir, device='cuda' if device.type == 'cuda' else 'cpu')
+        self.tokenizer = tokenizer
+        self.dtype = torch.float32
+
+    def _prompt(self, features, forced_decoder_ids):
+        sot = self.tokenizer.convert_tokens_to_ids('<|startoftranscript|>')
+        if forced_decoder_ids:
+            return [sot] + [tok for _, tok in sorted(forced_decoder_ids)]
+        if self.model.is_multilingual:
+            lang = self.model.detect_language(features)[0][0][0]
+            return [sot] + self.tokenizer.convert_tokens_to_ids([lang, '<|transcribe|>', '<|notimestamps|>'])
+        return [sot, self.tokenizer.convert_tokens_to_ids('<|notimestamps|>')]
+
+    def language_probs(self, input_features) -> dict[str, float]:
+        features = self._ct2.StorageView.from_array(input_features.float().cpu().numpy())
+        return {token.strip('<|>'): prob for token, prob in self.model.detect_language(features)[0]}
+
+    def generate(self, input_features, forced_decoder_ids=None, max_new_tokens=None, num_beams=1, **kwargs):
+        features = self._ct2.StorageView.from_array(input_features.float().cpu().numpy())
+        prompt = self._prompt(features, forced_decoder_ids)
+        options = {'beam_size': num_beams or 1}
+        if max_new_tokens:
+            options['max_length'] = len(prompt) + max_new_tokens
+        results = self.model.generate(features, [prompt] * input_features.shape[0], **options)
+        return [r.sequences_ids[0] for r in results]
+
+
+def _load_ct2(model_dir: str, processor, device: torch.device):
+    ct2_dir = os.path.join(model_dir, 'ct2')
+    if not os.path.isfile(os.path.join(ct2_dir, 'model.bin')):
+        print(f"No CTranslate2 export at {ct2_dir}")
+        return None
+    try:
+        return CT2Whisper(ct2_dir, processor.tokenizer, device)
+    except ImportError:
+        print("ctranslate2 not installed; cannot use ct2 backend")
+        return None
+
+
+def _safetensors_files(model_dir: str) -> list[str]:
+    index = os.path.join(model_dir, 'model.safetensors.index.json')
+    if os.path.exists(index):
+        with open(index, 'r', encoding='utf-8') as f:
+            shards = sorted(set(json.load(f)['weight_map'].values()))
+        return [os.path.join(model_dir, name) for name in shards]
+    single = os.path.join(model_dir, 'model.safetensors')
+    return [single] if os.path.exists(single) else []
+
+
+def _load_mmap(model_dir: str):
+    """
+    Build the model on the meta device and attach the safetensors weights
+    as-is (load_state_dict(assign=True)). On CPU the parameters stay backed
+    by the memory-mapped file, so loading costs page-cache reads rather than
+    a full copy, and worker processes share the same physical pages.
+    Returns None when there are no safetensors weights.
+    """
+    from safetensors.torch import load_file
+
+    files = _safetensors_files(model_dir)
+    if not files:
+        return None
+    config = WhisperConfig.from_pretrained(model_dir)
+    with torch.device('meta'):
+        model = WhisperForConditionalGeneration(config)
+    state = {}
+    for path in files:
+        state.update(load_file(path, device='cpu'))
+    model.load_state_dict(state, strict=False, assign=True)
+    model.tie_weights()
+
+    leftover = [n for n, t in list(model.named_parameters()) + list(model.named_buffers()) if t.is_meta]
+    if leftover:
+        raise RuntimeError(f"Weights missing from safetensors: {leftover[:5]}")
+    # from_pretrained would upcast fp16 checkpoints; keep that behaviour
+    if any(p.is_floating_point() and p.dtype != torch.float32 for p in model.parameters()):
+        model = model.float()
+    if os.path.exists(os.path.join(model_dir, 'generation_config.json')):
+        model.generation_config = GenerationConfig.from_pretrained(model_dir)
+    return model
+
+
+def load_weights(model_dir: str):
+    """
+    Load the transformers model, memory-mapped when possible.
+    Returns (model, loader used).
+    """
+    try:
+        model = _load_mmap(model_dir)
+        if model is not None:
+            return model, 'mmap'
+    except Exception as e:
+        print(f"mmap load of {model_dir} failed ({e}); falling back to from_pretrained")
+    return WhisperForConditionalGeneration.from_pretrained(model_dir), 'from_pretrained'
+
+
+def load_model(model_dir: str, backend: str, processor, device: torch.device):
+    """
+    Load the Whisper model in `model_dir` for the requested backend.
+    Returns (model, backend actually used).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+
+    if backend == 'onnx':
+        model = _load_onnx(model_dir, device)
+        if model is not None:
+            return model, 'onnx'
+    elif backend == 'ct2':
+        model = _load_ct2(model_dir, processor, device)
+        if model is not None:
+            return model, 'ct2'
+
+    model, _ = load_weights(model_dir)
+    model.to(device)
+    model.eval()
+    return apply_backend(model, backend, device)
+
+
+def input_dtype(model) -> torch.dtype:
+    """
+    dtype the model expects for input_features.
+    """
+    dtype = getattr(model, 'dtype', None)
+    return dtype if isinstance(dtype, torch.dtype) else torch.float32
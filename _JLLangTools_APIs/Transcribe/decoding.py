@@ -0,0 +1,100 @@
+# decoding.py
+
+import math
+import numpy as np
+
+# Whisper's decoder holds 448 positions; leave room for the prompt tokens
+WHISPER_MAX_NEW_TOKENS = 440
+
+# Server-side defaults; MODEL_MAPPING[lang_key]["decoding"] overrides these
+# per model and request form fields override both.
+DEFAULT_DECODING = {
+    # "greedy" or "beam"
+    "strategy":          "greedy",
+    "num_beams":         4,
+    "early_stopping":    True,
+    # Explicit cap; when unset it is derived from the audio duration as
+    # ceil(duration × tokens_per_second) + token_margin
+    "max_new_tokens":    None,
+    "tokens_per_second": 6.0,
+    "token_margin":      10,
+    # Inputs whose loudest frames stay below this level (dBFS) are returned
+    # as empty without running the model at all. None disables the gate.
+    "no_speech_db":      -50.0,
+    # Also return per-word start/end times from cross-attention alignment
+    "word_timestamps":   False,
+}
+
+# Form field → parser
+DECODING_FIELDS = {
+    "strategy":          str,
+    "num_beams":         int,
+    "early_stopping":    lambda v: str(v).strip().lower() in ('1', 'true', 'yes'),
+    "max_new_tokens":    int,
+    "tokens_per_second": float,
+    "token_margin":      int,
+    "no_speech_db":      lambda v: None if str(v).strip().lower() in ('', 'none', 'off') else float(v),
+    "word_timestamps":   lambda v: str(v).strip().lower() in ('1', 'true', 'yes'),
+}
+
+
+def resolve_decoding(model_defaults: dict | None, form) -> dict:
+    """
+    Merge DEFAULT_DECODING, the model's defaults and any decoding fields in
+    `form`. Raises ValueError on unparsable or out-of-range values.
+    """
+    options = {**DEFAULT_DECODING, **(model_defaults or {})}
+    for field, parse in DECODING_FIELDS.items():
+        if field in form and str(form[field]).strip() != '':
+            try:
+                options[field] = parse(form[field])
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for {field}: {form[field]!r}")
+
+    if options["strategy"] not in ("greedy", "beam"):
+        raise ValueError(f"Unknown decoding strategy: {options['strategy']}")
+    if options["num_beams"] < 1:
+        raise ValueError("num_beams must be at least 1")
+    if options["max_new_tokens"] is not None and options["max_new_tokens"] < 1:
+        raise ValueError("max_new_tokens must be at least 1")
+    return options
+
+
+def max_new_tokens_for(options: dict, audio_s: float) -> int:
+    if options["max_new_tokens"]:
+        return min(options["max_new_tokens"], WHISPER_MAX_NEW_TOKENS)
+    derived = math.ceil(audio_s * options["tokens_per_second"]) + options["token_margin"]
+    return max(1, min(derived, WHISPER_MAX_NEW_TOKENS))
+
+
+def generate_kwargs(options: dict, audio_s: float) -> dict:
+    """
+    Keyword arguments for model.generate() from resolved options.
+    """
+    kwargs = {"max_new_tokens": max_new_tokens_for(options, audio_s), "do_sample": False}
+    if options["strategy"] == "beam" and options["num_beams"] > 1:
+        kwargs["num_beams"] = options["num_beams"]
+        kwargs["early_stopping"] = options["early_stopping"]
+    else:
+        kwargs["num_beams"] = 1
+    return kwargs
+
+
+def audio_level_db(audio: np.ndarray, sr: int = 16000, frame_ms: int = 30) -> float:
+    """
+    Level of the loudest frames (95th percentile of per-frame RMS) in dBFS,
+    so a short utterance in an otherwise quiet chunk still registers.
+    """
+    frame = max(1, sr * frame_ms // 1000)
+    n = len(audio) // frame
+    if n == 0:
+        rms = float(np.sqrt(np.mean(np.square(audio)))) if len(audio) else 0.0
+    else:
+        frames = audio[:n * frame].reshape(n, frame)
+        rms = float(np.percentile(np.sqrt(np.mean(np.square(frames), axis=1)), 95))
+    return 20 * math.log10(rms + 1e-10)
+
+
+def is_silent(audio: np.ndarray, options: dict, sr: int = 16000) -> bool:
+    threshold = options.get("no_speech_db")
+    return threshold is not None and audio_level_db(audio, sr) < threshold
@@ -1,5 +1,31 @@
+# download_Whisper.py
+"""
+Provision the Whisper checkpoints the API loads into ./Whisper.
+
+Each repo goes to Whisper/<org>_<name> with a manifest.json listing every
+file's size and SHA-256. A folder counts as installed only if it matches
+its manifest, so an interrupted download is detected and fetched again
+instead of breaking model loading at request time.
+
+    python download_Whisper.py                       # fetch what's missing or broken (4 at a time)
+    python download_Whisper.py --mirror /mnt/models  # install from a local copy, offline
+    python download_Whisper.py --verify-only --hash  # check folders, exit 1 on problems
+    python download_Whisper.py --all-formats         # also keep .bin / flax / tf weights
+    python download_Whisper.py distil-whisper/distil-large-v2  # draft model for TRANSCRIBE_ASSISTANTS
+
+By default only safetensors weights plus config/tokenizer files are kept;
+the API memory-maps safetensors and never reads the duplicate formats.
+"""
+
 import os
-from huggingface_hub import snapshot_download
+import sys
+import json
+import shutil
+import fnmatch
+import hashlib
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # List of Hugging Face model repositories to download.
 model_repos = [
@@ -12,18 +38,181 @@ model_repos = [
 
 # Destination directory ("Whisper") in the current working directory.
 destination_dir = "Whisper"
-os.makedirs(destination_dir, exist_ok=True)
 
-# Loop through each model repo and download it to its own subfolder.
-for repo in model_repos:
+MANIFEST_NAME   = "manifest.json"
+# Config, tokenizer and safetensors weights: everything the API loads
+SAFETENSORS_PATTERNS = ["*.json", "*.txt", "*.safetensors"]
+# Fallback for repos that publish no safetensors weights
+BIN_PATTERNS         = ["pytorch_model*.bin"]
+HASH_BLOCK      = 8 * 1024 * 1024
+
+
+def local_folder(dest: str, repo: str) -> str:
     # Create a unique folder name for each model by replacing "/" with "_".
-    local_path = os.path.join(destination_dir, repo.replace("/", "_"))
+    return os.path.join(dest, repo.replace("/", "_"))
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block := f.read(HASH_BLOCK):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_files(folder: str) -> list[str]:
+    files = []
+    for root, dirs, names in os.walk(folder):
+        # huggingface_hub keeps download metadata in .cache/
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in names:
+            rel = os.path.relpath(os.path.join(root, name), folder).replace(os.sep, '/')
+            if rel != MANIFEST_NAME:
+                files.append(rel)
+    return sorted(files)
+
+
+def write_manifest(folder: str, repo: str, source: str) -> dict:
+    manifest = {
+        'repo':    repo,
+        'source':  source,
+        'created': datetime.utcnow().isoformat(),
+        'files':   {},
+    }
+    for rel in list_files(folder):
+        path = os.path.join(folder, rel)
+        manifest['files'][rel] = {'size': os.path.getsize(path), 'sha256': sha256_file(path)}
+    with open(os.path.join(folder, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def verify_folder(folder: str, check_hashes: bool = False) -> list[str]:
+    """
+    Problems found in `folder` compared with its manifest (empty if valid).
+    Sizes are always checked; hashes only when asked, as they read every byte.
+    """
+    manifest_path = os.path.join(folder, MANIFEST_NAME)
+    if not os.path.isdir(folder):
+        return ["missing"]
+    if not os.path.exists(manifest_path):
+        return ["no manifest (incomplete or pre-manifest download)"]
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            files = json.load(f)['files']
+    except (OSError, ValueError, KeyError) as e:
+        return [f"unreadable manifest: {e}"]
+
+    problems = []
+    if not any(name.endswith(('.safetensors', '.bin')) for name in files):
+        problems.append("no weight files")
+    for rel, meta in files.items():
+        path = os.path.join(folder, rel)
+        if not os.path.exists(path):
+            problems.append(f"{rel}: missing")
+        elif os.path.getsize(path) != meta['size']:
+            problems.append(f"{rel}: size {os.path.getsize(path)} != {meta['size']}")
+        elif check_hashes and sha256_file(path) != meta['sha256']:
+            problems.append(f"{rel}: sha256 mismatch")
+    return problems
+
+
+def _matches(rel: str, patterns: list[str] | None) -> bool:
+    return patterns is None or any(fnmatch.fnmatch(os.path.basename(rel), p) for p in patterns)
+
+
+def _fetch_hub(repo: str, target: str, patterns: list[str] | None) -> None:
+    from huggingface_hub import snapshot_download
+
+    snapshot_download(repo_id=repo, local_dir=target, allow_patterns=patterns)
+    if patterns is not None and not any(f.endswith('.safetensors') for f in list_files(target)):
+        print(f"{repo} has no safetensors weights; fetching PyTorch .bin instead")
+        snapshot_download(repo_id=repo, local_dir=target, allow_patterns=patterns + BIN_PATTERNS)
+    shutil.rmtree(os.path.join(target, '.cache'), ignore_errors=True)
+
+
+def _fetch_mirror(repo: str, target: str, patterns: list[str] | None, mirror: str) -> None:
+    """
+    Copy a repo from a local mirror laid out as <mirror>/<org>_<name> or
+    <mirror>/<org>/<name> (e.g. an existing Whisper/ folder or a snapshot tree).
+    """
+    source = next((p for p in (local_folder(mirror, repo), os.path.join(mirror, *repo.split('/')))
+                   if os.path.isdir(p)), None)
+    if source is None:
+        raise FileNotFoundError(f"{repo} not found under mirror {mirror}")
+    files = [rel for rel in list_files(source) if _matches(rel, patterns)]
+    if patterns is not None and not any(f.endswith('.safetensors') for f in files):
+        files = [rel for rel in list_files(source) if _matches(rel, patterns + BIN_PATTERNS)]
+    for rel in files:
+        dst = os.path.join(target, rel)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copy2(os.path.join(source, rel), dst)
+
+
+def provision(repo: str, dest: str, patterns: list[str] | None,
+              mirror: str | None = None, force: bool = False) -> str:
+    """
+    Make sure `repo` is installed and valid under `dest`. Downloads into a
+    .partial folder and renames it into place only once the manifest is
+    written, so a crash never leaves a folder that looks complete.
+    """
+    folder = local_folder(dest, repo)
+    if not force and not verify_folder(folder):
+        return f"{repo}: ok"
+
+    partial = folder + '.partial'
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+    try:
+        if mirror:
+            _fetch_mirror(repo, partial, patterns, mirror)
+        else:
+            _fetch_hub(repo, partial, patterns)
+        manifest = write_manifest(partial, repo, mirror or 'huggingface')
+    except BaseException:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+
+    shutil.rmtree(folder, ignore_errors=True)
+    os.replace(partial, folder)
+    total_mb = sum(f['size'] for f in manifest['files'].values()) / (1024 * 1024)
+    return f"{repo}: installed {len(manifest['files'])} files ({total_mb:.0f} MB)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provision Whisper checkpoints for the Transcribe API.")
+    parser.add_argument('repos', nargs='*', default=model_repos, help="Repos to install (default: all the API uses)")
+    parser.add_argument('--dest', default=destination_dir)
+    parser.add_argument('--workers', type=int, default=4, help="Repos fetched concurrently")
+    parser.add_argument('--mirror', help="Install from this local directory instead of the Hub")
+    parser.add_argument('--all-formats', action='store_true', help="Keep every weight format, not just safetensors")
+    parser.add_argument('--force', action='store_true', help="Re-install even if the folder is valid")
+    parser.add_argument('--verify-only', action='store_true', help="Only check installed folders")
+    parser.add_argument('--hash', action='store_true', help="Also verify SHA-256 of every file")
+    args = parser.parse_args()
+
+    if args.verify_only:
+        failed = 0
+        for repo in args.repos:
+            problems = verify_folder(local_folder(args.dest, repo), args.hash)
+            print(f"{repo}: {'ok' if not problems else '; '.join(problems)}")
+            failed += bool(problems)
+        sys.exit(1 if failed else 0)
+
+    os.makedirs(args.dest, exist_ok=True)
+    patterns = None if args.all_formats else SAFETENSORS_PATTERNS
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(provision, repo, args.dest, patterns, args.mirror, args.force): repo
+                   for repo in args.repos}
+        for future in as_completed(futures):
+            try:
+                print(future.result())
+            except Exception as e:
+                print(f"{futures[future]}: FAILED ({e})")
+                failed += 1
+    sys.exit(1 if failed else 0)
 
-    # Check if the folder already exists, skip if it does.
-    if os.path.exists(local_path):
-        print(f"Skipping {repo}, already exists in {local_path}.\n")
-        continue
 
-    print(f"Downloading {repo} into {local_path}...")
-    snapshot_download(repo_id=repo, local_dir=local_path)
-    print(f"Finished downloading {repo}.\n")
+if __name__ == '__main__':
+    main()
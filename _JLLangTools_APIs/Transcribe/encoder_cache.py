@@ -0,0 +1,87 @@
+# encoder_cache.py
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import torch
+
+# Byte budget for cached encoder outputs (whisper-large: ~7.7 MB per input
+# in fp32, medium: ~5.8 MB). 0 disables the cache.
+ENCODER_CACHE_MB = int(os.environ.get('TRANSCRIBE_ENCODER_CACHE_MB', '256'))
+# Backends whose generate() cannot take precomputed encoder outputs
+UNCACHEABLE_BACKENDS = ('onnx', 'ct2')
+
+
+def cacheable(model_data: dict) -> bool:
+    """
+    Encoder outputs can be reused for plain PyTorch models. An assistant
+    model runs its own encoder on the features, so assisted keys skip it.
+    """
+    return (ENCODER_CACHE_MB > 0
+            and model_data["backend"] not in UNCACHEABLE_BACKENDS
+            and model_data.get("assistant") is None)
+
+
+def cache_key(model_path: str, backend: str, audio) -> tuple:
+    """
+    Same model weights and backend + same samples → same encoder output.
+    `audio` is the float32 array the features are computed from.
+    """
+    return (model_path, backend, hashlib.sha1(audio.tobytes()).hexdigest())
+
+
+class EncoderCache:
+    """
+    LRU of encoder hidden states, bounded by total tensor bytes, so repeat
+    passes over the same input (language ID then transcription, retries
+    with other decoding options) only run the decoder.
+    """
+
+    def __init__(self, max_bytes: int = ENCODER_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries   = OrderedDict()
+        self.bytes     = 0
+        self.hits      = 0
+        self.misses    = 0
+        self._lock     = threading.Lock()
+
+    def get(self, key: tuple) -> torch.Tensor | None:
+        with self._lock:
+            hidden = self.entries.get(key)
+            if hidden is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return hidden
+
+    def put(self, key: tuple, hidden: torch.Tensor) -> None:
+        size = hidden.element_size() * hidden.nelement()
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self.entries:
+                return
+            self.entries[key] = hidden
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, old = self.entries.popitem(last=False)
+                self.bytes -= old.element_size() * old.nelement()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries':  len(self.entries),
+                'mb':       round(self.bytes / (1024 * 1024), 1),
+                'max_mb':   round(self.max_bytes / (1024 * 1024), 1),
+                'hits':     self.hits,
+                'misses':   self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+# Shared by all inference threads of this process
+encoder_cache = EncoderCache()
@@ -0,0 +1,121 @@
+# executor.py
+
+import os
+import math
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+from workers import WORKERS, WORKER_DEPTH
+
+# Inference threads. In-process, models are shared, so more than one mainly
+# helps when requests hit different models or the GPU has headroom. In
+# supervisor mode each thread just waits on a worker process, so there is
+# one per worker slot.
+INFERENCE_WORKERS = int(os.environ.get('TRANSCRIBE_INFERENCE_WORKERS') or WORKERS * WORKER_DEPTH or 1)
+# Requests allowed to wait for a worker before new ones get 429
+QUEUE_SIZE        = int(os.environ.get('TRANSCRIBE_QUEUE_SIZE', '8'))
+# Seconds a request thread waits for its result before giving up
+REQUEST_TIMEOUT   = float(os.environ.get('TRANSCRIBE_REQUEST_TIMEOUT', '600'))
+
+
+class QueueFull(Exception):
+    """
+    Raised by submit() when the inference queue is at capacity.
+    `retry_after` is a rough estimate, in seconds, of when a slot frees up.
+    """
+    def __init__(self, retry_after: int):
+        super().__init__(f"Inference queue full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Bounded queue in front of a few dedicated inference threads. Request
+    threads only parse input and wait on a Future, so a long transcription
+    never blocks the server from accepting, rejecting or answering others.
+    """
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, queue_size: int = QUEUE_SIZE):
+        self.workers    = max(1, workers)
+        self.queue      = queue.Queue(maxsize=max(1, queue_size))
+        self.busy       = 0
+        self.completed  = 0
+        self.rejected   = 0
+        # Moving average of seconds per job, for Retry-After hints
+        self.avg_s      = None
+        self._lock      = threading.Lock()
+        self._threads   = []
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._run, name=f'inference-{i}', daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Queue fn(*args, **kwargs) or raise QueueFull straight away.
+        """
+        return self._submit(fn, args, kwargs, block=False)
+
+    def submit_wait(self, fn, *args, **kwargs) -> Future:
+        """
+        Queue fn(*args, **kwargs), waiting for a free slot instead of failing.
+        For background producers (the job dispatcher), never request threads.
+        """
+        return self._submit(fn, args, kwargs, block=True)
+
+    def _submit(self, fn, args, kwargs, block: bool) -> Future:
+        self.start()
+        future = Future()
+        try:
+            self.queue.put((future, fn, args, kwargs), block=block)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise QueueFull(self.retry_after())
+        return future
+
+    def _run(self) -> None:
+        while True:
+            future, fn, args, kwargs = self.queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                self.busy += 1
+            t0 = time.perf_counter()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                elapsed = time.perf_counter() - t0
+                with self._lock:
+                    self.busy -= 1
+                    self.completed += 1
+                    self.avg_s = elapsed if self.avg_s is None else 0.8 * self.avg_s + 0.2 * elapsed
+
+    def retry_after(self) -> int:
+        per_job = self.avg_s or 5.0
+        return max(1, math.ceil(per_job * (self.queue.qsize() + 1) / self.workers))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'workers':    self.workers,
+                'busy':       self.busy,
+                'queued':     self.queue.qsize(),
+                'queue_size': self.queue.maxsize,
+                'completed':  self.completed,
+                'rejected':   self.rejected,
+                'avg_s':      round(self.avg_s, 3) if self.avg_s is not None else None,
+            }
+
+
+# Shared by all request threads of this process
+inference_executor = InferenceExecutor()
@@ -0,0 +1,14 @@
+# gunicorn.conf.py
+import os
+
+bind         = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+# A single process keeps one copy of each model in memory; concurrency comes
+# from request threads, and inference is serialised by the executor queue.
+workers      = 1
+worker_class = 'gthread'
+threads      = int(os.environ.get('TRANSCRIBE_HTTP_THREADS', '32'))
+# Requests waiting on inference hold a thread, not the worker heartbeat
+timeout      = 120
+graceful_timeout = 30
+keepalive    = 5
+accesslog    = '-'
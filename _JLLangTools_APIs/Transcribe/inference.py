@@ -0,0 +1,516 @@
+# inference.py
+
+import os
+import io
+import time
+import threading
+import contextlib
+import numpy as np
+import librosa
+import torch
+from collections import OrderedDict
+from transformers import WhisperProcessor
+from transformers.modeling_outputs import BaseModelOutput
+
+from backends import BACKENDS, load_model, load_weights, input_dtype
+from decoding import resolve_decoding, generate_kwargs, is_silent
+from encoder_cache import cacheable, cache_key, encoder_cache
+from profiling import PhaseTimer
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+SAMPLE_RATE = 16000
+# Whisper sees at most this much audio per pass (features are cut to 30 s)
+WINDOW_SAMPLES = 30 * SAMPLE_RATE
+
+# Mapping from language keys to model directories and inference backend
+# (one of backends.BACKENDS). TRANSCRIBE_BACKENDS="en=int8,xx-large=bf16"
+# overrides the backend per key without editing this table. An optional
+# "decoding" dict overrides decoding.DEFAULT_DECODING for that key.
+# An optional "assistant" path names a small Whisper model with the same
+# tokenizer (e.g. distil-whisper/distil-large-v2 for xx-large) that drafts
+# tokens for the mapped model to verify during greedy decoding; output is
+# the same as unassisted greedy. TRANSCRIBE_ASSISTANTS="xx-large=Whisper/..."
+# sets it per key.
+MODEL_MAPPING = {
+    "en":        {"path": "Whisper/openai_whisper-medium.en",        "backend": "fp32"},
+    "fr":        {"path": "Whisper/bofenghuang_whisper-medium-french", "backend": "fp32"},
+    "es":        {"path": "Whisper/zuazo_whisper-medium-es",          "backend": "fp32"},
+    "xx-large":  {"path": "Whisper/openai_whisper-large-v2",          "backend": "fp32"},
+    "xx-medium": {"path": "Whisper/openai_whisper-medium",            "backend": "fp32"},
+}
+
+for _pair in filter(None, os.environ.get('TRANSCRIBE_BACKENDS', '').split(',')):
+    _key, _, _backend = _pair.partition('=')
+    if _key.strip() in MODEL_MAPPING and _backend.strip() in BACKENDS:
+        MODEL_MAPPING[_key.strip()]["backend"] = _backend.strip()
+
+for _pair in filter(None, os.environ.get('TRANSCRIBE_ASSISTANTS', '').split(',')):
+    _key, _, _path = _pair.partition('=')
+    if _key.strip() in MODEL_MAPPING:
+        MODEL_MAPPING[_key.strip()]["assistant"] = _path.strip() or None
+
+# Comma-separated lang keys to load (and warm up) before serving
+PRELOAD_MODELS = [k.strip() for k in os.environ.get('TRANSCRIBE_PRELOAD', '').split(',') if k.strip()]
+
+# Language ID: these lang_key values mean "not known". The LANGID_KEY model
+# identifies the language from the first LANGID_SECONDS of audio, and the
+# request is routed to the cheapest mapped model for it. Languages without a
+# dedicated model, or detections below LANGID_MIN_PROB, go to LANGID_FALLBACK.
+AUTO_KEYS       = ("auto", "unknown")
+LANGID_KEY      = os.environ.get('TRANSCRIBE_LANGID_MODEL', 'xx-medium')
+LANGID_FALLBACK = os.environ.get('TRANSCRIBE_LANGID_FALLBACK', 'xx-medium')
+LANGID_MIN_PROB = float(os.environ.get('TRANSCRIBE_LANGID_MIN_PROB', '0.5'))
+LANGID_SECONDS  = 30
+LANGID_ROUTES   = {"en": "en", "fr": "fr", "es": "es"}
+
+
+def suppress_stderr(func, *args, **kwargs):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+        return func(*args, **kwargs)
+
+
+# Decoder forward calls made by the current thread during an assisted
+# generate, per role ('main' verifies, 'draft' proposes); None otherwise
+_decoder_calls = threading.local()
+
+
+def _count_decoder_calls(model, role):
+    def hook(module, args, output):
+        counts = getattr(_decoder_calls, 'counts', None)
+        if counts is not None:
+            counts[role] += 1
+    model.get_decoder().register_forward_hook(hook)
+
+
+# LRU model cache
+class ModelManager:
+    def __init__(self, max_models=2):
+        self.cache = OrderedDict()
+        self.max_models = max_models
+        # Processors are small but slow to build; keep them per model path
+        # across evictions and share them between keys using the same path
+        self.processors = {}
+        # Per lang_key load/usage stats, kept across evictions
+        self.stats = {}
+        # Set once the configured preloads (and their warm-ups) are done
+        self.ready = threading.Event()
+        self._lock = threading.RLock()
+
+    def get_processor(self, path):
+        with self._lock:
+            if path not in self.processors:
+                self.processors[path] = WhisperProcessor.from_pretrained(path)
+            return self.processors[path]
+
+    def get_model(self, lang_key):
+        entry = MODEL_MAPPING.get(lang_key)
+        if not entry:
+            raise ValueError(f"No model mapping found for language key: {lang_key}")
+
+        # Resident models are served without waiting on a load in progress
+        try:
+            self.cache.move_to_end(lang_key)
+            return self.cache[lang_key]
+        except KeyError:
+            pass
+
+        # One loader at a time, so concurrent first requests load a model once
+        with self._lock:
+            if lang_key in self.cache:
+                self.cache.move_to_end(lang_key)
+                return self.cache[lang_key]
+
+            # Load model and processor
+            t0 = time.perf_counter()
+            device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            processor = self.get_processor(entry["path"])
+            t1 = time.perf_counter()
+            model, backend = load_model(entry["path"], entry["backend"], processor, device)
+            assistant = self.load_assistant(lang_key, entry.get("assistant"), model, backend, device)
+            t2 = time.perf_counter()
+
+            # Evict LRU if needed
+            if len(self.cache) >= self.max_models:
+                evicted_key, _ = self.cache.popitem(last=False)
+                print(f"Evicted model: {evicted_key}")
+
+            model_data = {
+                "path":      entry["path"],
+                "processor": processor,
+                "model":     model,
+                "device":    device,
+                "dtype":     input_dtype(model),
+                "backend":   backend,
+                "assistant": assistant,
+            }
+            warmup_s = self.warm_up(model_data)
+            self.cache[lang_key] = model_data
+
+            stats = self.stats.setdefault(lang_key, {"requests": 0, "audio_s": 0.0, "inference_s": 0.0})
+            stats.update({
+                "backend":     backend,
+                "load_s":      round(t2 - t0, 3),
+                "processor_s": round(t1 - t0, 3),
+                "weights_s":   round(t2 - t1, 3),
+                "warmup_s":    round(warmup_s, 3),
+                "loads":       stats.get("loads", 0) + 1,
+            })
+            print(f"Loaded model '{lang_key}' ({backend}) in {t2 - t0:.2f}s "
+                  f"(processor {t1 - t0:.2f}s, weights {t2 - t1:.2f}s), warm-up {warmup_s:.2f}s")
+            return model_data
+
+    @staticmethod
+    def load_assistant(lang_key, path, model, backend, device):
+        """
+        Draft model for assisted decoding, or None when not configured or
+        unusable with this model (then decoding is simply unassisted).
+        """
+        if not path:
+            return None
+        if backend in ('onnx', 'ct2'):
+            print(f"Assistant for '{lang_key}' needs a PyTorch backend, not {backend}; decoding unassisted")
+            return None
+        try:
+            assistant, _ = load_weights(path)
+        except Exception as e:
+            print(f"Could not load assistant {path} for '{lang_key}': {e}; decoding unassisted")
+            return None
+        if assistant.config.vocab_size != model.config.vocab_size:
+            print(f"Assistant {path} does not share the tokenizer of '{lang_key}'; decoding unassisted")
+            return None
+        assistant.to(device, dtype=input_dtype(model))
+        assistant.eval()
+        _count_decoder_calls(model, 'main')
+        _count_decoder_calls(assistant, 'draft')
+        print(f"Loaded assistant {path} for '{lang_key}'")
+        return assistant
+
+    @staticmethod
+    def warm_up(model_data) -> float:
+        """
+        Run one short generate so compile/allocator costs are paid at load
+        time instead of by the first request.
+        """
+        t0 = time.perf_counter()
+        processor = model_data["processor"]
+        audio = np.zeros(SAMPLE_RATE, dtype=np.float32)
+        features = processor(audio, sampling_rate=SAMPLE_RATE, return_tensors="pt").input_features
+        features = features.to(model_data["device"], dtype=model_data["dtype"])
+        with torch.inference_mode():
+            model_data["model"].generate(features, max_new_tokens=4)
+            if model_data.get("assistant") is not None:
+                model_data["model"].generate(features, max_new_tokens=4, assistant_model=model_data["assistant"])
+        return time.perf_counter() - t0
+
+    def preload(self, lang_keys):
+        """
+        Load and warm up `lang_keys`, then mark the manager ready.
+        """
+        for key in lang_keys:
+            try:
+                self.get_model(key)
+            except Exception as e:
+                print(f"Preload of '{key}' failed: {e}")
+        self.ready.set()
+
+    def record(self, lang_key, audio_s, inference_s, assisted=None):
+        stats = self.stats.setdefault(lang_key, {"requests": 0, "audio_s": 0.0, "inference_s": 0.0})
+        stats["requests"] += 1
+        stats["audio_s"] += audio_s
+        stats["inference_s"] += inference_s
+        if assisted:
+            totals = stats.setdefault("assisted", {"requests": 0, "tokens": 0, "drafted": 0,
+                                                   "accepted": 0, "main_calls": 0, "inference_s": 0.0})
+            totals["requests"] += 1
+            totals["inference_s"] += inference_s
+            for field in ("tokens", "drafted", "accepted", "main_calls"):
+                totals[field] += assisted[field]
+
+    def report(self):
+        """
+        Configured vs. active backend, load/warm-up cost and real-time factor
+        (inference seconds per audio second) for every mapped model.
+        """
+        rows = []
+        for key, entry in MODEL_MAPPING.items():
+            stats = self.stats.get(key, {})
+            audio_s = stats.get("audio_s", 0.0)
+            assisted = stats.get("assisted")
+            rows.append({
+                "lang_key":   key,
+                "path":       entry["path"],
+                "configured": entry["backend"],
+                "backend":    stats.get("backend"),
+                "loaded":     key in self.cache,
+                "load_s":     stats.get("load_s"),
+                "processor_s": stats.get("processor_s"),
+                "weights_s":  stats.get("weights_s"),
+                "warmup_s":   stats.get("warmup_s"),
+                "loads":      stats.get("loads", 0),
+                "requests":   stats.get("requests", 0),
+                "audio_s":    round(audio_s, 3),
+                "rtf":        round(stats["inference_s"] / audio_s, 4) if audio_s else None,
+                "assistant":  entry.get("assistant"),
+                "assisted":   _assist_summary(assisted) if assisted else None,
+            })
+        return rows
+
+
+def _assist_summary(totals) -> dict:
+    """
+    acceptance_rate: share of drafted tokens the main model kept.
+    tokens_per_call: tokens produced per main-model decoder pass
+    (1.0 means the assistant saved nothing).
+    """
+    return {
+        **{k: v for k, v in totals.items() if k != "inference_s"},
+        "inference_s":     round(totals["inference_s"], 3),
+        "acceptance_rate": round(totals["accepted"] / totals["drafted"], 4) if totals["drafted"] else None,
+        "tokens_per_call": round(totals["tokens"] / totals["main_calls"], 3) if totals["main_calls"] else None,
+    }
+
+
+# Instantiate model manager
+model_manager = ModelManager(max_models=2)
+
+
+def model_inputs(model_data, audio, timer=None) -> dict:
+    """
+    Encoder input for generate()/forward(): cached encoder outputs for this
+    audio and model when the backend allows (see encoder_cache), otherwise
+    the log-mel features.
+    """
+    timer = timer or PhaseTimer()
+    audio = audio[:WINDOW_SAMPLES]
+    use_cache = cacheable(model_data)
+    if use_cache:
+        key = cache_key(model_data["path"], model_data["backend"], audio)
+        hidden = encoder_cache.get(key)
+        if hidden is not None:
+            timer.meta['encoder_cache'] = 'hit'
+            return {"encoder_outputs": BaseModelOutput(last_hidden_state=hidden)}
+
+    with timer.phase('features'):
+        features = model_data["processor"](audio, sampling_rate=SAMPLE_RATE, return_tensors="pt").input_features
+        features = features.to(model_data["device"], dtype=model_data["dtype"])
+    if not use_cache:
+        return {"input_features": features}
+
+    with timer.phase('encode'), torch.inference_mode():
+        hidden = model_data["model"].get_encoder()(features).last_hidden_state
+    encoder_cache.put(key, hidden)
+    timer.meta['encoder_cache'] = 'miss'
+    return {"encoder_outputs": BaseModelOutput(last_hidden_state=hidden)}
+
+
+def language_probs(model_data, audio) -> dict[str, float]:
+    """
+    Probability of each language Whisper knows for the first LANGID_SECONDS
+    of `audio`, from one decoder step after <|startoftranscript|>.
+    """
+    model = model_data["model"]
+    inputs = model_inputs(model_data, audio[:LANGID_SECONDS * SAMPLE_RATE])
+    # CTranslate2 has its own detector
+    if hasattr(model, "language_probs"):
+        return model.language_probs(inputs["input_features"])
+
+    lang_to_id = getattr(model.generation_config, "lang_to_id", None)
+    if not lang_to_id:
+        raise ValueError(f"Model '{LANGID_KEY}' is not multilingual and cannot identify languages")
+    sot = torch.tensor([[model.generation_config.decoder_start_token_id]], device=model_data["device"])
+    with torch.inference_mode():
+        logits = model(decoder_input_ids=sot, **inputs).logits[0, -1]
+    probs = torch.softmax(logits[list(lang_to_id.values())].float(), dim=-1)
+    return {token.strip("<|>"): p.item() for token, p in zip(lang_to_id, probs)}
+
+
+def supports_word_timestamps(model_data) -> bool:
+    """
+    Token alignment needs the model's cross-attentions and the alignment
+    heads listed in its generation config (fine-tuned checkpoints may lack them).
+    """
+    return (model_data["backend"] not in ("onnx", "ct2")
+            and bool(getattr(model_data["model"].generation_config, "alignment_heads", None)))
+
+
+def group_words(tokenizer, token_ids, token_times, audio_s) -> list[dict]:
+    """
+    Merge BPE tokens into words (a token starting with "Ġ", i.e. a space,
+    starts a new word) timed from the first token's start to the start of
+    the token after the last one. Times are seconds, clamped to the audio.
+    """
+    special = set(tokenizer.all_special_ids)
+    ids, times = token_ids.tolist(), token_times.tolist()
+    words = []
+    for i, tok in enumerate(ids):
+        if tok in special:
+            continue
+        start = min(times[i], audio_s)
+        end = min(times[i + 1], audio_s) if i + 1 < len(times) else audio_s
+        if not words or tokenizer.convert_ids_to_tokens(tok).startswith("Ġ"):
+            words.append({"ids": [tok], "start": start, "end": end})
+        else:
+            words[-1]["ids"].append(tok)
+            words[-1]["end"] = end
+    result = []
+    for w in words:
+        text = tokenizer.decode(w["ids"]).strip()
+        if text:
+            result.append({"word": text, "start": round(w["start"], 2), "end": round(max(w["end"], w["start"]), 2)})
+    return result
+
+
+def detect_language(audio) -> dict:
+    """
+    Identify the language of `audio` (16 kHz float array) and pick the
+    lang_key to transcribe it with.
+    """
+    probs = language_probs(model_manager.get_model(LANGID_KEY), audio)
+    language, prob = max(probs.items(), key=lambda kv: kv[1])
+    if prob >= LANGID_MIN_PROB and language in LANGID_ROUTES:
+        lang_key = LANGID_ROUTES[language]
+    else:
+        lang_key = LANGID_FALLBACK
+    return {"language": language, "probability": round(prob, 4), "lang_key": lang_key}
+
+
+def _load_audio(audio_file, timer):
+    with timer.phase('read'):
+        audio_bytes = audio_file.read()
+    with timer.phase('load_audio'):
+        audio, sr = suppress_stderr(librosa.load, io.BytesIO(audio_bytes), sr=SAMPLE_RATE)
+    timer.meta['audio_s'] = round(len(audio) / SAMPLE_RATE, 3)
+    return audio
+
+
+def identify_language(audio_file, timer=None):
+    """
+    Language ID only, for callers that cache the result and send the
+    chosen lang_key with later requests (see detect_language).
+    """
+    timer = timer or PhaseTimer()
+    audio = _load_audio(audio_file, timer)
+    with timer.phase('speech_gate'):
+        silent = is_silent(audio, resolve_decoding(None, {}), SAMPLE_RATE)
+    if silent:
+        return {"language": None, "probability": None, "lang_key": None, "skipped": "no_speech"}
+    with timer.phase('detect_language'):
+        return detect_language(audio)
+
+
+def transcribe_audio(audio_file, lang_key, timer=None, decoding=None):
+    """
+    Transcribe one audio file with the model mapped to `lang_key`, or with
+    the one language ID picks when lang_key is in AUTO_KEYS.
+    `decoding` is a resolved options dict (see decoding.resolve_decoding);
+    server defaults for the key are used when omitted.
+    Returns {'transcription': str} plus 'skipped' when the decoder was not run
+    and 'detected' when the language was identified.
+    """
+    timer = timer or PhaseTimer()
+    if lang_key not in MODEL_MAPPING and lang_key not in AUTO_KEYS:
+        raise ValueError(f"No model mapping found for language key: {lang_key}")
+    if decoding is None:
+        decoding = resolve_decoding(MODEL_MAPPING.get(lang_key, {}).get("decoding"), {})
+
+    audio = _load_audio(audio_file, timer)
+    audio_s = len(audio) / SAMPLE_RATE
+
+    # Silent input: skip model load and decoder entirely
+    with timer.phase('speech_gate'):
+        silent = is_silent(audio, decoding, SAMPLE_RATE)
+    if silent:
+        timer.meta['skipped'] = 'no_speech'
+        return {'transcription': '', 'skipped': 'no_speech'}
+
+    detected = None
+    if lang_key in AUTO_KEYS:
+        with timer.phase('detect_language'):
+            detected = detect_language(audio)
+        lang_key = detected["lang_key"]
+        timer.meta['detected'] = detected
+
+    # Load model and processor from manager
+    with timer.phase('get_model'):
+        model_data = model_manager.get_model(lang_key)
+    processor = model_data["processor"]
+    model = model_data["model"]
+    timer.meta['backend'] = model_data["backend"]
+
+    if PSUTIL_AVAILABLE:
+        process = psutil.Process()
+        print(f"Using model '{lang_key}'. Memory usage: {process.memory_info().rss / (1024*1024):.2f} MB")
+
+    # Prepare input and transcribe
+    gen_kwargs = generate_kwargs(decoding, audio_s)
+    timer.meta['decoding'] = gen_kwargs
+    t0 = time.perf_counter()
+    force_language = lang_key if lang_key in ("en", "fr", "es") else None
+    # A confident detection also fixes the language on multilingual models
+    if detected and detected["probability"] >= LANGID_MIN_PROB:
+        force_language = force_language or detected["language"]
+    if force_language:
+        forced_decoder_ids = processor.get_decoder_prompt_ids(language=force_language, task="transcribe")
+        if forced_decoder_ids:
+            gen_kwargs = {**gen_kwargs, "forced_decoder_ids": forced_decoder_ids}
+    inputs = model_inputs(model_data, audio, timer)
+
+    word_timestamps = decoding.get("word_timestamps") and supports_word_timestamps(model_data)
+    if decoding.get("word_timestamps") and not word_timestamps:
+        timer.meta['word_timestamps'] = 'unsupported'
+    if word_timestamps:
+        # num_frames keeps the alignment inside the real audio, not the padding
+        gen_kwargs = {**gen_kwargs, "return_token_timestamps": True,
+                      "num_frames": min(len(audio), WINDOW_SAMPLES) // processor.feature_extractor.hop_length}
+
+    # Drafts are verified against the main model's argmax, so assistance
+    # only applies to greedy search, where the output is unchanged; word
+    # timing needs the main model's attention on every token, so it runs unassisted
+    assistant = model_data.get("assistant")
+    assisted = None
+    if assistant is not None and gen_kwargs["num_beams"] == 1 and not word_timestamps:
+        _decoder_calls.counts = {'main': 0, 'draft': 0}
+        try:
+            with timer.phase('generate'):
+                generated_ids = model.generate(**inputs, assistant_model=assistant, **gen_kwargs)
+            counts = _decoder_calls.counts
+        finally:
+            _decoder_calls.counts = None
+        # Prompt ids are stripped from the output, so every id was decoded;
+        # each main pass yields its accepted drafts plus one token of its own
+        tokens = generated_ids.shape[-1]
+        assisted = {
+            "tokens":     tokens,
+            "drafted":    counts['draft'],
+            "accepted":   max(0, tokens - counts['main']),
+            "main_calls": counts['main'],
+        }
+        timer.meta['assisted'] = assisted
+    else:
+        with timer.phase('generate'):
+            generated_ids = model.generate(**inputs, **gen_kwargs)
+
+    words = None
+    if word_timestamps:
+        token_times = generated_ids["token_timestamps"]
+        generated_ids = generated_ids["sequences"]
+    with timer.phase('decode'):
+        transcription = processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
+        if word_timestamps:
+            words = group_words(processor.tokenizer, generated_ids[0], token_times[0], audio_s)
+
+    inference_s = time.perf_counter() - t0
+    model_manager.record(lang_key, audio_s, inference_s, assisted)
+    if audio_s:
+        timer.meta['rtf'] = round(inference_s / audio_s, 4)
+    response = {'transcription': transcription}
+    if words is not None:
+        response['words'] = words
+    if detected:
+        response['detected'] = detected
+    return response
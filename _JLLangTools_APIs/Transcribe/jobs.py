@@ -0,0 +1,190 @@
+# jobs.py
+
+import os
+import json
+import time
+import uuid
+import queue
+import threading
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+
+from executor import QueueFull, inference_executor
+
+# Jobs accepted but not yet handed to the inference executor
+JOB_QUEUE_SIZE   = int(os.environ.get('TRANSCRIBE_JOB_QUEUE_SIZE', '256'))
+# Jobs allowed in the inference executor at once (running or waiting there);
+# the rest of its capacity stays free for synchronous /transcribe calls.
+# 0: half the executor's threads, at least one.
+JOB_SLOTS        = int(os.environ.get('TRANSCRIBE_JOB_SLOTS', '0'))
+# Finished jobs are kept this long (seconds) for GET /jobs/<id>
+JOB_TTL          = int(os.environ.get('TRANSCRIBE_JOB_TTL', '3600'))
+MAX_JOBS         = 10000
+# Audio given by path must live under this directory (unset: paths disabled)
+SHARED_DIR       = os.environ.get('TRANSCRIBE_SHARED_DIR')
+# Webhooks may only target these hosts
+WEBHOOK_HOSTS    = {h.strip() for h in os.environ.get(
+    'TRANSCRIBE_WEBHOOK_HOSTS', 'localhost,127.0.0.1,::1').split(',') if h.strip()}
+WEBHOOK_RETRIES  = 3
+WEBHOOK_TIMEOUT  = 10
+
+
+def resolve_shared_path(path: str) -> str:
+    """
+    Absolute path of `path` inside SHARED_DIR; ValueError if path input is
+    disabled, escapes the shared directory or does not exist.
+    """
+    if not SHARED_DIR:
+        raise ValueError("Audio paths are disabled (TRANSCRIBE_SHARED_DIR is not set)")
+    root = os.path.realpath(SHARED_DIR)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full]) != root:
+        raise ValueError(f"Path is outside the shared directory: {path}")
+    if not os.path.isfile(full):
+        raise ValueError(f"No such file: {path}")
+    return full
+
+
+def check_webhook(url: str) -> str:
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme not in ('http', 'https') or parsed.hostname not in WEBHOOK_HOSTS:
+        raise ValueError(f"Webhook must be an http(s) URL on one of: {', '.join(sorted(WEBHOOK_HOSTS))}")
+    return url
+
+
+class JobQueue:
+    """
+    Accepts transcription jobs immediately and feeds them to the inference
+    executor from one dispatcher thread. Bursts wait here (up to
+    JOB_QUEUE_SIZE) instead of being rejected. At most `slots` jobs are in
+    the executor at a time, so a job backlog never fills its queue and
+    synchronous /transcribe calls keep getting through.
+    """
+
+    def __init__(self, executor=inference_executor, queue_size: int = JOB_QUEUE_SIZE,
+                 slots: int = JOB_SLOTS):
+        self.executor = executor
+        self.slots    = slots or max(1, executor.workers // 2)
+        self.free     = threading.Semaphore(self.slots)
+        self.pending  = queue.Queue(maxsize=max(1, queue_size))
+        self.jobs     = OrderedDict()
+        self._lock    = threading.Lock()
+        self._thread  = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, fn, args: tuple, lang_key: str, webhook: str | None = None) -> dict:
+        """
+        Register a job that will run fn(*args). Raises QueueFull when the
+        job queue itself is at capacity.
+        """
+        self.start()
+        job = {
+            'id':       uuid.uuid4().hex,
+            'status':   'queued',
+            'lang_key': lang_key,
+            'created':  time.time(),
+            'started':  None,
+            'finished': None,
+            'result':   None,
+            'error':    None,
+            'webhook':  webhook,
+        }
+        with self._lock:
+            self._expire()
+            self.jobs[job['id']] = job
+        try:
+            self.pending.put_nowait((job['id'], fn, args))
+        except queue.Full:
+            with self._lock:
+                del self.jobs[job['id']]
+            raise QueueFull(self.executor.retry_after() * (1 + self.pending.qsize() // self.slots))
+        return self.get(job['id'])
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            view = {k: v for k, v in job.items() if k != 'webhook'}
+        view['position'] = self._position(job_id) if view['status'] == 'queued' else None
+        return view
+
+    def _position(self, job_id: str) -> int | None:
+        with self.pending.mutex:
+            for i, (queued_id, _, _) in enumerate(self.pending.queue):
+                if queued_id == job_id:
+                    return i
+        return None
+
+    def _dispatch(self) -> None:
+        while True:
+            job_id, fn, args = self.pending.get()
+            self.free.acquire()
+            future = self.executor.submit_wait(self._run, job_id, fn, args)
+            future.add_done_callback(lambda f, job_id=job_id: self._finish(job_id, f))
+
+    def _run(self, job_id: str, fn, args):
+        self._update(job_id, status='running', started=time.time())
+        return fn(*args)
+
+    def _finish(self, job_id: str, future) -> None:
+        self.free.release()
+        error = future.exception()
+        if error is None:
+            job = self._update(job_id, status='done', finished=time.time(), result=future.result())
+        else:
+            job = self._update(job_id, status='failed', finished=time.time(), error=str(error))
+        if job and job['webhook']:
+            threading.Thread(target=self._notify, args=(job,), daemon=True).start()
+
+    def _update(self, job_id: str, **fields) -> dict | None:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+                return dict(job)
+        return None
+
+    def _expire(self) -> None:
+        # Caller holds the lock; jobs are in creation order, so once a job
+        # was created after the cutoff none of the later ones can be due.
+        # Unfinished jobs are skipped, not waited for.
+        cutoff = time.time() - JOB_TTL
+        for job_id in list(self.jobs):
+            job = self.jobs[job_id]
+            too_many = len(self.jobs) > MAX_JOBS
+            if not too_many and job['created'] >= cutoff:
+                break
+            if job['finished'] and (job['finished'] < cutoff or too_many):
+                del self.jobs[job_id]
+
+    @staticmethod
+    def _notify(job: dict) -> None:
+        body = json.dumps({k: v for k, v in job.items() if k != 'webhook'}).encode('utf-8')
+        for attempt in range(1, WEBHOOK_RETRIES + 1):
+            req = urllib.request.Request(job['webhook'], data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+            try:
+                with urllib.request.urlopen(req, timeout=WEBHOOK_TIMEOUT):
+                    return
+            except Exception as e:
+                print(f"Webhook for job {job['id']} failed (attempt {attempt}): {e}")
+                if attempt < WEBHOOK_RETRIES:
+                    time.sleep(2 ** attempt)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+        return {'pending': self.pending.qsize(), 'queue_size': self.pending.maxsize,
+                'slots': self.slots, 'jobs': counts}
+
+
+job_queue = JobQueue()
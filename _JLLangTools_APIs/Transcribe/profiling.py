@@ -0,0 +1,128 @@
+# profiling.py
+
+import os
+import json
+import time
+import random
+import cProfile
+import logging
+import contextlib
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+# ─── Configuration (environment) ─────────────────────────────────────────────
+# TRANSCRIBE_PROFILE=1 turns profiling on for every request; otherwise a client
+# opts in per request with the `X-Profile: 1` header.
+PROFILE_ENABLED     = os.environ.get('TRANSCRIBE_PROFILE', '0') == '1'
+PROFILE_HEADER      = 'X-Profile'
+# Fraction (0..1) of profiled requests that also get a full capture on disk
+PROFILE_SAMPLE_RATE = float(os.environ.get('TRANSCRIBE_PROFILE_SAMPLE_RATE', '0'))
+# "cprofile" → .prof (pstats, loadable by snakeviz / py-spy style tooling)
+# "torch"    → Chrome trace from torch.profiler
+PROFILE_CAPTURE     = os.environ.get('TRANSCRIBE_PROFILE_CAPTURE', 'cprofile').lower()
+PROFILE_DIR         = os.environ.get('TRANSCRIBE_PROFILE_DIR', 'profiles')
+
+
+def profiling_requested(headers) -> bool:
+    """
+    True if profiling is globally enabled or the request opted in via header.
+    """
+    if PROFILE_ENABLED:
+        return True
+    return headers.get(PROFILE_HEADER, '').strip().lower() in ('1', 'true', 'yes')
+
+
+class PhaseTimer:
+    """
+    Accumulates wall-clock milliseconds per named phase of a request.
+    """
+    def __init__(self):
+        self.phases = {}
+        self.meta = {}
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - t0) * 1000
+            self.phases[name] = round(self.phases.get(name, 0.0) + elapsed, 2)
+
+    def breakdown(self) -> dict:
+        total = round((time.perf_counter() - self._start) * 1000, 2)
+        return {'phases_ms': dict(self.phases), 'total_ms': total, **self.meta}
+
+
+# ─── Rolling timings log ─────────────────────────────────────────────────────
+_timings_logger = None
+
+def _get_timings_logger() -> logging.Logger:
+    global _timings_logger
+    if _timings_logger is None:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        logger = logging.getLogger('transcribe_timings')
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            fh = RotatingFileHandler(
+                os.path.join(PROFILE_DIR, 'timings.log'),
+                maxBytes=5 * 1024 * 1024, backupCount=5, encoding='utf-8'
+            )
+            fh.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(fh)
+        logger.propagate = False
+        _timings_logger = logger
+    return _timings_logger
+
+
+def log_timings(lang_key: str, breakdown: dict) -> None:
+    """
+    Append one JSON line per profiled request to PROFILE_DIR/timings.log.
+    """
+    record = {
+        'time':     datetime.now(timezone.utc).isoformat(),
+        'lang_key': lang_key,
+        **breakdown
+    }
+    _get_timings_logger().info(json.dumps(record, ensure_ascii=False))
+
+
+# ─── Sampled captures ────────────────────────────────────────────────────────
+@contextlib.contextmanager
+def sampled_capture(label: str, enabled: bool):
+    """
+    For a PROFILE_SAMPLE_RATE fraction of profiled requests, record a cProfile
+    dump or torch profiler trace into PROFILE_DIR. Yields a dict whose 'path'
+    key holds the written file (or None when the request was not sampled).
+    """
+    result = {'path': None}
+    if not enabled or PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE:
+        yield result
+        return
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y_%m_%d__%H_%M_%S_%f')
+    base  = os.path.join(PROFILE_DIR, f"{stamp}_{label}")
+
+    if PROFILE_CAPTURE == 'torch':
+        from torch.profiler import profile, ProfilerActivity
+        activities = [ProfilerActivity.CPU]
+        import torch
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+        with profile(activities=activities, record_shapes=True) as prof:
+            yield result
+        path = base + '.trace.json'
+        prof.export_chrome_trace(path)
+    else:
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield result
+        finally:
+            prof.disable()
+        path = base + '.prof'
+        prof.dump_stats(path)
+
+    result['path'] = path
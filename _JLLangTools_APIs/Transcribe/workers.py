@@ -0,0 +1,312 @@
+# workers.py
+
+import os
+import time
+import itertools
+import threading
+import multiprocessing as mp
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+# Supervisor mode: TRANSCRIBE_WORKERS=N runs inference in N separate
+# processes, each pinned to its own slice of cores. 0 keeps inference in
+# the serving process.
+WORKERS         = int(os.environ.get('TRANSCRIBE_WORKERS', '0'))
+# torch intra-op threads per worker (default: its share of the cores)
+WORKER_THREADS  = int(os.environ.get('TRANSCRIBE_WORKER_THREADS', '0'))
+# Models each worker keeps resident (its own ModelManager LRU)
+WORKER_MODELS   = int(os.environ.get('TRANSCRIBE_WORKER_MODELS', '2'))
+# Requests a worker may have assigned at once (running + waiting)
+WORKER_DEPTH    = 2
+HEALTH_INTERVAL = 1.0
+
+
+def available_cores() -> list[int]:
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def split_cores(cores: list[int], n: int) -> list[list[int]]:
+    """
+    Contiguous, near-equal core slices, one per worker. With more workers
+    than cores, slices wrap around and share.
+    """
+    if n <= len(cores):
+        size, extra = divmod(len(cores), n)
+        slices, start = [], 0
+        for i in range(n):
+            end = start + size + (1 if i < extra else 0)
+            slices.append(cores[start:end])
+            start = end
+        return slices
+    return [[cores[i % len(cores)]] for i in range(n)]
+
+
+def preload_plan(lang_keys: list[str], n: int) -> list[list[str]]:
+    """
+    Spread preloaded models over workers so every key is resident somewhere
+    and every worker starts with at least one model.
+    """
+    if not lang_keys:
+        return [[] for _ in range(n)]
+    plan = [[] for _ in range(n)]
+    for j in range(max(n, len(lang_keys))):
+        key = lang_keys[j % len(lang_keys)]
+        if key not in plan[j % n]:
+            plan[j % n].append(key)
+    return plan
+
+
+def _worker_main(index, cores, threads, max_models, preload, tasks, results):
+    """
+    Entry point of a worker process: pin, size torch's thread pool, load
+    models, then serve tasks until told to stop (None).
+    """
+    if cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    import io
+    import torch
+    torch.set_num_threads(threads)
+
+    import inference
+    from profiling import PhaseTimer, log_timings, sampled_capture
+
+    inference.model_manager.max_models = max_models
+    inference.model_manager.preload(preload)
+    results.put(('ready', index, None, list(inference.model_manager.cache)))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, op, audio_bytes, lang_key, decoding, profile = task
+        timer = PhaseTimer()
+        try:
+            if op == 'detect':
+                results.put((task_id, index, ('ok', inference.identify_language(io.BytesIO(audio_bytes))),
+                             list(inference.model_manager.cache)))
+                continue
+            with sampled_capture(lang_key, profile) as capture:
+                response = inference.transcribe_audio(io.BytesIO(audio_bytes), lang_key, timer, decoding)
+            if profile:
+                breakdown = timer.breakdown()
+                if capture['path']:
+                    breakdown['capture'] = capture['path']
+                breakdown['worker'] = index
+                log_timings(lang_key, breakdown)
+                response['timings'] = breakdown
+            outcome = ('ok', response)
+        except Exception as e:
+            outcome = ('error', f"{type(e).__name__}: {e}")
+        results.put((task_id, index, outcome, list(inference.model_manager.cache)))
+
+
+class WorkerPool:
+    """
+    Supervisor for N inference processes. Requests are routed by lang_key
+    to a worker that already has the model resident (least loaded first),
+    falling back to the least loaded worker overall, so each model is
+    loaded by as few workers as traffic needs. Crashed workers are
+    restarted and their in-flight requests failed.
+    """
+
+    def __init__(self, n: int = WORKERS, threads: int = WORKER_THREADS,
+                 max_models: int = WORKER_MODELS, preload: list[str] | None = None):
+        self.ctx      = mp.get_context('spawn')
+        self.n        = n
+        cores         = available_cores()
+        self.cores    = split_cores(cores, n)
+        self.threads  = threads or max(1, len(cores) // n)
+        self.max_models = max_models
+        self.plan     = preload_plan(preload or [], n)
+        self.results  = self.ctx.Queue()
+        self.cond     = threading.Condition()
+        self.ids      = itertools.count()
+        self.pending  = {}   # task_id -> (worker index, Future, lang_key)
+        self.workers  = []
+        self.closing  = False
+        for i in range(n):
+            self.workers.append({
+                'index':     i,
+                'cores':     self.cores[i],
+                'process':   None,
+                'tasks':     None,
+                'inflight':  0,
+                'completed': 0,
+                'restarts':  -1,
+                'ready':     False,
+                'resident':  list(self.plan[i]),
+            })
+            self._spawn(self.workers[i])
+        threading.Thread(target=self._collect, name='worker-results', daemon=True).start()
+        threading.Thread(target=self._monitor, name='worker-health', daemon=True).start()
+
+    def _spawn(self, worker: dict) -> None:
+        worker['tasks'] = self.ctx.Queue()
+        worker['process'] = self.ctx.Process(
+            target=_worker_main,
+            args=(worker['index'], worker['cores'], self.threads, self.max_models,
+                  worker['resident'], worker['tasks'], self.results),
+            name=f"inference-worker-{worker['index']}",
+            daemon=True,
+        )
+        worker['process'].start()
+        worker['restarts'] += 1
+        worker['ready'] = False
+        print(f"Started inference worker {worker['index']} (pid {worker['process'].pid}) "
+              f"on cores {worker['cores']} with {self.threads} threads")
+
+    def _pick(self, lang_key: str) -> dict | None:
+        # Caller holds the lock. Dead workers are skipped until _monitor
+        # has restarted them.
+        open_slots = [w for w in self.workers
+                      if w['inflight'] < WORKER_DEPTH and w['process'].is_alive()]
+        if not open_slots:
+            return None
+        resident = [w for w in open_slots if lang_key in w['resident']]
+        idle_resident = [w for w in resident if w['inflight'] == 0]
+        if idle_resident:
+            return idle_resident[0]
+        idle = [w for w in open_slots if w['inflight'] == 0]
+        # Queue behind a warm worker rather than load the model on an idle
+        # one, unless nobody has it yet
+        if resident:
+            return min(resident, key=lambda w: w['inflight'])
+        return min(idle or open_slots, key=lambda w: (w['inflight'], len(w['resident'])))
+
+    def run(self, audio_bytes: bytes, lang_key: str, decoding: dict, profile: bool) -> dict:
+        """
+        Transcribe on a worker process, blocking the calling thread until
+        the result is back (TimeoutError after REQUEST_TIMEOUT).
+        """
+        from inference import AUTO_KEYS, LANGID_KEY
+        # Language ID runs first, so route to where its model is warm
+        route = LANGID_KEY if lang_key in AUTO_KEYS else lang_key
+        return self._call('transcribe', audio_bytes, lang_key, route, decoding, profile)
+
+    def detect(self, audio_bytes: bytes) -> dict:
+        """
+        Language ID only (see inference.identify_language), blocking.
+        """
+        from inference import LANGID_KEY
+        return self._call('detect', audio_bytes, LANGID_KEY, LANGID_KEY, None, False)
+
+    def _call(self, op: str, audio_bytes: bytes, lang_key: str, route: str,
+              decoding: dict | None, profile: bool) -> dict:
+        from executor import REQUEST_TIMEOUT
+        deadline = time.monotonic() + REQUEST_TIMEOUT
+        future = Future()
+        with self.cond:
+            if not self.cond.wait_for(lambda: self._pick(route) is not None, timeout=REQUEST_TIMEOUT):
+                raise TimeoutError(f"No inference worker free within {REQUEST_TIMEOUT:.0f}s")
+            worker = self._pick(route)
+            worker['inflight'] += 1
+            if route not in worker['resident']:
+                worker['resident'].append(route)
+            task_id = next(self.ids)
+            self.pending[task_id] = (worker['index'], future, route)
+        worker['tasks'].put((task_id, op, audio_bytes, lang_key, decoding, profile))
+        try:
+            status, value = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            # The worker keeps its slot until it answers (or _monitor
+            # restarts it); its late result is dropped by _collect
+            with self.cond:
+                self.pending.pop(task_id, None)
+            raise TimeoutError(f"Inference worker {worker['index']} did not answer within "
+                               f"{REQUEST_TIMEOUT:.0f}s")
+        if status == 'error':
+            raise RuntimeError(value)
+        return value
+
+    def _collect(self) -> None:
+        while True:
+            task_id, index, outcome, resident = self.results.get()
+            with self.cond:
+                worker = self.workers[index]
+                # Keys of requests still queued on this worker count as resident
+                queued = [lang for idx, _, lang in self.pending.values() if idx == index and lang not in resident]
+                worker['resident'] = resident + queued
+                if task_id == 'ready':
+                    worker['ready'] = True
+                    continue
+                entry = self.pending.pop(task_id, None)
+                worker['inflight'] = max(0, worker['inflight'] - 1)
+                worker['completed'] += 1
+                self.cond.notify_all()
+            if entry:
+                entry[1].set_result(outcome)
+
+    def _monitor(self) -> None:
+        # On its own thread, so a crash is noticed however busy the
+        # results queue is
+        while not self.closing:
+            time.sleep(HEALTH_INTERVAL)
+            try:
+                self._check_health()
+            except Exception as e:
+                print(f"Worker health check failed: {e}")
+
+    def _check_health(self) -> None:
+        with self.cond:
+            if self.closing:
+                return
+            for worker in self.workers:
+                if worker['process'].is_alive():
+                    continue
+                print(f"Inference worker {worker['index']} exited "
+                      f"(code {worker['process'].exitcode}); restarting")
+                failed = [tid for tid, (idx, _, _) in self.pending.items() if idx == worker['index']]
+                for tid in failed:
+                    _, future, _ = self.pending.pop(tid)
+                    future.set_result(('error', f"Inference worker {worker['index']} crashed"))
+                worker['inflight'] = 0
+                worker['resident'] = list(self.plan[worker['index']])
+                self._spawn(worker)
+            self.cond.notify_all()
+
+    def is_ready(self) -> bool:
+        with self.cond:
+            return all(w['ready'] for w in self.workers)
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not all(w['ready'] for w in self.workers):
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.2)
+        return True
+
+    def stats(self) -> list[dict]:
+        with self.cond:
+            return [{
+                'index':     w['index'],
+                'pid':       w['process'].pid,
+                'alive':     w['process'].is_alive(),
+                'ready':     w['ready'],
+                'cores':     w['cores'],
+                'threads':   self.threads,
+                'resident':  list(w['resident']),
+                'inflight':  w['inflight'],
+                'completed': w['completed'],
+                'restarts':  w['restarts'],
+            } for w in self.workers]
+
+    def shutdown(self) -> None:
+        with self.cond:
+            self.closing = True
+        for worker in self.workers:
+            worker['tasks'].put(None)
+        for worker in self.workers:
+            worker['process'].join(timeout=10)
+
+
+# Created by start_pool() in supervisor mode only
+worker_pool = None
+
+
+def start_pool(preload: list[str] | None = None) -> WorkerPool | None:
+    global worker_pool
+    if WORKERS > 0 and worker_pool is None:
+        worker_pool = WorkerPool(WORKERS, preload=preload)
+    return worker_pool
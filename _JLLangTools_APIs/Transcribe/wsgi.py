@@ -0,0 +1,26 @@
+# wsgi.py
+"""
+Production entry point for the Transcribe API:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+One process owns the models; its request threads (gunicorn gthread) accept
+and answer clients concurrently while inference runs on the executor's
+dedicated threads (see executor.py). With TRANSCRIBE_WORKERS=N those
+threads hand requests to N pinned worker processes instead (see workers.py).
+"""
+
+import threading
+
+from app import app
+from inference import PRELOAD_MODELS, model_manager
+from executor import inference_executor
+from jobs import job_queue
+from workers import start_pool
+
+# Serve straight away; GET /ready turns 200 once preloads are warmed up
+if start_pool(PRELOAD_MODELS) is None:
+    threading.Thread(target=model_manager.preload, args=(PRELOAD_MODELS,),
+                     name='preload', daemon=True).start()
+inference_executor.start()
+job_queue.start()
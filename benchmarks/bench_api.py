@@ -0,0 +1,201 @@
+# benchmarks/bench_api.py
+"""
+Benchmark the Transcribe API's `transcribe_audio` hot path on CPU, offline.
+
+By default a tiny randomly initialised Whisper (built from a config, so no
+download is needed) stands in for the real checkpoints; pass --model-dir to
+point at a small local checkpoint such as a whisper-tiny snapshot instead.
+--backends runs the same clips under several inference backends so their
+real-time factors can be compared side by side.
+
+    python benchmarks/bench_api.py --durations 5,10,30 --runs 5 --out api.json
+    python benchmarks/bench_api.py --model-dir Whisper/openai_whisper-tiny --backends fp32,int8,bf16
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+
+from common import API_DIR, TEST_MP3, percentiles, peak_rss_mb, write_report
+from synth_audio import generate, wav_bytes
+
+
+class StubProcessor:
+    """
+    Real Whisper feature extraction with a tokenizer-free decode, so the
+    benchmark needs no vocabulary files.
+    """
+    def __init__(self):
+        from transformers import WhisperFeatureExtractor
+        self.feature_extractor = WhisperFeatureExtractor()
+
+    def __call__(self, audio, sampling_rate, return_tensors, **kwargs):
+        return self.feature_extractor(audio, sampling_rate=sampling_rate, return_tensors=return_tensors)
+
+    def get_decoder_prompt_ids(self, **kwargs):
+        return None
+
+    def batch_decode(self, ids, skip_special_tokens=True):
+        return [' '.join(str(int(t)) for t in row) for row in ids]
+
+
+class StubModelManager:
+    """
+    Drop-in for the API's ModelManager that always serves one model.
+    """
+    def __init__(self, model_dir: str | None, backend: str):
+        import torch
+        from transformers import WhisperConfig, WhisperForConditionalGeneration, WhisperProcessor
+        from backends import load_model, apply_backend, input_dtype
+
+        device = torch.device('cpu')
+        if model_dir:
+            processor = WhisperProcessor.from_pretrained(model_dir)
+            model, backend = load_model(model_dir, backend, processor, device)
+        else:
+            config = WhisperConfig(
+                d_model=64, encoder_layers=2, decoder_layers=2,
+                encoder_attention_heads=2, decoder_attention_heads=2,
+                encoder_ffn_dim=256, decoder_ffn_dim=256,
+            )
+            processor = StubProcessor()
+            model = WhisperForConditionalGeneration(config).eval()
+            model, backend = apply_backend(model, backend, device)
+        self.entry = {
+            'path':      model_dir or 'random',
+            'processor': processor,
+            'model':     model,
+            'device':    device,
+            'dtype':     input_dtype(model),
+            'backend':   backend,
+        }
+
+    def get_model(self, lang_key):
+        return self.entry
+
+    def record(self, lang_key, audio_s, inference_s, assisted=None):
+        pass
+
+
+def build_clips(args) -> tuple[list[dict], list[str]]:
+    clips, skipped = [], []
+    for i, duration in enumerate(args.durations):
+        clips.append({
+            'name':    f"synth_{args.pattern}_{duration:g}s",
+            'data':    wav_bytes(generate(duration, args.pattern, seed=i)),
+            'audio_s': duration,
+        })
+    if args.include_mp3:
+        try:
+            import librosa
+            with open(TEST_MP3, 'rb') as f:
+                data = f.read()
+            audio_s = librosa.get_duration(path=TEST_MP3)
+            clips.append({'name': os.path.basename(TEST_MP3), 'data': data, 'audio_s': audio_s})
+        except Exception as e:
+            skipped.append(f"es-test.mp3 ({e})")
+    return clips, skipped
+
+
+def run_clips(inference, PhaseTimer, clips: list[dict], args) -> list[dict]:
+    import torch
+    from decoding import resolve_decoding
+
+    form = {'max_new_tokens': args.max_tokens} if args.max_tokens else {}
+    decoding = resolve_decoding(None, form)
+
+    per_clip = []
+    with torch.inference_mode():
+        for clip in clips:
+            latencies, rtfs, phases = [], [], {}
+            for run in range(args.warmup + args.runs):
+                timer = PhaseTimer()
+                t0 = time.perf_counter()
+                inference.transcribe_audio(io.BytesIO(clip['data']), args.lang, timer, decoding)
+                elapsed = time.perf_counter() - t0
+                if run < args.warmup:
+                    continue
+                latencies.append(elapsed)
+                rtfs.append(elapsed / clip['audio_s'])
+                for name, ms in timer.phases.items():
+                    phases.setdefault(name, []).append(ms / 1000)
+            per_clip.append({
+                'clip':      clip['name'],
+                'audio_s':   round(clip['audio_s'], 3),
+                'latency_s': percentiles(latencies),
+                'rtf':       percentiles(rtfs),
+                'phases_s':  {name: percentiles(v) for name, v in phases.items()},
+            })
+    return per_clip
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline CPU benchmark of transcribe_audio.")
+    parser.add_argument('--durations', type=lambda s: [float(x) for x in s.split(',')], default=[5.0, 10.0, 30.0])
+    parser.add_argument('--pattern', default='lecture')
+    parser.add_argument('--runs', type=int, default=5, help="Timed calls per clip")
+    parser.add_argument('--warmup', type=int, default=1, help="Untimed calls per clip")
+    parser.add_argument('--model-dir', help="Local Whisper checkpoint (default: tiny random model)")
+    parser.add_argument('--backends', type=lambda s: s.split(','), default=['fp32'],
+                        help="Comma-separated inference backends to compare")
+    parser.add_argument('--lang', default='en')
+    parser.add_argument('--max-tokens', type=int, help="Fixed max_new_tokens (default: derived from duration)")
+    parser.add_argument('--threads', type=int, help="torch.set_num_threads")
+    parser.add_argument('--no-mp3', dest='include_mp3', action='store_false')
+    parser.add_argument('--encoder-cache', action='store_true',
+                        help="Keep the API's encoder output cache on (repeat runs then skip the encoder)")
+    parser.add_argument('--out', help="Write JSON report here instead of stdout")
+    args = parser.parse_args()
+    if not args.encoder_cache:
+        os.environ['TRANSCRIBE_ENCODER_CACHE_MB'] = '0'
+
+    # The API resolves Whisper/ and profiles/ relative to its own folder
+    model_dir = os.path.abspath(args.model_dir) if args.model_dir else None
+    os.chdir(API_DIR)
+    sys.path.insert(0, API_DIR)
+    import torch
+    import inference
+    from profiling import PhaseTimer
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    clips, skipped = build_clips(args)
+    results = {}
+    for backend in args.backends:
+        t0 = time.perf_counter()
+        inference.model_manager = StubModelManager(model_dir, backend)
+        load_s = time.perf_counter() - t0
+        per_clip = run_clips(inference, PhaseTimer, clips, args)
+
+        all_lat = [c['latency_s']['mean'] for c in per_clip]
+        audio_total = sum(c['audio_s'] for c in per_clip)
+        results[backend] = {
+            'active_backend':           inference.model_manager.entry['backend'],
+            'model_load_s':             round(load_s, 3),
+            'rtf_mean':                 round(sum(all_lat) / audio_total, 4) if audio_total else None,
+            'throughput_audio_s_per_s': round(audio_total / sum(all_lat), 3) if all_lat else None,
+            'clips':                    per_clip,
+        }
+
+    report = {
+        'benchmark': 'api',
+        'config': {
+            'model':      args.model_dir or 'tiny-random',
+            'lang':       args.lang,
+            'runs':       args.runs,
+            'warmup':     args.warmup,
+            'max_tokens': args.max_tokens,
+            'threads':    torch.get_num_threads(),
+        },
+        'backends':    results,
+        'peak_rss_mb': peak_rss_mb(),
+        'skipped':     skipped,
+    }
+    write_report(report, args.out)
+
+
+if __name__ == '__main__':
+    main()
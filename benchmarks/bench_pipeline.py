@@ -0,0 +1,268 @@
+# benchmarks/bench_pipeline.py
+"""
+Benchmark the demo pipeline (converter → chunker → transcriber → assembler →
+cleaner) offline against the stub Transcribe API.
+
+Each stage is first timed in isolation per batch, then a second set of batches
+is pushed through the file queues end to end, and a third through the
+single-process orchestrator (in-memory hand-off, one worker pool per stage).
+Results are written as JSON so runs can be diffed across commits:
+
+    python benchmarks/bench_pipeline.py --durations 30,300 --out bench.json
+    python benchmarks/bench_pipeline.py --mode orchestrator --stage-workers transcriber=4
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+
+from common import DEMO_DIR, TEST_MP3, StageMeter, summarize, percentiles, peak_rss_mb, write_report
+from synth_audio import PATTERNS, generate, write_wav, SAMPLE_RATE
+from stub_api import start_stub
+
+STAGES = ['converter', 'chunker', 'transcriber', 'assembler', 'cleaner']
+
+
+def import_stages(data_dir: str) -> dict:
+    """
+    Import the stage scripts with their DATA_DIR pointed at `data_dir`.
+    """
+    os.environ['TRANSCRIBE_DATA_DIR'] = data_dir
+    if DEMO_DIR not in sys.path:
+        sys.path.insert(0, DEMO_DIR)
+    import converter, chunker, transcriber, assembler, cleaner
+    return {
+        'converter':   converter,
+        'chunker':     chunker,
+        'transcriber': transcriber,
+        'assembler':   assembler,
+        'cleaner':     cleaner,
+    }
+
+
+def build_inputs(args, src_dir: str) -> tuple[list[dict], list[str]]:
+    """
+    Write one synthetic WAV per (duration, pattern, repeat) plus the bundled
+    es-test.mp3 when ffmpeg is available.
+    """
+    inputs, skipped = [], []
+    seed = 0
+    for duration in args.durations:
+        for pattern in args.patterns:
+            for rep in range(args.repeat):
+                name = f"synth_{pattern}_{int(duration)}s_{rep}.wav"
+                path = os.path.join(src_dir, name)
+                write_wav(path, generate(duration, pattern, seed=seed))
+                inputs.append({'name': name, 'path': path, 'audio_s': duration})
+                seed += 1
+
+    if args.include_mp3:
+        if shutil.which('ffmpeg') and os.path.exists(TEST_MP3):
+            from pydub import AudioSegment
+            audio_s = len(AudioSegment.from_file(TEST_MP3)) / 1000
+            inputs.append({'name': os.path.basename(TEST_MP3), 'path': TEST_MP3, 'audio_s': audio_s})
+        else:
+            skipped.append('es-test.mp3 (ffmpeg or file not available)')
+    return inputs, skipped
+
+
+def create_batch(data_dir: str, tag: str, item: dict, lang: str) -> str:
+    from utils.request_utils import create_transcription_request
+    batch = f"{datetime.utcnow().strftime('%Y_%m_%d__%H_%M_%S')}_{lang}_{tag}"
+    subpath = os.path.join(data_dir, batch)
+    os.makedirs(subpath, exist_ok=True)
+    shutil.copy(item['path'], os.path.join(subpath, item['name']))
+    create_transcription_request(subpath, item['name'], lang, [{'start': '', 'end': ''}])
+    return batch
+
+
+def run_isolated(stages: dict, data_dir: str, inputs: list[dict], lang: str) -> dict:
+    """
+    Call each stage's batch function directly, timing it on its own. These
+    don't hand off to the next queue (scan_and_process does), so nothing
+    piles up in the file queues.
+    """
+    results = {name: {'lat': [], 'audio_s': 0.0, 'disk': 0, 'io': 0, 'rss': 0.0} for name in STAGES}
+    for i, item in enumerate(inputs):
+        batch = create_batch(data_dir, f"iso{i}_{os.path.splitext(item['name'])[0]}", item, lang)
+        subfolder = os.path.join(data_dir, batch)
+        wav_path  = os.path.join(subfolder, os.path.splitext(item['name'])[0] + '.wav')
+
+        calls = {
+            'converter':   lambda: stages['converter'].convert_folder(batch),
+            'chunker':     lambda: stages['chunker'].process_wav(wav_path),
+            'transcriber': lambda: stages['transcriber'].process_folder(batch),
+            'assembler':   lambda: stages['assembler'].process_folder(batch),
+            'cleaner':     lambda: stages['cleaner'].process_batch(batch),
+        }
+        for name in STAGES:
+            with StageMeter(data_dir) as meter:
+                calls[name]()
+            r = results[name]
+            r['lat'].append(meter.elapsed_s)
+            r['audio_s'] += item['audio_s']
+            r['disk'] += meter.disk_delta
+            r['io'] = (r['io'] + meter.io_bytes) if meter.io_bytes is not None and r['io'] is not None else None
+            r['rss'] = max(r['rss'], meter.peak_rss_mb)
+
+    return {
+        name: summarize(r['lat'], r['audio_s'], r['rss'], r['disk'], r['io'])
+        for name, r in results.items()
+    }
+
+
+def run_end_to_end(stages: dict, data_dir: str, inputs: list[dict], lang: str, timeout_s: float) -> dict:
+    """
+    Enqueue every input on converter.queue and spin all stages' scan loops
+    (no poll sleep) until each batch is stamped cleanerCompleted.
+    """
+    from utils.request_utils import load_request
+
+    pending = {}
+    for i, item in enumerate(inputs):
+        batch = create_batch(data_dir, f"e2e{i}_{os.path.splitext(item['name'])[0]}", item, lang)
+        pending[batch] = (time.perf_counter(), item['audio_s'])
+        stages['converter'].queue.enqueue(batch)
+
+    latencies, audio_total = [], 0.0
+    with StageMeter(data_dir) as meter:
+        deadline = time.perf_counter() + timeout_s
+        while pending and time.perf_counter() < deadline:
+            for name in STAGES:
+                stages[name].scan_and_process()
+            for batch in list(pending):
+                tasks = load_request(os.path.join(data_dir, batch)).get('tasks', {})
+                if tasks.get('cleanerCompleted'):
+                    t0, audio_s = pending.pop(batch)
+                    latencies.append(time.perf_counter() - t0)
+                    audio_total += audio_s
+
+    report = {
+        'batches':                  len(inputs),
+        'completed':                len(latencies),
+        'batch_latency_s':          percentiles(latencies),
+        'wall_s':                   round(meter.elapsed_s, 3),
+        'audio_seconds':            round(audio_total, 3),
+        'throughput_audio_s_per_s': round(audio_total / meter.elapsed_s, 3) if meter.elapsed_s else None,
+        'peak_rss_mb':              meter.peak_rss_mb,
+        'disk_bytes_delta':         meter.disk_delta,
+        'io_write_bytes':           meter.io_bytes,
+    }
+    if pending:
+        report['timed_out'] = sorted(pending)
+    return report
+
+
+def run_orchestrated(data_dir: str, inputs: list[dict], lang: str, timeout_s: float,
+                     workers: str | None) -> dict:
+    """
+    Submit every input to an in-process orchestrator Pipeline and wait until
+    each batch is stamped cleanerCompleted; no poll loop in between.
+    """
+    import orchestrator
+    from utils.request_utils import load_request
+
+    pipeline = orchestrator.Pipeline(orchestrator.parse_workers(workers))
+    pipeline.start()
+    pending = {}
+    with StageMeter(data_dir) as meter:
+        for i, item in enumerate(inputs):
+            batch = create_batch(data_dir, f"orc{i}_{os.path.splitext(item['name'])[0]}", item, lang)
+            pending[batch] = (time.perf_counter(), item['audio_s'])
+            pipeline.submit(batch)
+
+        latencies, audio_total = [], 0.0
+        deadline = time.perf_counter() + timeout_s
+        while pending and time.perf_counter() < deadline:
+            for batch in list(pending):
+                tasks = load_request(os.path.join(data_dir, batch)).get('tasks', {})
+                if tasks.get('cleanerCompleted'):
+                    t0, audio_s = pending.pop(batch)
+                    latencies.append(time.perf_counter() - t0)
+                    audio_total += audio_s
+            time.sleep(0.05)
+    stage_stats = pipeline.stats()
+    pipeline.stop()
+
+    report = {
+        'batches':                  len(inputs),
+        'completed':                len(latencies),
+        'workers':                  {name: s['workers'] for name, s in stage_stats.items()},
+        'failed':                   {name: s['failed'] for name, s in stage_stats.items() if s['failed']},
+        'batch_latency_s':          percentiles(latencies),
+        'wall_s':                   round(meter.elapsed_s, 3),
+        'audio_seconds':            round(audio_total, 3),
+        'throughput_audio_s_per_s': round(audio_total / meter.elapsed_s, 3) if meter.elapsed_s else None,
+        'peak_rss_mb':              meter.peak_rss_mb,
+        'disk_bytes_delta':         meter.disk_delta,
+        'io_write_bytes':           meter.io_bytes,
+    }
+    if pending:
+        report['timed_out'] = sorted(pending)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the transcription pipeline.")
+    parser.add_argument('--durations', type=lambda s: [float(x) for x in s.split(',')], default=[30.0, 120.0],
+                        help="Comma-separated synthetic clip lengths in seconds")
+    parser.add_argument('--patterns', type=lambda s: s.split(','), default=sorted(PATTERNS),
+                        help=f"Comma-separated silence patterns ({', '.join(sorted(PATTERNS))})")
+    parser.add_argument('--repeat', type=int, default=1, help="Clips per duration/pattern combination")
+    parser.add_argument('--no-mp3', dest='include_mp3', action='store_false', help="Skip the bundled es-test.mp3")
+    parser.add_argument('--lang', default='en')
+    parser.add_argument('--stub-rtf', type=float, default=0.0, help="Simulated API real-time factor")
+    parser.add_argument('--mode', choices=['isolated', 'e2e', 'orchestrator', 'all'], default='all')
+    parser.add_argument('--stage-workers', help="Orchestrator workers per stage, e.g. transcriber=4,chunker=2")
+    parser.add_argument('--timeout', type=float, default=1800.0, help="End-to-end timeout in seconds")
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch directory")
+    parser.add_argument('--out', help="Write JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    work     = tempfile.mkdtemp(prefix='jllt_bench_')
+    data_dir = os.path.join(work, 'data')
+    src_dir  = os.path.join(work, 'src')
+    os.makedirs(data_dir)
+    os.makedirs(src_dir)
+
+    try:
+        stages = import_stages(data_dir)
+        server, url = start_stub(rtf=args.stub_rtf)
+        stages['transcriber'].API_URL = url
+
+        inputs, skipped = build_inputs(args, src_dir)
+        report = {
+            'benchmark': 'pipeline',
+            'config': {
+                'durations':     args.durations,
+                'patterns':      args.patterns,
+                'repeat':        args.repeat,
+                'lang':          args.lang,
+                'stub_rtf':      args.stub_rtf,
+                'stage_workers': args.stage_workers,
+                'sample_rate':   SAMPLE_RATE,
+            },
+            'inputs':  [{'name': i['name'], 'audio_s': i['audio_s']} for i in inputs],
+            'skipped': skipped,
+        }
+        if args.mode in ('isolated', 'all'):
+            report['stages'] = run_isolated(stages, data_dir, inputs, args.lang)
+        if args.mode in ('e2e', 'all'):
+            report['end_to_end'] = run_end_to_end(stages, data_dir, inputs, args.lang, args.timeout)
+        if args.mode in ('orchestrator', 'all'):
+            report['orchestrator'] = run_orchestrated(data_dir, inputs, args.lang, args.timeout, args.stage_workers)
+        report['peak_rss_mb'] = peak_rss_mb()
+        server.shutdown()
+    finally:
+        if not args.keep:
+            shutil.rmtree(work, ignore_errors=True)
+
+    write_report(report, args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/common.py
+
+import os
+import sys
+import json
+import math
+import time
+import socket
+import platform
+import resource
+import subprocess
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEMO_DIR  = os.path.join(REPO_ROOT, '_JLLangTools_API_Demos', 'Transcribe')
+API_DIR   = os.path.join(REPO_ROOT, '_JLLangTools_APIs', 'Transcribe')
+TEST_MP3  = os.path.join(API_DIR, 'deploy', 'test_files', 'es-test.mp3')
+
+
+def percentiles(values: list[float]) -> dict:
+    """
+    p50/p90/p99/mean/max of a list of latencies (nearest-rank percentiles).
+    """
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+
+    def rank(p):
+        idx = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+        return round(ordered[idx], 4)
+
+    return {
+        'count': len(ordered),
+        'p50':   rank(50),
+        'p90':   rank(90),
+        'p99':   rank(99),
+        'mean':  round(sum(ordered) / len(ordered), 4),
+        'max':   round(ordered[-1], 4),
+    }
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process so far (Linux reports KiB).
+    """
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+
+
+def io_write_bytes() -> int | None:
+    """
+    Bytes this process caused to be written to storage, from /proc/self/io.
+    """
+    try:
+        with open('/proc/self/io', 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('write_bytes:'):
+                    return int(line.split(':', 1)[1])
+    except OSError:
+        pass
+    return None
+
+
+def dir_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for fname in files:
+            try:
+                total += os.path.getsize(os.path.join(root, fname))
+            except OSError:
+                pass
+    return total
+
+
+class StageMeter:
+    """
+    Wall time, peak RSS and bytes written around one stage invocation.
+    """
+    def __init__(self, watch_dir: str):
+        self.watch_dir = watch_dir
+
+    def __enter__(self):
+        self.io0   = io_write_bytes()
+        self.disk0 = dir_bytes(self.watch_dir)
+        self.t0    = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed_s   = time.perf_counter() - self.t0
+        io1              = io_write_bytes()
+        self.io_bytes    = (io1 - self.io0) if io1 is not None and self.io0 is not None else None
+        self.disk_delta  = dir_bytes(self.watch_dir) - self.disk0
+        self.peak_rss_mb = peak_rss_mb()
+        return False
+
+
+def summarize(latencies: list[float], audio_seconds: float, peak_rss: float,
+              disk_delta: int, io_bytes: int | None) -> dict:
+    busy = sum(latencies)
+    return {
+        'latency_s':                 percentiles(latencies),
+        'audio_seconds':             round(audio_seconds, 3),
+        'throughput_audio_s_per_s':  round(audio_seconds / busy, 3) if busy else None,
+        'peak_rss_mb':               peak_rss,
+        'disk_bytes_delta':          disk_delta,
+        'io_write_bytes':            io_bytes,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def write_report(report: dict, out_path: str | None) -> None:
+    """
+    Stamp the report with commit/host metadata and write it as JSON
+    (to stdout when no path is given).
+    """
+    report = {
+        'commit':    git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'host': {
+            'hostname': socket.gethostname(),
+            'python':   platform.python_version(),
+            'platform': platform.platform(),
+            'cpus':     os.cpu_count(),
+        },
+        **report
+    }
+    text = json.dumps(report, indent=2)
+    if out_path:
+        with open(out_path, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"Wrote benchmark report to {out_path}", file=sys.stderr)
+    else:
+        print(text)
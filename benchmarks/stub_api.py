@@ -0,0 +1,72 @@
+# benchmarks/stub_api.py
+
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 16 kHz, 16-bit mono PCM WAV
+WAV_BYTES_PER_SECOND = 32000
+WORDS_PER_SECOND     = 2.5
+
+
+class StubTranscribeHandler(BaseHTTPRequestHandler):
+    """
+    Offline stand-in for the Transcribe API. Answers /transcribe with filler
+    text sized to the uploaded audio after sleeping `rtf` × audio seconds.
+    """
+    rtf = 0.0
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/device':
+            return self._json({'device': 'CPU'})
+        if self.path == '/languages':
+            return self._json({'languages': ['en', 'fr', 'es', 'xx-large', 'xx-medium']})
+        self._json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        if self.path != '/transcribe':
+            return self._json({'error': 'not found'}, 404)
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        audio_s = length / WAV_BYTES_PER_SECOND
+        if self.rtf:
+            time.sleep(audio_s * self.rtf)
+        words = max(1, int(audio_s * WORDS_PER_SECOND))
+        self._json({'transcription': ' '.join(['lorem'] * words)})
+
+
+def start_stub(port: int = 0, rtf: float = 0.0) -> tuple[ThreadingHTTPServer, str]:
+    """
+    Serve the stub on a background thread; returns (server, base_url).
+    Port 0 picks a free port.
+    """
+    handler = type('Handler', (StubTranscribeHandler,), {'rtf': rtf})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the stub Transcribe API.")
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--rtf', type=float, default=0.0, help="Simulated real-time factor")
+    args = parser.parse_args()
+    server, url = start_stub(args.port, args.rtf)
+    print(f"Stub Transcribe API listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()